@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+"""Measure the response cache hit rate on a repeated workload.
+
+Starts bench/fake_api.py and replays --requests completions drawn from
+--distinct different prompts, with Zipf-distributed popularity (--skew), the
+way a few phrases get dictated over and over. The cache lives in a temporary
+directory. Reports cache hits and misses, the best hit rate the workload
+allows (every repeat served from the cache), the requests that reached the
+server, and p50 latency of hits and misses.
+
+With --stats, prints the counters of your own cache (~/.cache/voice_entry)
+instead.
+
+Usage:
+    python bench/cache_hit_rate.py [--requests 200] [--distinct 40] [--skew 1.1] [--ttl 600]
+    python bench/cache_hit_rate.py --stats
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_api import FakeAPI  # noqa: E402
+from harness import PROJECT_ROOT, fake_config  # noqa: E402
+
+
+def _workload(requests: int, distinct: int, skew: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    weights = [1 / (rank ** skew) for rank in range(1, distinct + 1)]
+    return [f"dictated prompt {i}" for i in rng.choices(range(distinct), weights=weights, k=requests)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=40)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--ttl", type=float, default=600.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--stats", action="store_true", help="Print the counters of your own cache and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        sys.path.insert(0, PROJECT_ROOT)
+        from utils import cache
+        print(json.dumps(cache.stats(), indent=2))
+        return 0
+
+    api = FakeAPI(latency=args.latency).start()
+    latencies = {"hit": [], "miss": []}
+    try:
+        fake_config(api.base_url, CACHE_ENABLED=True, CACHE_TTL_SECONDS=args.ttl, TRACE_ENABLED=False)
+        from utils import cache, openai, trace
+        # cache reads its paths on every connect, so they can be moved in place
+        cache.CACHE_DIR = tempfile.mkdtemp(prefix="voice_entry_bench_cache_")
+        cache.CACHE_DB = os.path.join(cache.CACHE_DIR, "responses.sqlite3")
+
+        workload = _workload(args.requests, args.distinct, args.skew)
+        failed = 0
+        for prompt in workload:
+            before = api.counters["ok"]
+            start = time.monotonic()
+            if not openai.get_completion(prompt):
+                failed += 1
+            kind = "miss" if api.counters["ok"] > before else "hit"
+            latencies[kind].append((time.monotonic() - start) * 1000)
+        stats = cache.stats()
+    finally:
+        api.stop()
+
+    report = {
+        "requests": len(workload),
+        "distinct_prompts": len(set(workload)),
+        "failed": failed,
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "hit_rate": round(stats["hit_rate"], 3),
+        "best_hit_rate": round(1 - len(set(workload)) / len(workload), 3),
+        "server_requests": api.counters["ok"],
+        **{f"{kind}_p50_ms": round(trace.percentile(sorted(ms), 50), 2) for kind, ms in latencies.items() if ms},
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
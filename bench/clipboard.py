@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""Check and time the clipboard backends against a real X server.
+
+Meant to run under Xvfb:
+
+    xvfb-run -a python bench/clipboard.py [--iterations 200]
+
+Round-trips small and large (INCR-sized) text between two in-process
+selection owners, and between the in-process owner and xclip when xclip is
+installed, then reports median read and write times per backend as JSON.
+Exits non-zero if any round trip loses or changes the text.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils import clipboard  # noqa: E402
+
+SMALL = "Voice entry clipboard check: ünïcödé ✓"
+# Bigger than one X request, so it has to go through INCR
+LARGE = "".join(f"line {i} of a large document\n" for i in range(60000))
+
+
+def _median_us(fn: Callable[[], object], iterations: int) -> float:
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1e6, 1)
+
+
+def _check(name: str, expected: str, actual, failures: List[str]) -> None:
+    ok = actual == expected.strip()
+    print(f"{'ok  ' if ok else 'FAIL'} {name}", file=sys.stderr)
+    if not ok:
+        failures.append(name)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if not os.environ.get("DISPLAY"):
+        print("No DISPLAY; run under xvfb-run", file=sys.stderr)
+        return 2
+
+    failures: List[str] = []
+    timings: Dict[str, Dict[str, float]] = {}
+    owner, reader = clipboard.XlibBackend(), clipboard.XlibBackend()
+    try:
+        for selection in ("clipboard", "primary"):
+            for label, text in (("small", SMALL), ("large", LARGE)):
+                owner.set(selection, text)
+                _check(f"xlib -> xlib {selection} {label}", text, reader.get(selection), failures)
+        owner.set("clipboard", SMALL)
+        _check("owner reads its own selection", SMALL, owner.get("clipboard"), failures)
+
+        timings["xlib"] = {
+            "set_us": _median_us(lambda: owner.set("clipboard", SMALL), args.iterations),
+            "get_owned_us": _median_us(lambda: owner.get("clipboard"), args.iterations),
+            "get_foreign_us": _median_us(lambda: reader.get("clipboard"), args.iterations),
+        }
+
+        if shutil.which("xclip"):
+            xclip = clipboard.XclipBackend()
+            for label, text in (("small", SMALL), ("large", LARGE)):
+                owner.set("clipboard", text)
+                _check(f"xlib -> xclip {label}", text, xclip.get("clipboard"), failures)
+                xclip.set("clipboard", text)
+                time.sleep(0.1)  # xclip's forked child takes the selection asynchronously
+                _check(f"xclip -> xlib {label}", text, reader.get("clipboard"), failures)
+            iterations = max(1, args.iterations // 10)
+            timings["xclip"] = {
+                "set_us": _median_us(lambda: xclip.set("clipboard", SMALL), iterations),
+                "get_us": _median_us(lambda: xclip.get("clipboard"), iterations),
+            }
+        else:
+            print("xclip not installed, skipping xclip round trips", file=sys.stderr)
+    finally:
+        owner.close()
+        reader.close()
+
+    print(json.dumps({"timings": timings, "failures": failures}, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
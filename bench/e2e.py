@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+
+"""End-to-end latency, CPU and memory benchmark for every mode.
+
+Runs voice_entry.py as real processes against bench/fake_api.py, with the
+desktop replaced by recording fakes from bench/fakes: xclip and the
+clipboard are files, xdotool sleeps as long as real typing would, Notify
+and PyAudio are stand-in modules, and goose is a stub. The fake microphone
+plays synthetic WAV fixtures of the requested lengths.
+
+Each mode is measured on two paths:
+
+- recording: start `voice_entry.py record`, let the fixture play, then
+  trigger the mode; latency runs from the trigger to the recorder exiting
+- clipboard: run the mode with nothing recording, on seeded clipboard text
+
+and reports, per run, the wall-clock latency, the time until the first
+output landed (clipboard write, typed text or Goose run), the CPU time and
+the peak RSS of the processes involved. The summary holds medians per path,
+mode and fixture length. Pass --compare with an earlier report to print the
+change in median latency, e.g. between two commits.
+
+The "typing" section measures each typing strategy (keystrokes, paste,
+chunked) on texts of --typing-chars lengths, in characters per second.
+
+The "pipeline" section records the fixtures back to back, longest first,
+starting each recording as soon as the previous one is stopped. It reports
+the wall-clock time from the first stop until every result is delivered,
+the sum of the same dictations' serial latencies, and whether the results
+reached the clipboard in the order they were recorded.
+
+Usage:
+    python bench/e2e.py [--fixtures 2,10,30] [--runs 3] [--latency 0.2] [--output report.json]
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_api import FakeAPI  # noqa: E402
+from harness import PROJECT_ROOT, fake_config, python_command, voice_entry_command, write_fixture  # noqa: E402
+
+FAKES_DIR = os.path.join(PROJECT_ROOT, "bench", "fakes")
+
+MODES = ["record", "completion", "edit", "type", "type_completion", "goose", "perplexity", "append"]
+
+# Fake tool events that mean output reached the user
+OUTPUT_EVENTS = {("xclip", "write"), ("xdotool", "type"), ("xdotool", "paste"), ("goose", "run")}
+
+TYPING_STRATEGIES = ["type", "paste", "chunked"]
+
+# Runs one typing strategy in a fresh process and prints how long delivery took
+_TYPING_PROBE = (
+    "import sys, time\n"
+    "from utils import typing\n"
+    "text = sys.stdin.read()\n"
+    "start = time.perf_counter()\n"
+    "typing.deliver(text, press_enter=False, strategy=sys.argv[1])\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+CLIPBOARD_TEXT = "The quick brown fox jumps over the lazy dog. Summarize this sentence in five words."
+
+
+class Bench:
+    """Private temp dir, event log and fake desktop for one benchmark session."""
+
+    def __init__(self, env: Dict[str, str], tmp: str) -> None:
+        self.tmp = tmp
+        self.events_path = os.path.join(tmp, "events.jsonl")
+        self.env = {
+            **env,
+            # Own TMPDIR: no daemon socket, PID or lock files shared with a real session
+            "TMPDIR": tmp,
+            "PYTHONPATH": os.pathsep.join([FAKES_DIR, env["PYTHONPATH"]]),
+            "PATH": os.pathsep.join([os.path.join(FAKES_DIR, "bin"), env.get("PATH", "")]),
+            "VOICE_ENTRY_BENCH_EVENTS": self.events_path,
+            "VOICE_ENTRY_BENCH_STATE": tmp,
+            "VOICE_ENTRY_LOG_FILE": os.path.join(tmp, "voice_entry.log"),
+            "VOICE_ENTRY_TRACE_FILE": os.path.join(tmp, "trace.jsonl"),
+        }
+
+    def events(self, since: float = 0.0) -> List[dict]:
+        if not os.path.exists(self.events_path):
+            return []
+        with open(self.events_path) as f:
+            return [e for e in map(json.loads, f) if e["time"] >= since]
+
+    def seed(self, clipboard: str, primary: str) -> None:
+        for name, text in (("clipboard", clipboard), ("primary", primary)):
+            with open(os.path.join(self.tmp, name), "w") as f:
+                f.write(text)
+
+    def first_output(self, since: float) -> Optional[float]:
+        times = [e["time"] for e in self.events(since) if (e["tool"], e.get("event")) in OUTPUT_EVENTS]
+        return min(times) - since if times else None
+
+    def lost_frames(self, since: float) -> int:
+        """Frames the recorders dropped or overran since `since`, from the fake mic's capture stats."""
+        return sum(e["dropped_frames"] + e["overflows"] for e in self.events(since)
+                   if e["tool"] == "pyaudio" and e.get("event") == "capture_stats")
+
+    def wait_for(self, tool: str, event: str, since: float, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if any(e["tool"] == tool and e.get("event") == event for e in self.events(since)):
+                return True
+            time.sleep(0.01)
+        return False
+
+
+def _wait(process: subprocess.Popen, timeout: float) -> Tuple[float, int]:
+    """Reap a child and return its (CPU seconds, peak RSS in KiB)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+        if time.monotonic() > deadline:
+            process.kill()
+            raise TimeoutError(f"{process.args} did not finish within {timeout}s")
+        time.sleep(0.005)
+
+
+def _spawn(bench: Bench, args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    return subprocess.Popen(voice_entry_command(*args), env=env or bench.env, cwd=PROJECT_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_recording(bench: Bench, mode: str, fixture: str, timeout: float) -> dict:
+    """Record a fixture, trigger `mode` and measure until the recorder exits."""
+    bench.seed(CLIPBOARD_TEXT, CLIPBOARD_TEXT)
+    started = time.time()
+    recorder = _spawn(bench, ["record"], {**bench.env, "VOICE_ENTRY_BENCH_WAV": fixture})
+    if not bench.wait_for("pyaudio", "audio_done", started, timeout):
+        recorder.kill()
+        raise TimeoutError("fixture did not finish playing")
+
+    t0 = time.time()
+    trigger_cpu, trigger_rss = _wait(_spawn(bench, [mode]), timeout)
+    recorder_cpu, recorder_rss = _wait(recorder, timeout)
+    latency = time.time() - t0
+    first_output = bench.first_output(t0)
+    return {
+        "latency_ms": round(latency * 1000, 1),
+        "first_output_ms": round(first_output * 1000, 1) if first_output is not None else None,
+        "cpu_ms": round((trigger_cpu + recorder_cpu) * 1000, 1),
+        "peak_rss_kb": max(trigger_rss, recorder_rss),
+        "lost_frames": bench.lost_frames(started),
+    }
+
+
+def run_clipboard(bench: Bench, mode: str, timeout: float) -> dict:
+    """Run `mode` with nothing recording, on seeded clipboard and selection text."""
+    bench.seed(CLIPBOARD_TEXT, CLIPBOARD_TEXT)
+    t0 = time.time()
+    cpu, rss = _wait(_spawn(bench, [mode]), timeout)
+    latency = time.time() - t0
+    first_output = bench.first_output(t0)
+    return {
+        "latency_ms": round(latency * 1000, 1),
+        "first_output_ms": round(first_output * 1000, 1) if first_output is not None else None,
+        "cpu_ms": round(cpu * 1000, 1),
+        "peak_rss_kb": rss,
+    }
+
+
+def run_typing(bench: Bench, strategy: str, chars: int, timeout: float) -> dict:
+    """Deliver `chars` characters with one typing strategy and measure the throughput."""
+    bench.seed(CLIPBOARD_TEXT, CLIPBOARD_TEXT)
+    text = ("The quick brown fox jumps over the lazy dog. " * (chars // 45 + 1))[:chars]
+    t0 = time.time()
+    result = subprocess.run(python_command(_TYPING_PROBE, strategy), input=text, capture_output=True,
+                            text=True, env=bench.env, cwd=PROJECT_ROOT, timeout=timeout, check=True)
+    seconds = float(result.stdout.strip().splitlines()[-1])
+    events = bench.events(t0)
+    delivered = sum(e["chars"] for e in events if e["tool"] == "xdotool" and e.get("event") in ("type", "paste"))
+    with open(os.path.join(bench.tmp, "clipboard")) as f:
+        restored = f.read() == CLIPBOARD_TEXT
+    return {
+        "strategy": strategy,
+        "chars": chars,
+        "seconds": round(seconds, 4),
+        "chars_per_second": round(chars / seconds, 1),
+        "delivered_chars": delivered,
+        "clipboard_restored": restored,
+    }
+
+
+def run_pipeline(bench: Bench, fixtures: List[str], timeout: float) -> dict:
+    """Record `fixtures` back to back, stopping each one just before the next starts."""
+    bench.seed(CLIPBOARD_TEXT, CLIPBOARD_TEXT)
+    pid_file = os.path.join(bench.tmp, "voice_entry.pid")
+    recorders = []
+    begun = time.time()
+    t0 = None
+    for fixture in fixtures:
+        started = time.time()
+        recorder = _spawn(bench, ["record"], {**bench.env, "VOICE_ENTRY_BENCH_WAV": fixture})
+        recorders.append(recorder)
+        if not bench.wait_for("pyaudio", "audio_done", started, timeout):
+            raise TimeoutError("fixture did not finish playing")
+        t0 = t0 or time.time()
+        _wait(_spawn(bench, ["record"]), timeout)
+        # The next recording can start once this recorder has given up the PID file
+        deadline = time.monotonic() + timeout
+        while os.path.exists(pid_file) and time.monotonic() < deadline:
+            time.sleep(0.005)
+    for recorder in recorders:
+        _wait(recorder, timeout)
+    wall = time.time() - t0
+    delivered = [e["head"] for e in bench.events(t0) if e["tool"] == "xclip" and e.get("event") == "write"]
+    # Transcripts name the upload size, and longer fixtures were recorded first
+    sizes = [int(head.split()[3]) for head in delivered if head.startswith("Fake transcription of")]
+    return {
+        "dictations": len(fixtures),
+        "delivered": len(sizes),
+        "wall_ms": round(wall * 1000, 1),
+        "in_order": sizes == sorted(sizes, reverse=True),
+        "lost_frames": bench.lost_frames(begun),
+    }
+
+
+def summarize(results: List[dict]) -> Dict[str, dict]:
+    """Median of each metric per path/mode/fixture."""
+    groups: Dict[str, List[dict]] = {}
+    for r in results:
+        key = f"{r['path']}/{r['mode']}" + (f"/{r['fixture_seconds']}s" if r["fixture_seconds"] is not None else "")
+        groups.setdefault(key, []).append(r)
+    summary = {}
+    for key, runs in groups.items():
+        summary[key] = {"runs": len(runs)}
+        for metric in ("latency_ms", "first_output_ms", "cpu_ms", "peak_rss_kb"):
+            values = [r[metric] for r in runs if r[metric] is not None]
+            summary[key][metric] = statistics.median(values) if values else None
+    return summary
+
+
+def compare(baseline: Dict[str, dict], summary: Dict[str, dict]) -> None:
+    """Print the change in median latency against an earlier report's summary."""
+    print(f"{'case':<40} {'before ms':>10} {'after ms':>10} {'change':>8}", file=sys.stderr)
+    for key in sorted(summary):
+        if key not in baseline:
+            continue
+        before, after = baseline[key]["latency_ms"], summary[key]["latency_ms"]
+        print(f"{key:<40} {before:>10.1f} {after:>10.1f} {(after - before) / before:>+8.1%}", file=sys.stderr)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--fixtures", default="2,10,30", help="Recording lengths in seconds")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--speed", type=float, default=10.0, help="Fixture playback speed (1 = real time, 0 = instant, which overruns the capture buffer)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake API latency per request, seconds")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between streamed chunks")
+    parser.add_argument("--reply-words", type=int, default=40)
+    parser.add_argument("--seconds-per-mb", type=float, default=0.5, help="Extra transcription time per MB uploaded")
+    parser.add_argument("--goose-seconds", type=float, default=0.2)
+    parser.add_argument("--typing-chars", default="50,500,3000", help="Text lengths for the typing strategies")
+    parser.add_argument("--pipeline", type=int, default=1, help="Back-to-back pipeline runs (0 to skip)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra config.py setting, e.g. --set AUDIO_ENCODING='flac'")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Earlier report to compare median latencies against")
+    args = parser.parse_args(argv)
+
+    # The fakes stand in for xclip, so never pick up a real Wayland session
+    # Pasting is opt-in; enable it so the paste strategy can be measured
+    settings = {"TRACE_ENABLED": False, "CLIPBOARD_BACKEND": "xclip", "TYPE_PASTE_KEYS": "ctrl+v"}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        settings[key] = ast.literal_eval(value)
+
+    modes = args.modes.split(",")
+    fixture_lengths = [float(s) for s in args.fixtures.split(",")]
+    api = FakeAPI(latency=args.latency, token_delay=args.token_delay, reply_words=args.reply_words,
+                  seconds_per_mb=args.seconds_per_mb).start()
+    results = []
+    typing_results = []
+    pipeline_results = []
+    try:
+        env = fake_config(api.base_url, **settings)
+        env["VOICE_ENTRY_BENCH_SPEED"] = str(args.speed)
+        env["VOICE_ENTRY_BENCH_GOOSE_SECONDS"] = str(args.goose_seconds)
+        with tempfile.TemporaryDirectory(prefix="voice_entry_e2e_") as tmp:
+            bench = Bench(env, tmp)
+            fixtures = {s: write_fixture(os.path.join(tmp, f"fixture_{s:g}s.wav"), s) for s in fixture_lengths}
+            for run in range(args.runs):
+                for mode in modes:
+                    for seconds, fixture in fixtures.items():
+                        result = run_recording(bench, mode, fixture, args.timeout)
+                        results.append({"path": "recording", "mode": mode, "fixture_seconds": seconds, "run": run, **result})
+                    if mode != "record":
+                        result = run_clipboard(bench, mode, args.timeout)
+                        results.append({"path": "clipboard", "mode": mode, "fixture_seconds": None, "run": run, **result})
+                    print(f"run {run + 1}/{args.runs}: {mode} done", file=sys.stderr)
+            for chars in (int(c) for c in args.typing_chars.split(",") if c):
+                for strategy in TYPING_STRATEGIES:
+                    typing_results.append(run_typing(bench, strategy, chars, args.timeout))
+            ordered = [fixtures[s] for s in sorted(fixtures, reverse=True)]
+            for _ in range(args.pipeline):
+                result = run_pipeline(bench, ordered, args.timeout)
+                serial = [r["latency_ms"] for r in results if r["path"] == "recording" and r["mode"] == "record"]
+                result["serial_ms"] = round(sum(serial) / args.runs, 1) if serial else None
+                pipeline_results.append(result)
+    finally:
+        api.stop()
+
+    report = {
+        "commit": _git_commit(),
+        "settings": {**vars(args), "config": settings},
+        "api": api.counters,
+        "summary": summarize(results),
+        "typing": typing_results,
+        "pipeline": pipeline_results,
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f)["summary"], report["summary"])
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    lost = sum(r["lost_frames"] for r in results + pipeline_results if r.get("lost_frames"))
+    if lost:
+        print(f"FAIL: recorders lost {lost} frames of audio; results were measured on truncated recordings", file=sys.stderr)
+        return 1
+    if results and not api.counters["requests"]:
+        # Every mode transcribes or calls a model, so the dictations went somewhere else
+        print("FAIL: the fake API received no requests", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""Compare patch, single-request rewrite and sharded rewrite edits of large documents.
+
+Starts bench/fake_api.py with generation time proportional to the length of
+each answer (--seconds-per-kchar) and a max_tokens cutoff, then edits
+synthetic Markdown documents of --sizes characters three ways:
+
+- patch: the default EDIT_MODE, one request answered with a small hunk
+- rewrite: EDIT_MODE = "rewrite" as a single request (sharding disabled)
+- sharded: EDIT_MODE = "rewrite" through the shard engine (utils/shard.py)
+
+Sharding only replaces the single-request rewrite (patch mode falls back to
+it only when a patch doesn't apply), so "sharded" should beat "rewrite";
+"patch" is the baseline for the default configuration. The fake answers
+rewrites with the original text and patches with a no-op hunk, so a correct
+edit returns the document byte for byte; the fake router's answer can't be
+parsed, so every shard is edited (the sharded path's worst case).
+
+Reports wall-clock time per size and path, and whether the result matched.
+
+Usage:
+    python bench/edit.py [--sizes 4000,16000,48000] [--seconds-per-kchar 0.5] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_api import FakeAPI  # noqa: E402
+from harness import fake_config  # noqa: E402
+
+WORDS = "the voice entry tool records audio and turns it into text for editing documents quickly".split()
+
+
+def make_document(chars: int, seed: int = 0) -> str:
+    """Markdown with headings, paragraphs and fenced code blocks, about `chars` long."""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    section = 0
+    while size < chars:
+        if section % 3 == 0:
+            block = f"## Section {section}\n\n"
+        elif section % 5 == 4:
+            block = "```python\n" + "".join(f"value_{i} = {rng.randint(0, 99)}\n" for i in range(rng.randint(3, 12))) + "```\n\n"
+        else:
+            block = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 160))).capitalize() + ".\n\n"
+        parts.append(block)
+        size += len(block)
+        section += 1
+    return "".join(parts)
+
+
+def _time_edit(openai, document: str) -> dict:
+    start = time.monotonic()
+    result = openai.get_edit("Fix any typos", lambda: document)
+    elapsed = time.monotonic() - start
+    return {"seconds": round(elapsed, 3), "identical": result == document, "failed": result is None}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="4000,16000,48000")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--seconds-per-kchar", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    api = FakeAPI(latency=args.latency, seconds_per_kchar=args.seconds_per_kchar).start()
+    results = []
+    try:
+        fake_config(api.base_url, TRACE_ENABLED=False,
+                    EDIT_SHARD_WORKERS=args.workers, API_RATE_LIMITS={"openai": {"concurrency": args.workers + 1}})
+        # utils.openai reads EDIT_MODE on every edit and utils.shard reads its
+        # tunables at import, so both can be changed in place
+        import config
+        from utils import openai, shard
+        sharded_chars = shard.MAX_CHARS
+        for size in (int(s) for s in args.sizes.split(",")):
+            document = make_document(size)
+            config.EDIT_MODE = "patch"
+            patch = _time_edit(openai, document)
+            config.EDIT_MODE = "rewrite"
+            shard.MAX_CHARS = len(document) + 1
+            single = _time_edit(openai, document)
+            shard.MAX_CHARS = sharded_chars
+            sharded = _time_edit(openai, document)
+            results.append({
+                "chars": len(document),
+                "shards": len(shard.split(document)),
+                "patch": patch,
+                "rewrite": single,
+                "sharded": sharded,
+            })
+            print(f"{len(document)} chars done", file=sys.stderr)
+    finally:
+        api.stop()
+
+    print(json.dumps({"results": results, "server": api.counters}, indent=2))
+    return 0 if all(r[path]["identical"] for r in results for path in ("patch", "sharded")) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+"""Local stand-in for the OpenAI and Perplexity HTTP APIs.
+
+Implements just enough of the transcription and chat-completions endpoints
+for voice_entry, with knobs for latency and injected failures:
+
+- latency: seconds to wait before answering each request
+- throttle_every: answer every Nth request with 429 and a Retry-After header
+- retry_after: value of that Retry-After header, in seconds
+- error_rate: fraction of requests answered with a random 5xx
+- token_delay: seconds between chunks of a streamed completion
+- reply_words: pad each completion to at least this many words
+- seconds_per_mb: extra transcription time per megabyte of uploaded audio
+- slow_model / slow_rate / slow_seconds: delay that fraction of requests
+  for that model by that long, to simulate a model's latency tail
+- seconds_per_kchar: generation time per 1000 characters of completion
+- max_upload_mb: answer larger transcription uploads with 413, like the
+  real API's file size limit
+
+Edit requests (prompts with an <original_text> block) are answered with
+that text unchanged; patch-mode edits (a SEARCH/REPLACE system prompt) get
+one hunk that replaces the text's first line with itself. Completions longer than max_tokens (at four
+characters per token) are cut off with finish_reason "length".
+
+Responses carry an openai-processing-ms header like the real API.
+
+Point voice_entry at it with OPENAI_BASE_URL / PERPLEXITY_BASE_URL.
+
+Usage:
+    python bench/fake_api.py --port 8765 --throttle-every 3
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class FakeAPI:
+    """Runs the stand-in server on a background thread."""
+
+    def __init__(self, latency: float = 0.0, throttle_every: int = 0, retry_after: float = 0.2,
+                 error_rate: float = 0.0, token_delay: float = 0.0, port: int = 0,
+                 reply_words: int = 0, seconds_per_mb: float = 0.0, slow_model: Optional[str] = None,
+                 slow_rate: float = 0.0, slow_seconds: float = 0.0, seconds_per_kchar: float = 0.0,
+                 max_upload_mb: float = 0.0) -> None:
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.token_delay = token_delay
+        self.reply_words = reply_words
+        self.seconds_per_mb = seconds_per_mb
+        self.slow_model = slow_model
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.seconds_per_kchar = seconds_per_kchar
+        self.max_upload_mb = max_upload_mb
+        self.counters: Dict[str, int] = {"requests": 0, "throttled": 0, "errors": 0, "ok": 0, "slow": 0,
+                                         "too_large": 0, "prompted": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, name: str) -> int:
+        with self._lock:
+            self.counters[name] += 1
+            return self.counters[name]
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                n = api._count("requests")
+                self._started = time.monotonic()
+                if api.latency:
+                    time.sleep(api.latency)
+                if api.slow_rate and self._model(body) == api.slow_model and random.random() < api.slow_rate:
+                    api._count("slow")
+                    time.sleep(api.slow_seconds)
+
+                if api.throttle_every and n % api.throttle_every == 0:
+                    api._count("throttled")
+                    return self._json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                      {"Retry-After": str(api.retry_after)})
+                if api.error_rate and random.random() < api.error_rate:
+                    api._count("errors")
+                    return self._json(random.choice([500, 502, 503]), {"error": {"message": "Injected failure"}})
+
+                if self.path.endswith("/audio/transcriptions"):
+                    if api.max_upload_mb and len(body) > api.max_upload_mb * 1e6:
+                        api._count("too_large")
+                        return self._json(413, {"error": {"message": "Maximum content size limit exceeded"}})
+                    if b'name="prompt"' in body:
+                        api._count("prompted")
+                    if api.seconds_per_mb:
+                        time.sleep(api.seconds_per_mb * len(body) / 1e6)
+                    api._count("ok")
+                    return self._json(200, {"text": f"Fake transcription of {len(body)} bytes."})
+                if self.path.endswith("/chat/completions"):
+                    request = json.loads(body or b"{}")
+                    api._count("ok")
+                    return self._chat(request)
+                self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def _model(self, body: bytes) -> Optional[str]:
+                if self.path.endswith("/chat/completions"):
+                    try:
+                        return json.loads(body or b"{}").get("model")
+                    except ValueError:
+                        return None
+                match = re.search(rb'name="model"\r\n\r\n([^\r]*)', body)
+                return match.group(1).decode() if match else None
+
+            def _chat(self, request: dict):
+                messages = request.get("messages", [])
+                prompt = messages[-1]["content"] if messages else ""
+                system = messages[0]["content"] if len(messages) > 1 else ""
+                original = re.search(r"<original_text>(.*)</original_text>", prompt, re.DOTALL)
+                if original and "<<<<<<< SEARCH" in system:
+                    first_line = original.group(1).strip().splitlines()[0]
+                    reply = f"<<<<<<< SEARCH\n{first_line}\n=======\n{first_line}\n>>>>>>> REPLACE"
+                elif original:
+                    reply = original.group(1)
+                else:
+                    reply = f"Fake answer to: {prompt}"
+                    missing = api.reply_words - len(reply.split())
+                    if missing > 0:
+                        reply += " " + " ".join(f"word{i}" for i in range(missing))
+                finish_reason = "stop"
+                max_chars = 4 * request.get("max_tokens", 0)
+                if max_chars and len(reply) > max_chars:
+                    reply, finish_reason = reply[:max_chars], "length"
+                model = request.get("model", "fake")
+                if not request.get("stream"):
+                    if api.seconds_per_kchar:
+                        time.sleep(api.seconds_per_kchar * len(reply) / 1000)
+                    return self._json(200, {
+                        "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "finish_reason": finish_reason,
+                                     "message": {"role": "assistant", "content": reply}}],
+                    })
+
+                self.send_response(200)
+                self._processing_header()
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = reply.split(" ")
+                for i, word in enumerate(words):
+                    if api.token_delay:
+                        time.sleep(api.token_delay)
+                    chunk = {
+                        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "finish_reason": None,
+                                     "delta": {"content": word if i == 0 else " " + word}}],
+                    }
+                    self._chunk(f"data: {json.dumps(chunk)}\n\n")
+                self._chunk("data: [DONE]\n\n")
+                self._chunk("")
+
+            def _chunk(self, text: str):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _processing_header(self):
+                elapsed_ms = (time.monotonic() - getattr(self, "_started", time.monotonic())) * 1000
+                self.send_header("openai-processing-ms", str(int(elapsed_ms)))
+
+            def _json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self._processing_header()
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--reply-words", type=int, default=0)
+    parser.add_argument("--seconds-per-mb", type=float, default=0.0)
+    parser.add_argument("--slow-model")
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-seconds", type=float, default=0.0)
+    parser.add_argument("--seconds-per-kchar", type=float, default=0.0)
+    parser.add_argument("--max-upload-mb", type=float, default=0.0)
+    args = parser.parse_args()
+
+    api = FakeAPI(args.latency, args.throttle_every, args.retry_after, args.error_rate, args.token_delay, args.port,
+                  args.reply_words, args.seconds_per_mb, args.slow_model, args.slow_rate, args.slow_seconds,
+                  args.seconds_per_kchar, args.max_upload_mb)
+    print(f"Fake API listening on {api.base_url}", flush=True)
+    try:
+        api._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
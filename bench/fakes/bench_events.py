@@ -0,0 +1,25 @@
+"""Event log shared by the benchmark fakes.
+
+Every fake appends one JSON line per call to $VOICE_ENTRY_BENCH_EVENTS, so
+bench/e2e.py can tell when output landed. Clipboard contents live as files
+in $VOICE_ENTRY_BENCH_STATE.
+"""
+
+import json
+import os
+import time
+
+
+def emit(tool: str, **fields) -> None:
+    """Record a call to a fake tool."""
+    path = os.environ.get("VOICE_ENTRY_BENCH_EVENTS")
+    if not path:
+        return
+    event = {"time": time.time(), "tool": tool, "pid": os.getpid(), **fields}
+    with open(path, "a") as f:
+        f.write(json.dumps(event) + "\n")
+
+
+def state_path(name: str) -> str:
+    """File holding a piece of fake desktop state, e.g. the clipboard."""
+    return os.path.join(os.environ.get("VOICE_ENTRY_BENCH_STATE", "/tmp"), name)
@@ -0,0 +1,5 @@
+"""Stand-in for PyGObject, providing only gi.repository.Notify."""
+
+
+def require_version(namespace: str, version: str) -> None:
+    pass
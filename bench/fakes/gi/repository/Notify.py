@@ -0,0 +1,29 @@
+"""Stand-in for libnotify that logs notifications to the benchmark event log."""
+
+import bench_events
+
+
+def init(app_name: str) -> bool:
+    bench_events.emit("notify", event="init")
+    return True
+
+
+class Notification:
+    def __init__(self, title: str, body: str) -> None:
+        self.title = title
+        self.body = body
+
+    @classmethod
+    def new(cls, title: str, body: str, icon) -> "Notification":
+        return cls(title, body)
+
+    def update(self, title: str, body: str, icon) -> bool:
+        self.title, self.body = title, body
+        return True
+
+    def show(self) -> bool:
+        bench_events.emit("notify", event="show", title=self.title, chars=len(self.body or ""))
+        return True
+
+    def close(self) -> bool:
+        return True
@@ -0,0 +1,67 @@
+"""Stand-in for PyAudio that "records" a WAV fixture.
+
+The input stream plays $VOICE_ENTRY_BENCH_WAV through the stream callback,
+$VOICE_ENTRY_BENCH_SPEED times faster than real time (default 10, which the
+capture ring buffer keeps up with; 0 = as fast as possible, which overruns
+it on long fixtures), then goes quiet and emits an "audio_done" event.
+
+When the stream is closed it emits a "capture_stats" event with the
+capturing engine's stats, so the bench can fail runs that lost audio.
+"""
+
+import os
+import threading
+import time
+import wave
+
+import bench_events
+
+paInt16 = 8
+paContinue = 0
+paInputOverflow = 2
+
+
+class Stream:
+    def __init__(self, rate: int, channels: int, frames_per_buffer: int, stream_callback) -> None:
+        self._callback = stream_callback
+        # The utils.capture.CaptureEngine the callback belongs to, if any
+        self._engine = getattr(stream_callback, "__self__", None)
+        self._frames_per_buffer = frames_per_buffer
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._play, daemon=True)
+        self._thread.start()
+
+    def _play(self) -> None:
+        path = os.environ.get("VOICE_ENTRY_BENCH_WAV")
+        speed = float(os.environ.get("VOICE_ENTRY_BENCH_SPEED", "10"))
+        if path:
+            with wave.open(path, "rb") as w:
+                rate = w.getframerate()
+                while not self._stopped.is_set():
+                    data = w.readframes(self._frames_per_buffer)
+                    if not data:
+                        break
+                    self._callback(data, self._frames_per_buffer, {}, 0)
+                    if speed:
+                        time.sleep(self._frames_per_buffer / rate / speed)
+        bench_events.emit("pyaudio", event="audio_done")
+
+    def stop_stream(self) -> None:
+        self._stopped.set()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        if hasattr(self._engine, "stats"):
+            bench_events.emit("pyaudio", event="capture_stats", **self._engine.stats())
+
+
+class PyAudio:
+    def get_sample_size(self, sample_format: int) -> int:
+        return 2
+
+    def open(self, rate: int, channels: int, frames_per_buffer: int = 1024, stream_callback=None, **kwargs) -> Stream:
+        return Stream(rate, channels, frames_per_buffer, stream_callback)
+
+    def terminate(self) -> None:
+        pass
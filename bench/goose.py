@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""Check and time the streaming Goose runner against the fake goose CLI.
+
+Runs utils.goose in-process with bench/fakes on PATH and reports:
+
+- early delivery: how long after the run started the answer reached the
+  clipboard, and how long until the goose process exited (the fake lingers
+  for --exit-seconds after its last message, like real extension shutdown)
+- a scripted transcript with several assistant messages, where only the
+  last one must land on the clipboard
+- cancellation: a long run stopped with goose.cancel() must return promptly
+  without touching the clipboard
+- the concurrency cap: with more runs started at once than
+  GOOSE_MAX_CONCURRENT, no more than that many goose processes may be
+  running at any time, and every run must still deliver its answer
+
+Prints the timings as JSON and exits non-zero if any check fails.
+
+Usage:
+    python bench/goose.py [--goose-seconds 0.5] [--exit-seconds 1.0]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import PROJECT_ROOT, fake_config  # noqa: E402
+
+FAKES_DIR = os.path.join(PROJECT_ROOT, "bench", "fakes")
+
+SCRIPT = [
+    {"delay": 0.05, "event": {"type": "message", "message": {"id": "a", "role": "assistant", "content": [{"type": "text", "text": "Looking at {instructions}"}]}}},
+    {"delay": 0.05, "event": {"type": "message", "message": {"id": "b", "role": "assistant", "content": [{"type": "text", "text": "Final "}]}}},
+    {"delay": 0.05, "event": {"type": "message", "message": {"id": "b", "role": "assistant", "content": [{"type": "text", "text": "answer"}]}}},
+    {"delay": 0, "event": {"type": "complete"}},
+]
+
+
+def _events(path: str, tool: str, event: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [e for e in map(json.loads, f) if e["tool"] == tool and e.get("event") == event]
+
+
+def _check(name: str, ok: bool, failures: List[str]) -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {name}", file=sys.stderr)
+    if not ok:
+        failures.append(name)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--goose-seconds", type=float, default=0.5)
+    parser.add_argument("--exit-seconds", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    fake_config("http://127.0.0.1:9", TRACE_ENABLED=False, CLIPBOARD_BACKEND="xclip")
+    sys.path.insert(0, FAKES_DIR)
+    tmp = tempfile.mkdtemp(prefix="voice_entry_goose_")
+    events = os.path.join(tmp, "events.jsonl")
+    os.environ.update({
+        "PATH": os.pathsep.join([os.path.join(FAKES_DIR, "bin"), os.environ.get("PATH", "")]),
+        "VOICE_ENTRY_BENCH_EVENTS": events,
+        "VOICE_ENTRY_BENCH_STATE": tmp,
+        "VOICE_ENTRY_BENCH_GOOSE_SECONDS": str(args.goose_seconds),
+        "VOICE_ENTRY_BENCH_GOOSE_EXIT_SECONDS": str(args.exit_seconds),
+    })
+    from utils import clipboard, goose
+
+    failures: List[str] = []
+    timings = {}
+
+    start = time.time()
+    result = goose.run_goose("tidy the desktop")
+    returned = time.time()
+    _check("answer copied", clipboard.get_clipboard() == "Goose did: tidy the desktop", failures)
+    _check("run returns the answer", result == "Goose did: tidy the desktop", failures)
+    deadline = time.monotonic() + args.exit_seconds + 5
+    while not _events(events, "goose", "exit") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writes = _events(events, "xclip", "write")
+    exits = _events(events, "goose", "exit")
+    if writes and exits:
+        timings["clipboard_ms"] = round((writes[0]["time"] - start) * 1000, 1)
+        timings["process_exit_ms"] = round((exits[0]["time"] - start) * 1000, 1)
+        timings["returned_ms"] = round((returned - start) * 1000, 1)
+        _check("answer delivered before goose exited", writes[0]["time"] < exits[0]["time"], failures)
+    else:
+        _check("clipboard written and goose exited", False, failures)
+
+    script = os.path.join(tmp, "script.jsonl")
+    with open(script, "w") as f:
+        f.writelines(json.dumps(step) + "\n" for step in SCRIPT)
+    os.environ["VOICE_ENTRY_BENCH_GOOSE_SCRIPT"] = script
+    os.environ["VOICE_ENTRY_BENCH_GOOSE_EXIT_SECONDS"] = "0"
+    goose.run_goose("the logs")
+    _check("last assistant message copied", clipboard.get_clipboard() == "Final answer", failures)
+    del os.environ["VOICE_ENTRY_BENCH_GOOSE_SCRIPT"]
+
+    clipboard.set_clipboard("untouched")
+    os.environ["VOICE_ENTRY_BENCH_GOOSE_SECONDS"] = "30"
+    threading.Timer(0.3, goose.cancel).start()
+    start = time.monotonic()
+    result = goose.run_goose("never finishes")
+    timings["cancel_ms"] = round((time.monotonic() - start) * 1000, 1)
+    _check("cancelled run returns nothing", result is None, failures)
+    _check("cancelled run returns promptly", timings["cancel_ms"] < 2000, failures)
+    _check("cancelled run leaves the clipboard alone", clipboard.get_clipboard() == "untouched", failures)
+
+    os.environ["VOICE_ENTRY_BENCH_GOOSE_SECONDS"] = "0.5"
+    peak = 0
+    jobs = goose.MAX_CONCURRENT + 1
+    results: List[str] = []
+    runs = [threading.Thread(target=lambda i=i: results.append(goose.run_goose(f"job {i}"))) for i in range(jobs)]
+    for run in runs:
+        run.start()
+    while any(run.is_alive() for run in runs):
+        with goose._running_lock:
+            peak = max(peak, len(goose._running))
+        time.sleep(0.01)
+    timings["peak_concurrent"] = peak
+    _check("concurrency cap holds", 0 < peak <= goose.MAX_CONCURRENT, failures)
+    _check("every capped run answers", sorted(results) == sorted(f"Goose did: job {i}" for i in range(jobs)), failures)
+
+    print(json.dumps({"timings": timings, "failures": failures}, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
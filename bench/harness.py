@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""Shared setup for the benchmark scripts.
+
+Benchmarks run voice_entry against bench/fake_api.py, so they need a
+config.py with dummy keys and the fake server's URLs instead of the user's
+real one. `fake_config()` writes such a config.py to a temporary directory
+and puts it first on sys.path (and PYTHONPATH, for subprocesses); the log
+and traces are written to the same directory.
+Subprocesses must be started with `voice_entry_command()` or
+`python_command()`: a plain `python voice_entry.py` puts the project root
+first on sys.path, where a real config.py would shadow the fake one.
+`write_fixture()` synthesizes speech-like WAV recordings of a given length.
+"""
+
+import array
+import math
+import os
+import random
+import sys
+import tempfile
+import wave
+from typing import Any, Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOICE_ENTRY = os.path.join(PROJECT_ROOT, "voice_entry.py")
+
+# Prepended to code run with `python -c`: drops the working directory that
+# Python puts first on sys.path, so the bench config on PYTHONPATH is the
+# config.py that gets imported, and refuses to run if it isn't.
+_USE_BENCH_CONFIG = (
+    "import os, sys\n"
+    "sys.path.pop(0)\n"
+    "import config\n"
+    "if os.path.dirname(os.path.abspath(config.__file__)) != os.environ['VOICE_ENTRY_BENCH_CONFIG']:\n"
+    "    sys.exit(f'bench: loaded {config.__file__} instead of the bench config')\n"
+)
+
+# Runs voice_entry.py as __main__ with the bench config
+_LAUNCHER = _USE_BENCH_CONFIG + (
+    "import runpy\n"
+    "sys.argv[0] = " + repr(VOICE_ENTRY) + "\n"
+    "runpy.run_path(sys.argv[0], run_name='__main__')\n"
+)
+
+
+def fake_config(base_url: str, **settings: Any) -> Dict[str, str]:
+    """Write a benchmark config.py and make it the one voice_entry imports.
+
+    Args:
+        base_url: The fake API's base URL, used for both providers
+        settings: Extra config.py settings, e.g. CACHE_ENABLED=False
+
+    Returns:
+        Environment for subprocesses that should use the same config
+    """
+    config_dir = tempfile.mkdtemp(prefix="voice_entry_bench_")
+    values = {
+        "OPENAI_API_KEY": "bench-key",
+        "PERPLEXITY_API_KEY": "bench-key",
+        "OPENAI_BASE_URL": base_url,
+        "PERPLEXITY_BASE_URL": base_url,
+        "CACHE_ENABLED": False,
+        **settings,
+    }
+    with open(os.path.join(config_dir, "config.py"), "w") as f:
+        for key, value in values.items():
+            f.write(f"{key} = {value!r}\n")
+
+    # The log and traces stay in the temp dir instead of the user's state dir
+    os.environ["VOICE_ENTRY_LOG_FILE"] = os.path.join(config_dir, "voice_entry.log")
+    os.environ["VOICE_ENTRY_TRACE_FILE"] = os.path.join(config_dir, "trace.jsonl")
+
+    sys.modules.pop("config", None)
+    sys.path.insert(0, config_dir)
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(1, PROJECT_ROOT)
+    return {**os.environ, "PYTHONPATH": os.pathsep.join([config_dir, PROJECT_ROOT]), "VOICE_ENTRY_BENCH_CONFIG": config_dir}
+
+
+def voice_entry_command(*args: str) -> List[str]:
+    """Command line running `voice_entry.py <args>` with the config from fake_config()."""
+    return [sys.executable, "-c", _LAUNCHER, *args]
+
+
+def python_command(code: str, *args: str) -> List[str]:
+    """Command line running `python -c <code> <args>` with the config from fake_config()."""
+    return [sys.executable, "-c", _USE_BENCH_CONFIG + code, *args]
+
+
+def write_fixture(path: str, seconds: float, rate: int = 16000, seed: int = 0) -> str:
+    """Write a mono 16-bit WAV that alternates voiced bursts and pauses.
+
+    Bursts are 0.3-2 s of amplitude-modulated harmonics, pauses 0.2-0.8 s of
+    faint noise, so silence trimming and pause detection have something to find.
+    """
+    rng = random.Random(seed)
+    samples = array.array("h")
+    total = int(seconds * rate)
+    voiced = True
+    while len(samples) < total:
+        length = min(total - len(samples), int(rate * (rng.uniform(0.3, 2.0) if voiced else rng.uniform(0.2, 0.8))))
+        if voiced:
+            pitch = rng.uniform(100, 220)
+            for i in range(length):
+                t = i / rate
+                envelope = math.sin(math.pi * i / length) * (0.6 + 0.4 * math.sin(2 * math.pi * 4 * t))
+                tone = math.sin(2 * math.pi * pitch * t) + 0.5 * math.sin(4 * math.pi * pitch * t)
+                samples.append(int(8000 * envelope * tone))
+        else:
+            samples.extend(rng.randint(-60, 60) for _ in range(length))
+        voiced = not voiced
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    return path
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+"""Measure what hedged requests do to tail latency.
+
+Starts bench/fake_api.py with a latency tail on the primary model (a
+fraction of gpt-4o-mini requests are delayed by --slow-seconds), then runs
+the same sequence of completions without hedging and with a hedge to a
+backup model after --after-seconds. Reports p50/p95/p99 latency for both
+runs and the hedge counters (hedges fired, won by the backup, denied by the
+budget).
+
+Usage:
+    python bench/hedge.py [--requests 40] [--slow-rate 0.1] [--slow-seconds 2] [--after-seconds 0.3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_api import FakeAPI  # noqa: E402
+from harness import fake_config  # noqa: E402
+
+
+def _run(requests: int) -> dict:
+    from utils import openai, trace
+    latencies = []
+    failed = 0
+    for i in range(requests):
+        start = time.monotonic()
+        if not openai.get_completion(f"request {i}"):
+            failed += 1
+        latencies.append((time.monotonic() - start) * 1000)
+    latencies.sort()
+    return {
+        "failed": failed,
+        **{f"p{p}_ms": round(trace.percentile(latencies, p), 1) for p in (50, 95, 99)},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.1)
+    parser.add_argument("--slow-seconds", type=float, default=2.0)
+    parser.add_argument("--after-seconds", type=float, default=0.3)
+    parser.add_argument("--budget", type=float, default=0.2)
+    parser.add_argument("--backup-model", default="gpt-4.1-mini")
+    args = parser.parse_args()
+
+    api = FakeAPI(latency=args.latency, slow_model="gpt-4o-mini", slow_rate=args.slow_rate,
+                  slow_seconds=args.slow_seconds).start()
+    report = {}
+    try:
+        settings = {"CACHE_ENABLED": False, "TRACE_ENABLED": False}
+        fake_config(api.base_url, **settings)
+        report["plain"] = _run(args.requests)
+
+        policy = {"after_seconds": args.after_seconds, "backup": ("openai", args.backup_model), "budget": args.budget}
+        # utils.hedge reads the policy on every call, so the loaded config can be changed in place
+        import config
+        config.API_HEDGING = {"completion": policy}
+        from utils import hedge
+        report["hedged"] = _run(args.requests)
+        report["hedge_counters"] = hedge.counters().get("completion", {})
+    finally:
+        api.stop()
+
+    report["server"] = api.counters
+    print(json.dumps(report, indent=2))
+    return 0 if report["plain"]["failed"] == report["hedged"]["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
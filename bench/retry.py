@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+"""Exercise the API scheduler against injected throttling and server errors.
+
+Starts bench/fake_api.py with 429s and 5xx responses mixed in, then runs a
+batch of concurrent completions through utils.openai. Every request should
+still succeed; the report shows how many attempts the server saw.
+
+Usage:
+    python bench/retry.py [--requests 20] [--throttle-every 3] [--error-rate 0.1]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_api import FakeAPI  # noqa: E402
+from harness import fake_config  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--throttle-every", type=int, default=3)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    api = FakeAPI(throttle_every=args.throttle_every, retry_after=args.retry_after, error_rate=args.error_rate).start()
+    try:
+        fake_config(api.base_url, API_RATE_LIMITS={"openai": {"requests_per_second": 20, "burst": 5, "concurrency": 2}})
+        from utils import openai
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda i: openai.get_completion(f"request {i}"), range(args.requests)))
+        elapsed = time.monotonic() - start
+    finally:
+        api.stop()
+
+    succeeded = sum(1 for r in results if r)
+    print(json.dumps({
+        "requests": args.requests,
+        "succeeded": succeeded,
+        "server": api.counters,
+        "elapsed_s": round(elapsed, 3),
+    }, indent=2))
+    return 0 if succeeded == args.requests else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
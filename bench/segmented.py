@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""Compare single-upload and segmented transcription of long recordings.
+
+Starts bench/fake_api.py with transcription time proportional to upload size
+(--seconds-per-mb) and the API's 25 MB upload limit, then transcribes
+synthetic recordings of --minutes each: once as a single upload and once in
+segments cut at pauses (utils/streaming.py) for each worker count in
+--workers.
+
+Reports wall-clock time to transcript, whether it succeeded, and how many
+segments were sent with the previous segment's text as their prompt.
+
+Usage:
+    python bench/segmented.py [--minutes 5,15] [--workers 1,4] [--seconds-per-mb 1.0]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_api import FakeAPI  # noqa: E402
+from harness import fake_config, write_fixture  # noqa: E402
+
+# Length of the synthesized fixture; longer recordings repeat it
+FIXTURE_SECONDS = 60
+
+
+def _recording(pcm: bytes, minutes: float):
+    from utils import wav
+    seconds = minutes * 60
+    buffer = wav.CaptureBuffer(seconds=seconds)
+    total = int(seconds * buffer.rate) * buffer.sample_width
+    while total > 0:
+        buffer.write(pcm[:total])
+        total -= len(pcm)
+    return buffer
+
+
+def _time(transcribe) -> dict:
+    start = time.monotonic()
+    text = transcribe()
+    return {"seconds": round(time.monotonic() - start, 2), "ok": bool(text)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", default="5,15")
+    parser.add_argument("--workers", default="1,4")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--seconds-per-mb", type=float, default=1.0)
+    parser.add_argument("--max-upload-mb", type=float, default=25.0)
+    args = parser.parse_args()
+
+    api = FakeAPI(latency=args.latency, seconds_per_mb=args.seconds_per_mb, max_upload_mb=args.max_upload_mb).start()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    results = []
+    try:
+        fake_config(api.base_url, TRACE_ENABLED=False,
+                    API_RATE_LIMITS={"openai": {"concurrency": max(worker_counts) + 1}})
+        from utils import encode, streaming, transcription, wav
+        path = write_fixture(os.path.join(tempfile.mkdtemp(prefix="voice_entry_bench_"), "fixture.wav"), FIXTURE_SECONDS)
+        with wave.open(path, "rb") as w:
+            pcm = w.readframes(w.getnframes())
+
+        for minutes in (float(m) for m in args.minutes.split(",")):
+            buffer = _recording(pcm, minutes)
+            row = {
+                "minutes": minutes,
+                "upload_mb": round((wav.HEADER_SIZE + len(buffer.pcm())) / 1e6, 1),
+                "single": _time(lambda: transcription.transcribe(encode.encode_recording(buffer))),
+            }
+            for workers in worker_counts:
+                # streaming reads its tunables at import, so they can be changed in place
+                streaming.SEGMENTED_MAX_WORKERS = workers
+                prompted = api.counters["prompted"]
+                row[f"segmented_{workers}"] = {
+                    **_time(lambda: streaming.transcribe_recording(buffer)),
+                    "prompted_segments": api.counters["prompted"] - prompted,
+                }
+            results.append(row)
+            print(f"{minutes:g} minutes done", file=sys.stderr)
+    finally:
+        api.stop()
+
+    print(json.dumps({"results": results, "server": api.counters}, indent=2))
+    return 0 if all(r[f"segmented_{w}"]["ok"] for r in results for w in worker_counts) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+"""Startup-time budget check for the hotkey trigger modes.
+
+Runs `python -X importtime voice_entry.py <mode>` for every mode against a
+stand-in recorder process, so each run takes the "recording in progress"
+path that a hotkey normally hits. Fails if a mode imports one of the heavy
+packages or adds more import time than the budget.
+
+The budget covers only what voice_entry adds: interpreter and site startup
+and the `logging` package (which any Python tool pays for) are measured
+with `python -X importtime -c "import logging"` and subtracted, so the
+check doesn't depend on how fast this machine starts Python. Each mode run
+is paired with a baseline run right before it, and the median difference
+over --runs pairs is reported, so neither one slow run nor the machine
+getting busier halfway through decides the result. tests/test_startup.py runs the same
+check under pytest.
+
+Usage:
+    python bench/startup.py [--budget-ms 25] [--runs 9]
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOICE_ENTRY = os.path.join(PROJECT_ROOT, "voice_entry.py")
+
+MODES = ["record", "completion", "edit", "type", "type_completion", "goose", "perplexity", "append"]
+
+# Packages that must never be loaded just to trigger a running recorder
+FORBIDDEN = ["openai", "pyaudio", "gi", "httpx", "pydantic", "numpy"]
+
+# Stand-in recorder: ignores every signal the trigger modes send
+_RECORDER = (
+    "import signal, time\n"
+    "for s in (signal.SIGINT, signal.SIGTERM, signal.SIGUSR1, signal.SIGUSR2,\n"
+    "          signal.SIGRTMIN, signal.SIGRTMIN + 1, signal.SIGRTMIN + 2, signal.SIGRTMIN + 3):\n"
+    "    signal.signal(s, signal.SIG_IGN)\n"
+    "time.sleep(600)\n"
+)
+
+
+def _parse_importtime(stderr: str) -> Dict[str, int]:
+    """Return cumulative microseconds per top-level import."""
+    totals: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        # Nested imports are indented under their parent
+        if name.startswith("  ") and name[2:3] == " ":
+            continue
+        totals[name.strip()] = totals.get(name.strip(), 0) + int(cumulative)
+    return totals
+
+
+# Imports every run pays before voice_entry's own code
+_BASELINE = ["-c", "import logging"]
+
+# Time added per mode on top of the baseline
+BUDGET_MS = 25.0
+
+
+def _importtime(args: List[str], env: Dict[str, str]) -> Dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=PROJECT_ROOT,
+        timeout=30,
+    )
+    return _parse_importtime(result.stderr)
+
+
+def _total_ms(run: Dict[str, int]) -> float:
+    return sum(run.values()) / 1000
+
+
+def measure(runs: int = 9, modes: Optional[List[str]] = None) -> dict:
+    """Median import time of each trigger mode with a recording in progress.
+
+    Returns:
+        {"baseline_ms": ..., "modes": {mode: {"import_ms", "added_ms", "forbidden"}}}
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        # Private temp dir: no daemon socket, and the PID file points at our stand-in
+        env = {**os.environ, "TMPDIR": tmp,
+               "VOICE_ENTRY_LOG_FILE": os.path.join(tmp, "voice_entry.log"),
+               "VOICE_ENTRY_TRACE_FILE": os.path.join(tmp, "trace.jsonl")}
+        recorder = subprocess.Popen([sys.executable, "-c", _RECORDER])
+        try:
+            with open(os.path.join(tmp, "voice_entry.pid"), "w") as f:
+                f.write(str(recorder.pid))
+
+            baselines: List[float] = []
+            report = {}
+            for mode in modes or MODES:
+                pairs = [(_importtime(_BASELINE, env), _importtime([VOICE_ENTRY, mode], env)) for _ in range(runs)]
+                baselines.extend(_total_ms(base) for base, _ in pairs)
+                report[mode] = {
+                    "import_ms": round(statistics.median(_total_ms(run) for _, run in pairs), 2),
+                    "added_ms": round(statistics.median(_total_ms(run) - _total_ms(base) for base, run in pairs), 2),
+                    "forbidden": sorted({name.split(".")[0] for _, run in pairs for name in run} & set(FORBIDDEN)),
+                }
+        finally:
+            recorder.send_signal(signal.SIGKILL)
+            recorder.wait()
+    return {"baseline_ms": round(statistics.median(baselines), 2), "modes": report}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help="Maximum import time per mode on top of the bare interpreter + logging baseline")
+    parser.add_argument("--runs", type=int, default=9, help="Runs per mode; the median is reported")
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs)
+    failed = False
+    for row in result["modes"].values():
+        row["ok"] = row["added_ms"] <= args.budget_ms and not row["forbidden"]
+        failed = failed or not row["ok"]
+
+    print(json.dumps({"budget_ms": args.budget_ms, **result}, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
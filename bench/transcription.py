@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+"""Compare transcription backends on speed and accuracy.
+
+For each reference sentence in bench/samples/sentences.txt the benchmark uses
+bench/samples/sample_<n>.wav if present (drop in your own recordings of the
+sentences), otherwise it synthesizes one with espeak-ng. Each configured
+backend transcribes every sample and the report gives the real-time factor
+(processing time / audio duration, lower is faster) and the word error rate
+against the reference text.
+
+Uses your config.py, so the openai backend needs a real API key.
+
+Usage:
+    python bench/transcription.py [--backends openai,local]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from typing import List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES_DIR = os.path.join(PROJECT_ROOT, "bench", "samples")
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def _words(text: str) -> List[str]:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+
+def _sample_path(index: int, sentence: str, tmp: str) -> str:
+    path = os.path.join(SAMPLES_DIR, f"sample_{index}.wav")
+    if os.path.exists(path):
+        return path
+    path = os.path.join(tmp, f"sample_{index}.wav")
+    for tts in ("espeak-ng", "espeak"):
+        try:
+            subprocess.run([tts, "-w", path, sentence], check=True, capture_output=True)
+            return path
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            continue
+    raise SystemExit("No sample WAVs found and espeak-ng is not installed to synthesize them")
+
+
+def _duration(path: str) -> float:
+    with wave.open(path) as w:
+        return w.getnframes() / w.getframerate()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="openai,local", help="Comma-separated backend names")
+    args = parser.parse_args()
+
+    from utils import transcription
+
+    with open(os.path.join(SAMPLES_DIR, "sentences.txt")) as f:
+        sentences = [line.strip() for line in f if line.strip()]
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = [(_sample_path(i, s, tmp), s) for i, s in enumerate(sentences)]
+        audio_seconds = sum(_duration(path) for path, _ in samples)
+
+        for name in args.backends.split(","):
+            backend = transcription.get_backend(name)
+            start = time.monotonic()
+            backend.warm_up()
+            warm_up_s = time.monotonic() - start
+
+            elapsed, errors, failures = 0.0, [], 0
+            for path, reference in samples:
+                start = time.monotonic()
+                text = backend.transcribe(path)
+                elapsed += time.monotonic() - start
+                if text is None:
+                    failures += 1
+                    continue
+                errors.append(word_error_rate(reference, text))
+
+            report[name] = {
+                "samples": len(samples),
+                "failures": failures,
+                "audio_s": round(audio_seconds, 2),
+                "warm_up_s": round(warm_up_s, 3),
+                "transcribe_s": round(elapsed, 3),
+                "real_time_factor": round(elapsed / audio_seconds, 4),
+                "word_error_rate": round(sum(errors) / len(errors), 4) if errors else None,
+            }
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,7 @@ pkill -f "python.*voice_entry.py"
 echo "Cleaning up temporary files..."
 rm -f /tmp/voice_entry_audio.wav
 rm -f /tmp/voice_entry.pid
+rm -f /tmp/voice_entry.sock
 rm -f /tmp/voice_entry_text.txt
 rm -f /tmp/voice_entry_raw.wav
 
@@ -4,3 +4,125 @@ OPENAI_API_KEY = "your-api-key-here"
 
 # Perplexity API key for SonarPro (get from https://www.perplexity.ai/settings/api)
 PERPLEXITY_API_KEY = "your-api-key-here"
+
+# Transcribe the recording in segments while you are still speaking, so only
+# the final tail is uploaded after you stop (default: False)
+# STREAMING_TRANSCRIPTION = True
+# STREAMING_MIN_SEGMENT_SECONDS = 10.0  # never cut a segment shorter than this
+# STREAMING_MAX_SEGMENT_SECONDS = 30.0  # force a cut if no pause is found
+# STREAMING_PAUSE_SECONDS = 0.5         # silence needed to cut at a pause
+# STREAMING_SILENCE_RMS = 500.0         # int16 RMS below which a frame counts as silence
+# STREAMING_MAX_WORKERS = 2             # segments transcribed concurrently
+
+# Longer recordings that weren't streamed are cut at pauses after you stop and
+# the segments transcribed concurrently, instead of one upload that is slow
+# and may exceed the API's 25 MB limit (OpenAI backend only)
+# SEGMENTED_TRANSCRIPTION_SECONDS = 120.0  # segment recordings at least this long
+# SEGMENTED_MAX_SEGMENT_SECONDS = 60.0     # longest segment
+# SEGMENTED_MAX_WORKERS = 4                # segments transcribed concurrently
+
+# Recordings are kept in memory and uploaded directly. Set this to also write
+# each recording to /tmp/voice_entry_audio.wav (default: False)
+# SAVE_RECORDING = True
+
+# Compress recordings before upload: "wav" (default), "flac" or "opus".
+# FLAC/Opus need the soundfile package or ffmpeg; the log reports bytes saved
+# and encode time for each recording.
+# AUDIO_ENCODING = "flac"
+# OPUS_BITRATE = "24k"
+
+# Trim leading/trailing silence and shorten long pauses before upload
+# (needs numpy; the log reports how many seconds were removed)
+# VAD_TRIM = True
+# VAD_SILENCE_RMS = 500.0       # int16 RMS below which a frame counts as silence
+# VAD_FRAME_SECONDS = 0.03      # analysis frame length
+# VAD_PAD_SECONDS = 0.2         # silence kept around speech
+# VAD_MAX_PAUSE_SECONDS = 0.6   # longer internal pauses are shortened to this
+
+# Shared API client pool (OpenAI and Perplexity)
+# API_TIMEOUT = 60.0            # seconds to wait for a response
+# API_LONG_TIMEOUT = 600.0      # the same for transcription uploads and edits
+# API_CONNECT_TIMEOUT = 5.0     # seconds to establish a connection
+# API_MAX_CONNECTIONS = 10      # pooled connections per provider
+# API_KEEPALIVE_EXPIRY = 120.0  # seconds an idle connection stays open
+
+# Edit mode: "patch" (default) asks the model for search/replace hunks and
+# applies them locally, falling back to a full rewrite if they don't apply;
+# "rewrite" always has the model return the whole document
+# EDIT_MODE = "rewrite"
+
+# Rewrites of documents longer than EDIT_SHARD_CHARS (EDIT_MODE = "rewrite",
+# or a patch that didn't apply) are split at headings, paragraphs and code
+# blocks; only the sections the directive affects are rewritten, up to
+# EDIT_SHARD_WORKERS at once
+# EDIT_SHARD_CHARS = 4000
+# EDIT_SHARD_WORKERS = 4
+
+# Response cache for completion, edit and Perplexity requests, stored in
+# ~/.cache/voice_entry. Pass --no-cache to a command to skip it once.
+# CACHE_ENABLED = True
+# CACHE_TTL_SECONDS = 600.0
+# CACHE_MAX_BYTES = 10 * 1024 * 1024
+
+# Retries and rate limits for API calls. Throttled (429), failed (5xx) and
+# timed-out requests are retried with jittered exponential backoff that
+# honors Retry-After, until the attempt limit or the deadline is reached.
+# API_MAX_ATTEMPTS = 5
+# API_DEADLINE_SECONDS = 120.0
+# TRANSCRIPTION_DEADLINE_SECONDS = 300.0
+# API_RATE_LIMITS = {
+#     "openai": {"requests_per_second": 5, "burst": 10, "concurrency": 4},
+#     "perplexity": {"requests_per_second": 1, "burst": 3, "concurrency": 2},
+# }
+
+# Hedged requests: if a mode gets no answer within after_seconds, send the
+# same request to a backup (provider, model) and use whichever answers first.
+# budget is the fraction of that mode's requests allowed to hedge. Modes:
+# "completion", "edit", "perplexity", "transcription" (default: no hedging)
+# API_HEDGING = {
+#     "completion": {"after_seconds": 2.0, "backup": ("openai", "gpt-4.1-mini"), "budget": 0.1},
+#     "perplexity": {"after_seconds": 4.0, "backup": ("openai", "gpt-4o-mini"), "budget": 0.1},
+#     "transcription": {"after_seconds": 5.0, "backup": ("openai", "gpt-4o-mini-transcribe"), "budget": 0.05},
+# }
+
+# Transcription engine: "openai" (whisper-1, default) or "local" to run
+# Whisper on the CPU with faster-whisper (pip install faster-whisper)
+# TRANSCRIPTION_BACKEND = "local"
+# LOCAL_WHISPER_MODEL = "base.en"       # tiny.en, base.en, small.en, ...
+# LOCAL_WHISPER_COMPUTE_TYPE = "int8"
+# LOCAL_WHISPER_THREADS = 0             # 0 = all cores
+
+# Record per-stage latencies to ~/.local/state/voice_entry/trace.jsonl
+# ($XDG_STATE_HOME/voice_entry); summarize them with
+# `voice_entry.py stats` (default: True)
+# TRACE_ENABLED = False
+
+# Clipboard access: "auto" (default), "xlib", "wayland" or "xclip". With
+# "auto" the daemon owns the X11 clipboard in-process via python-xlib
+# (pip install python-xlib), Wayland sessions use wl-copy/wl-paste, and
+# everything else runs xclip.
+# CLIPBOARD_BACKEND = "xclip"
+
+# How type mode delivers text: "auto" (default) types short text and types
+# long text in fast keystroke bursts, or pastes it through the clipboard
+# (restoring it afterwards) once TYPE_PASTE_KEYS is set; "type", "paste" or
+# "chunked" force one strategy. Pasting is off by default because terminals
+# ignore ctrl+v. When the clipboard backend can tell (the daemon on X11), a
+# paste the application never read is typed instead.
+# TYPE_STRATEGY = "auto"
+# TYPE_PASTE_THRESHOLD = 600          # characters; default 100 in the daemon on X11, else 600
+# TYPE_PASTE_KEYS = "ctrl+v"          # paste long text with this shortcut (e.g. "ctrl+shift+v" in terminals); default None never pastes
+# TYPE_PASTE_SETTLE_SECONDS = 0.5     # max wait for the app to read the clipboard before restoring it
+# TYPE_CHUNK_CHARS = 256
+
+# Results of overlapping dictations are delivered in the order the recordings
+# were stopped; a finished result waits at most this long for earlier ones
+# OUTPUT_ORDER_MAX_WAIT_SECONDS = 30.0
+
+# Each dictation keeps one notification that is updated in place with its
+# progress and streamed text, at most this often (seconds)
+# NOTIFY_UPDATE_SECONDS = 0.5
+
+# Goose runs are killed after this many seconds (default: 300)
+# GOOSE_TIMEOUT_SECONDS = 300.0
+# GOOSE_MAX_CONCURRENT = 2              # Goose runs allowed at once
@@ -0,0 +1,31 @@
+"""Startup-time budget for the hotkey trigger modes (see bench/startup.py).
+
+With a recording in progress, every trigger mode only signals the recorder,
+so it must not load the heavy packages and must add no more than
+startup.BUDGET_MS of import time on top of a bare interpreter importing
+logging. Each mode's cost is the median over paired runs.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+
+import startup  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def report():
+    return startup.measure(runs=9)["modes"]
+
+
+@pytest.mark.parametrize("mode", startup.MODES)
+def test_trigger_skips_heavy_packages(report, mode):
+    assert report[mode]["forbidden"] == []
+
+
+@pytest.mark.parametrize("mode", startup.MODES)
+def test_trigger_within_budget(report, mode):
+    assert report[mode]["added_ms"] <= startup.BUDGET_MS, report[mode]
@@ -2,127 +2,285 @@
 
 import os
 import pyaudio
-import wave
 import time
-from typing import List, Optional, NamedTuple
+from typing import List, Optional
+import config
 from utils import log
-from utils import openai
-from utils import xclip
-from utils import notification
-from utils import typing
-from utils import goose
-from utils import perplexity
+from utils import capture
+from utils import wav
+from utils import trace
+from utils import sequencer
+from utils.pidfile import PID_FILE, get_recording_pid, is_recording, send_signal_to_recording, release_recording_pid
+import queue
 import threading
 import tempfile
 import signal
-from io import BytesIO
 
 # File paths
+# Recordings stay in memory; they are only written here when SAVE_RECORDING is set
 AUDIO_FILE_NAME: str = os.path.join(tempfile.gettempdir(), "voice_entry_audio.wav")
-PID_FILE: str = os.path.join(tempfile.gettempdir(), "voice_entry.pid")
 TEXT_FILE: str = os.path.join(tempfile.gettempdir(), "voice_entry_text.txt")
 
 
-def get_recording_pid() -> Optional[int]:
-    """Get the PID of the currently running recording process."""
-    if not os.path.exists(PID_FILE):
-        log.log_debug("No PID file found")
-        return None
+def preload_processing_modules() -> None:
+    """Import the modules used after recording stops.
+
+    The recorder calls this on a background thread once capture is running,
+    so the OpenAI SDK and friends are loaded before the stop hotkey arrives.
+    """
+    from utils import openai, clipboard, notification, typing, goose, perplexity  # noqa: F401
+    from utils import clients, transcription
+    # Open the API connection (or load the local model) now so the work after stop starts immediately
+    clients.warm_up("openai")
+    if transcription.is_local():
+        transcription.get_backend().warm_up()
+
+
+class AudioState:
+    """Handles for one recording session, shared by the capture thread and whoever stops it."""
+
+    def __init__(self) -> None:
+        self.engine: Optional[capture.CaptureEngine] = None
+        self.audio: Optional[pyaudio.PyAudio] = None
+        self.buffer: Optional[wav.CaptureBuffer] = None
+        # Background segment transcriber when streaming transcription is enabled
+        self.streamer = None
+        # Thread writing the recording to disk when SAVE_RECORDING is set
+        self.saver: Optional[threading.Thread] = None
+        # Set to ask the capture thread to stop; it sets `stopped` once the buffer is complete
+        self.stop_requested = threading.Event()
+        self.stopped = threading.Event()
+        # Place in the output queue, taken when the recording stops (see utils/sequencer.py)
+        self.ticket: Optional[sequencer.Ticket] = None
+        # The session's notification, updated in place from "Recording" to the result
+        self.progress = None
+        # Edit prompt built from the clipboard as it was when recording started (see capture_context)
+        self.edit_prompt = None
+        self.context_ready = threading.Event()
+
+
+# Shared PyAudio instance for long-lived (daemon) processes
+_pyaudio: Optional[pyaudio.PyAudio] = None
+
+
+def shared_pyaudio() -> pyaudio.PyAudio:
+    """Return a PyAudio instance that stays initialized for the life of the process."""
+    global _pyaudio
+    if _pyaudio is None:
+        _pyaudio = pyaudio.PyAudio()
+    return _pyaudio
+
+
+def capture_context(state: AudioState) -> None:
+    """Snapshot the clipboard and pre-render the edit prompt while the user is speaking.
+
+    Run on a background thread when recording starts, so an edit works on
+    the text that was on the clipboard then and only has to append the
+    directive once the transcript arrives.
+    """
+    from utils import clipboard, openai
     try:
-        with open(PID_FILE, 'r') as f:
-            pid = int(f.read().strip())
-            log.log_debug(f"Found PID file with PID: {pid}")
-            return pid
-    except (ValueError, FileNotFoundError) as e:
-        log.log_error(f"Error reading PID file: {e}")
+        text = clipboard.get_clipboard()
+        if text:
+            state.edit_prompt = openai.EditPrompt(text)
+    except Exception as e:
+        log.log_warning(f"Could not snapshot clipboard: {e}")
+    finally:
+        state.context_ready.set()
+
+
+def captured_edit_prompt(state: AudioState, timeout: float = 1.0):
+    """The edit prompt from capture_context, or None (the edit then reads the clipboard itself)."""
+    if not state.context_ready.wait(timeout):
+        log.log_warning("Clipboard snapshot not ready, reading the clipboard now")
         return None
+    return state.edit_prompt
+
 
+def stop_recording(state: AudioState, timeout: float = 2.0) -> None:
+    """Ask the capture thread to stop and wait until the recording is complete."""
+    state.stop_requested.set()
+    if state.engine is not None:
+        state.engine.wake()
+    if not state.stopped.wait(timeout):
+        log.log_warning("Recording thread did not stop in time")
 
-class AudioState(NamedTuple):
-    stream: Optional[pyaudio.Stream] = None
-    audio: Optional[pyaudio.PyAudio] = None
-    wave_file: Optional[wave.Wave_write] = None
-    recording: bool = False
+def _keep_failed_recording(buffer: wav.CaptureBuffer, operation: str) -> None:
+    """Save a recording that could not be transcribed so the dictation isn't lost."""
+    from utils import notification
+    path = os.path.join(tempfile.gettempdir(), f"voice_entry_failed_{time.strftime('%Y%m%d-%H%M%S')}.wav")
+    try:
+        buffer.save(path)
+    except OSError as e:
+        log.log_error(f"Could not save failed recording: {e}")
+        return
+    log.log_warning(f"Saved untranscribed recording to {path}")
+    notification.send_notification(operation, f"Transcription failed; recording saved to {path}")
 
-_lock = threading.Lock()
+def _prepare_upload(buffer: wav.CaptureBuffer):
+    """Trim silence (if enabled) and encode the recording for upload."""
+    from utils import encode, transcription
+    # A local engine reads WAV directly; compressing would only add decode time
+    encoding = "wav" if transcription.is_local() else None
+    if buffer.sample_width == 2 and buffer.channels == 1:
+        from utils import vad
+        if vad.is_enabled():
+            pcm, _ = vad.trim_silence(buffer.pcm(), buffer.rate)
+            return encode.encode_pcm(memoryview(pcm), buffer.rate, buffer.channels, buffer.sample_width, encoding)
+    if encoding == "wav":
+        return buffer.wav_file()
+    return encode.encode_recording(buffer)
 
 def process_audio_and_notify(operation: str, process_func, state: AudioState, should_type: bool = False, should_run_goose: bool = False, should_run_perplexity: bool = False, should_append: bool = False) -> None:
     """Process recorded audio and notify with the result.
 
+    Once capture has stopped, the recording takes its place in the output
+    queue and then releases the recorder's PID file, so a new recording can
+    start while this one is transcribed and processed. Output is delivered
+    in the order recordings were stopped (see utils/sequencer.py).
+
+    Each stage is traced under a session named after the operation (see utils/trace.py)
+    and shown in the notification the recording started with (see utils/notification.py).
+
     Args:
         operation: Name of the operation (e.g. "Completion", "Edit", "Transcription")
-        process_func: Function to process the transcription text
+        process_func: Function to process the transcription text. May return an
+            iterator of text chunks when should_type is set, to type as it streams
         state: Current audio recording state
         should_type: Whether to type out the result instead of copying to clipboard
         should_run_goose: Whether to pass the result to Goose instead of clipboard/typing
         should_run_perplexity: Whether to pass the result to Perplexity instead of clipboard/typing
         should_append: Whether to append the result to clipboard (with two newlines between)
     """
+    from utils import notification
+    progress = state.progress or notification.Progress(operation)
+    progress.name = operation
+    with trace.session(operation.lower().replace(" ", "_")), notification.active(progress):
+        # Stop recording; the capture thread closes the stream
+        with trace.span("stop"):
+            stop_recording(state)
+        # Take our place in the output queue before a new recording can start,
+        # so a recording started and stopped in between can't deliver first
+        if state.ticket is None:
+            state.ticket = sequencer.take()
+        release_recording_pid()
+        try:
+            _process_audio(operation, process_func, state, should_type, should_run_goose, should_run_perplexity, should_append)
+        finally:
+            state.ticket.release()
+
+def _read_ahead(chunks):
+    """Consume a stream on a background thread so it keeps downloading while we wait to deliver."""
+    pending: queue.Queue = queue.Queue()
+    done = object()
+
+    def pump():
+        try:
+            for chunk in chunks:
+                pending.put(chunk)
+        finally:
+            pending.put(done)
+
+    def drain():
+        while True:
+            chunk = pending.get()
+            if chunk is done:
+                return
+            yield chunk
+
+    threading.Thread(target=pump, daemon=True).start()
+    return drain()
+
+def _process_audio(operation: str, process_func, state: AudioState, should_type: bool, should_run_goose: bool, should_run_perplexity: bool, should_append: bool) -> None:
     log.log_info(f"Processing audio for {operation}")
+    from utils import transcription, clipboard, notification, typing, goose, perplexity, streaming
     
-    # Stop recording and clean up
-    with _lock:
-        if state.stream is not None:
-            state.stream.stop_stream()
-            state.stream.close()
-        
-        if state.audio is not None:
-            state.audio.terminate()
-        
-        if state.wave_file is not None:
-            # Ensure all data is written and file is properly closed
-            state.wave_file.flush()
-            state.wave_file.close()
-            # Force sync to disk
-            os.fsync(os.open(AUDIO_FILE_NAME, os.O_RDONLY))
+    if state.buffer is None:
+        log.log_error("No audio was captured")
+        return
     
-    # Transcribe the audio
-    text = openai.transcribe_audio(AUDIO_FILE_NAME)
+    # Transcribe the audio; with streaming only the tail is still in flight
+    text = None
+    if state.streamer is not None:
+        notification.stage("Transcribing")
+        with trace.span("transcribe_tail"):
+            text = state.streamer.finish()
+        if text is None:
+            log.log_warning("Streaming transcription failed, transcribing full recording")
+    if text is None and streaming.should_segment(state.buffer):
+        # Long recordings are cut at pauses and transcribed concurrently
+        notification.stage("Transcribing")
+        with trace.span("transcribe_segments"):
+            text = streaming.transcribe_recording(state.buffer)
+        if text is None:
+            log.log_warning("Segmented transcription failed, transcribing full recording")
+    if text is None:
+        notification.stage("Transcribing" if transcription.is_local() else "Uploading")
+        with trace.span("encode"):
+            upload = _prepare_upload(state.buffer)
+        with trace.span("transcribe"):
+            text = transcription.transcribe(upload)
     if not text:
         log.log_error("No transcription available")
-        os._exit(0)  # Exit the process
+        _keep_failed_recording(state.buffer, operation)
         return
     
-    # Process the text using the provided function
-    result = process_func(text)
+    # Process the text using the provided function (streamed results are consumed while typing)
+    notification.stage("Generating", text)
+    with trace.span("process"):
+        result = process_func(text)
     if not result:
         log.log_error(f"Failed to process text for {operation}")
-        os._exit(0)  # Exit the process
         return
+    if not isinstance(result, str):
+        result = _read_ahead(result)
+    
+    # Earlier dictations deliver first
+    with trace.span("queue_wait"):
+        state.ticket.wait_turn()
     
     if should_run_goose:
         log.log_info(f"{operation} passing to Goose: {result[:50]}...")
-        notification.send_notification(operation, f"Running Goose: {result}")
-        goose.run_goose(result)
+        with trace.span("goose"):
+            goose.run_goose(result)
     elif should_run_perplexity:
         log.log_info(f"{operation} passing to Perplexity: {result[:50]}...")
         notification.send_notification(operation, f"Running Perplexity: {result}")
-        perplexity.run_perplexity(result)
+        with trace.span("perplexity"):
+            perplexity.run_perplexity(result)
     elif should_append:
-        clipboard = xclip.get_clipboard() or ""
-        new_content = f"{clipboard}\n\n{result}" if clipboard else result
-        xclip.set_clipboard(new_content)
+        current = clipboard.get_clipboard() or ""
+        new_content = f"{current}\n\n{result}" if current else result
+        clipboard.set_clipboard(new_content)
         log.log_info(f"{operation} appended to clipboard: {result[:50]}...")
         notification.send_notification(operation, f"Appended: {result[:80]}...")
     elif should_type:
-        typing.type_out(result, operation)
+        if isinstance(result, str):
+            typing.type_out(result, operation)
+        else:
+            # Streamed result: type it as it arrives
+            typing.type_stream(result, operation)
     else:
         # Copy result to clipboard and notify
-        xclip.set_clipboard(result)
+        clipboard.set_clipboard(result)
         log.log_info(f"{operation} copied to clipboard: {result[:50]}...")
         notification.send_notification(operation, result)
-    
-    # Exit the process after handling the signal
-    os._exit(0)
 
-def record_audio(state: AudioState) -> AudioState:
-    """Record audio until interrupted.
+def _consume(state: AudioState, data: bytes) -> None:
+    """Store a block of captured PCM and pass it on to the streaming transcriber."""
+    state.buffer.write(data)
+    if state.streamer is not None:
+        state.streamer.feed(data)
+
+def record_audio(state: AudioState, pa: Optional[pyaudio.PyAudio] = None) -> AudioState:
+    """Record audio until `state.stop_requested` is set.
     
     Args:
-        state: Initial audio state
+        state: Audio state for this session, filled in with the open handles
+        pa: Optional long-lived PyAudio instance; if given it is not terminated
         
     Returns:
-        Updated audio state
+        The same audio state, after the recording has stopped
     """
     CHUNK: int = 1024
     FORMAT: int = pyaudio.paInt16
@@ -130,73 +288,37 @@ def record_audio(state: AudioState) -> AudioState:
     RATE: int = 16000
 
     log.log_info("Starting audio recording")
-    audio = pyaudio.PyAudio()
-    stream = audio.open(format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK)
+    try:
+        state.audio = pa or pyaudio.PyAudio()
+        sample_width = state.audio.get_sample_size(FORMAT)
 
-    # Open audio file for writing
-    wave_file = wave.open(AUDIO_FILE_NAME, 'wb')
-    wave_file.setnchannels(CHANNELS)
-    wave_file.setsampwidth(audio.get_sample_size(FORMAT))
-    wave_file.setframerate(RATE)
+        # Capture into memory; the WAV container is built there on stop
+        state.buffer = wav.CaptureBuffer(rate=RATE, channels=CHANNELS, sample_width=sample_width)
 
-    new_state = AudioState(stream=stream, audio=audio, wave_file=wave_file, recording=True)
-    
-    try:
-        while new_state.recording:
-            with _lock:
-                if new_state.stream is not None and new_state.wave_file is not None:
-                    if new_state.stream.get_read_available() > 0:
-                        data = new_state.stream.read(new_state.stream.get_read_available(), exception_on_overflow=False)
-                        new_state.wave_file.writeframes(data)
-            time.sleep(0.1)
+        from utils import streaming
+        if streaming.is_enabled():
+            state.streamer = streaming.StreamingTranscriber(rate=RATE, sample_width=sample_width)
+
+        state.engine = capture.CaptureEngine(state.audio, RATE, CHANNELS, FORMAT, CHUNK)
+        state.engine.start()
+        state.engine.run(lambda data: _consume(state, data), state.stop_requested)
     finally:
-        with _lock:
-            # One final read to capture any remaining audio in the buffer
-            if new_state.stream is not None and new_state.wave_file is not None:
-                if new_state.stream.get_read_available() > 0:
-                    data = new_state.stream.read(new_state.stream.get_read_available(), exception_on_overflow=False)
-                    new_state.wave_file.writeframes(data)
-            
-            if new_state.stream is not None:
-                new_state.stream.stop_stream()
-                new_state.stream.close()
-            
-            if new_state.audio is not None:
-                new_state.audio.terminate()
-            
-            if new_state.wave_file is not None:
-                new_state.wave_file.close()
+        if state.engine is not None:
+            state.engine.close()
+            stats = state.engine.stats()
+            if stats["dropped_frames"] or stats["overflows"]:
+                log.log_warning(f"Capture lost audio: {stats}")
+            else:
+                log.log_debug(f"Capture stats: {stats}")
+
+        if state.audio is not None and state.audio is not pa:
+            state.audio.terminate()
             
         log.log_info("Recording stopped")
-        return AudioState(recording=False)
-
-def is_recording() -> bool:
-    """Check if a recording is in progress."""
-    pid = get_recording_pid()
-    if pid is None:
-        log.log_debug("No recording PID file found")
-        return False
-    
-    # Check if the process is still running
-    try:
-        os.kill(pid, 0)  # This will raise ProcessLookupError if the process is not running
-        log.log_debug(f"Recording in progress with PID {pid}")
-        return True
-    except ProcessLookupError:
-        # Clean up stale PID file
-        if os.path.exists(PID_FILE):
-            log.log_warning(f"Found stale PID file for process {pid}, removing")
-            os.remove(PID_FILE)
-        return False
-
-def send_signal_to_recording(signal_type: int) -> None:
-    """Send a signal to the recording process."""
-    pid = get_recording_pid()
-    if pid is not None:
-        try:
-            os.kill(pid, signal_type)
-            log.log_info(f"Sent signal {signal_type} to process {pid}")
-        except ProcessLookupError:
-            log.log_error(f"Process {pid} not found")
-    else:
-        log.log_warning("No recording process found")
+        state.stopped.set()
+
+        # Optional persistence, kept off the path between stop and upload
+        if getattr(config, "SAVE_RECORDING", False) and state.buffer is not None:
+            state.saver = threading.Thread(target=state.buffer.save, args=(AUDIO_FILE_NAME,), daemon=True)
+            state.saver.start()
+    return state
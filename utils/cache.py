@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+"""Persistent response cache for completion, edit and Perplexity calls.
+
+Responses are stored in a small SQLite database keyed by a hash of the
+provider, model, system prompt, temperature and input, so repeating the same
+request (e.g. after re-pasting) returns instantly. Entries expire after
+CACHE_TTL_SECONDS and the least recently used ones are evicted once the cache
+grows beyond CACHE_MAX_BYTES. The cache directory and database are private
+to the user (0700 and 0600), since they hold clipboard contents.
+
+Settings in config.py:
+
+- CACHE_ENABLED: turn the cache off entirely (default True)
+- CACHE_TTL_SECONDS: how long a response stays valid (default 600)
+- CACHE_MAX_BYTES: size cap for stored responses (default 10 MB)
+
+Pass --no-cache to voice_entry.py to skip the cache for one request.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+import config
+from utils import log
+
+CACHE_DIR: str = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "voice_entry")
+CACHE_DB: str = os.path.join(CACHE_DIR, "responses.sqlite3")
+
+TTL_SECONDS: float = getattr(config, "CACHE_TTL_SECONDS", 600.0)
+MAX_BYTES: int = getattr(config, "CACHE_MAX_BYTES", 10 * 1024 * 1024)
+
+# A context variable rather than a thread-local, so worker threads that run in a
+# copy of the caller's context (see utils/shard.py) inherit --no-cache
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("cache_bypass", default=False)
+_process_bypass = False
+
+
+def set_bypass(bypass: bool) -> None:
+    """Skip the cache for every request made by this process."""
+    global _process_bypass
+    _process_bypass = bypass
+
+
+@contextlib.contextmanager
+def bypassing(bypass: bool = True) -> Iterator[None]:
+    """Skip the cache for requests made in the current context inside the block."""
+    token = _bypass.set(bypass)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def is_bypassed() -> bool:
+    """Whether the cache is off for the current request."""
+    if not getattr(config, "CACHE_ENABLED", True):
+        return True
+    return _process_bypass or _bypass.get()
+
+
+def make_key(provider: str, model: str, system_prompt: str, temperature: float, user_input: str) -> str:
+    """Content address for a request."""
+    payload = json.dumps([provider, model, system_prompt, temperature, user_input], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    os.chmod(CACHE_DIR, 0o700)
+    # Create the database file private before SQLite opens it; its journals inherit the mode
+    os.close(os.open(CACHE_DB, os.O_WRONLY | os.O_CREAT, 0o600))
+    os.chmod(CACHE_DB, 0o600)
+    conn = sqlite3.connect(CACHE_DB, timeout=5)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS responses ("
+        " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+        " created REAL NOT NULL, accessed REAL NOT NULL)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+    return conn
+
+
+def _purge_expired(conn: sqlite3.Connection, now: float) -> None:
+    conn.execute("DELETE FROM responses WHERE ? - created > ?", (now, TTL_SECONDS))
+
+
+def _count(conn: sqlite3.Connection, name: str) -> None:
+    conn.execute(
+        "INSERT INTO stats (name, count) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET count = count + 1",
+        (name,),
+    )
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for key, or None if missing or expired."""
+    now = time.time()
+    with contextlib.closing(_connect()) as conn, conn:
+        _purge_expired(conn, now)
+        row = conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _count(conn, "misses")
+            return None
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        _count(conn, "hits")
+        return row[0]
+
+
+def put(key: str, value: str) -> None:
+    """Store a response, evicting least recently used entries beyond the size cap."""
+    now = time.time()
+    size = len(value.encode("utf-8"))
+    with contextlib.closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, value, size, now, now),
+        )
+        _purge_expired(conn, now)
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > MAX_BYTES:
+            for old_key, old_size in conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+                if total <= MAX_BYTES:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= old_size
+                _count(conn, "evictions")
+
+
+def cached(provider: str, model: str, system_prompt: str, temperature: float, user_input: str,
+           fetch: Callable[[], Optional[str]]) -> Optional[str]:
+    """Return a cached response for the request, or call `fetch` and cache its result.
+
+    Cache errors are logged and never stop the request itself. None results
+    from `fetch` are not cached.
+    """
+    if is_bypassed():
+        return fetch()
+
+    key = make_key(provider, model, system_prompt, temperature, user_input)
+    try:
+        hit = get(key)
+    except (sqlite3.Error, OSError) as e:
+        log.log_warning(f"Response cache unavailable: {e}")
+        return fetch()
+    if hit is not None:
+        log.log_info(f"Response cache hit for {provider}/{model}")
+        return hit
+
+    result = fetch()
+    if result is not None:
+        try:
+            put(key, result)
+        except (sqlite3.Error, OSError) as e:
+            log.log_warning(f"Could not store response in cache: {e}")
+    return result
+
+
+def stats() -> Dict[str, float]:
+    """Hit/miss counters and current size of the cache."""
+    with contextlib.closing(_connect()) as conn, conn:
+        _purge_expired(conn, time.time())
+        counts = dict(conn.execute("SELECT name, count FROM stats").fetchall())
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+    hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "evictions": counts.get("evictions", 0),
+        "entries": entries,
+        "bytes": size,
+    }
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+"""Callback-driven audio capture.
+
+PyAudio calls `_callback` on its own thread as each buffer of input arrives.
+The callback only copies the data into a single-producer/single-consumer ring
+buffer and wakes the consumer, so there is no polling interval and no lock
+shared with whoever stops the recording. Stopping wakes the consumer, which
+stops the stream and drains what is left straight away.
+"""
+
+import threading
+from typing import Callable, Dict, Optional
+
+import pyaudio
+
+from utils import log
+
+
+class RingBuffer:
+    """Lock-free byte ring for exactly one writer thread and one reader thread.
+
+    The writer only advances `_written` and the reader only advances `_read`,
+    so each counter has a single owner and no lock is needed.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._written = 0  # total bytes ever written (writer-owned)
+        self._read = 0     # total bytes ever read (reader-owned)
+        self.dropped_bytes = 0
+        self.high_water = 0
+
+    def write(self, data: bytes) -> bool:
+        """Append data, or drop all of it if it doesn't fit. Returns False when dropped."""
+        n = len(data)
+        used = self._written - self._read
+        if used + n > self.capacity:
+            self.dropped_bytes += n
+            return False
+
+        view = memoryview(data)
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = view[:first]
+        if first < n:
+            self._buf[:n - first] = view[first:]
+        self._written += n
+        self.high_water = max(self.high_water, used + n)
+        return True
+
+    def read(self) -> bytes:
+        """Take everything written so far."""
+        end = self._written
+        n = end - self._read
+        if n == 0:
+            return b""
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        data = bytes(self._buf[start:start + first])
+        if first < n:
+            data += bytes(self._buf[:n - first])
+        self._read = end
+        return data
+
+
+class CaptureEngine:
+    """Records from the default input device into a ring buffer via a stream callback."""
+
+    def __init__(self, pa: pyaudio.PyAudio, rate: int, channels: int, sample_format: int,
+                 frames_per_buffer: int = 1024, ring_seconds: float = 10.0) -> None:
+        self.pa = pa
+        self.rate = rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.frames_per_buffer = frames_per_buffer
+        self.bytes_per_frame = channels * pa.get_sample_size(sample_format)
+        self.ring = RingBuffer(int(ring_seconds * rate) * self.bytes_per_frame)
+        self.overflows = 0
+        self.stream: Optional[pyaudio.Stream] = None
+        self._ready = threading.Event()
+        self._closed = False
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self.ring.write(in_data)
+        self._ready.set()
+        return (None, pyaudio.paContinue)
+
+    def start(self) -> None:
+        """Open the input stream; PyAudio starts calling back immediately."""
+        self.stream = self.pa.open(
+            format=self.sample_format,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._callback,
+        )
+
+    def wake(self) -> None:
+        """Wake the consumer, e.g. so it notices a stop request without waiting."""
+        self._ready.set()
+
+    def run(self, sink: Callable[[bytes], None], stop_event: threading.Event) -> None:
+        """Pass captured audio to `sink` until `stop_event` is set, then drain the rest.
+
+        Args:
+            sink: Called on this thread with each block of captured PCM
+            stop_event: Set (followed by `wake()`) to stop recording
+        """
+        while not stop_event.is_set():
+            self._ready.wait(0.5)
+            self._ready.clear()
+            data = self.ring.read()
+            if data:
+                sink(data)
+        self.close()
+        data = self.ring.read()
+        if data:
+            sink(data)
+
+    def close(self) -> None:
+        """Stop and close the stream. Safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for diagnosing capture problems."""
+        return {
+            "dropped_frames": self.ring.dropped_bytes // self.bytes_per_frame,
+            "overflows": self.overflows,
+            "high_water_frames": self.ring.high_water // self.bytes_per_frame,
+            "capacity_frames": self.ring.capacity // self.bytes_per_frame,
+        }
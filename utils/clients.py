@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""Shared API clients with pooled keep-alive connections.
+
+Every OpenAI-compatible provider gets one client per process, built on a
+single httpx connection pool. Back-to-back requests (especially from the
+daemon) reuse the open TLS connection instead of paying DNS and handshake
+costs each time.
+
+Timeouts and pool limits come from config.py:
+
+- API_TIMEOUT: seconds to wait for a response (default 60)
+- API_LONG_TIMEOUT: the same for transcription uploads and document edits,
+  whose responses take longer to arrive (default 600, the SDK's own default)
+- API_CONNECT_TIMEOUT: seconds to establish a connection (default 5)
+- API_MAX_CONNECTIONS: connections per provider (default 10)
+- API_KEEPALIVE_EXPIRY: seconds an idle connection is kept open (default 120)
+- OPENAI_BASE_URL / PERPLEXITY_BASE_URL: point a provider at another
+  endpoint, e.g. a local stand-in server (config.py or environment)
+
+Retries are handled by utils/scheduler.py, so the SDK's own retries are off.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+from openai import OpenAI
+
+import config
+from utils import log
+from utils import trace
+
+TIMEOUT: float = getattr(config, "API_TIMEOUT", 60.0)
+LONG_TIMEOUT: float = getattr(config, "API_LONG_TIMEOUT", 600.0)
+CONNECT_TIMEOUT: float = getattr(config, "API_CONNECT_TIMEOUT", 5.0)
+MAX_CONNECTIONS: int = getattr(config, "API_MAX_CONNECTIONS", 10)
+KEEPALIVE_EXPIRY: float = getattr(config, "API_KEEPALIVE_EXPIRY", 120.0)
+
+# Provider name -> (config attribute holding the API key, base URL or None for the SDK default)
+PROVIDERS: Dict[str, tuple] = {
+    "openai": ("OPENAI_API_KEY", None),
+    "perplexity": ("PERPLEXITY_API_KEY", "https://api.perplexity.ai"),
+}
+
+_clients: Dict[str, OpenAI] = {}
+_http_clients: Dict[str, httpx.Client] = {}
+_lock = threading.Lock()
+
+
+def api_key(provider: str) -> Optional[str]:
+    """The configured API key for a provider, or None if it isn't set."""
+    key_attr, _ = PROVIDERS[provider]
+    return getattr(config, key_attr, None) or None
+
+
+def base_url(provider: str) -> Optional[str]:
+    """The provider's endpoint, allowing an override from config.py or the environment."""
+    _, default = PROVIDERS[provider]
+    override_attr = f"{provider.upper()}_BASE_URL"
+    return getattr(config, override_attr, None) or os.environ.get(override_attr) or default
+
+
+def _record_server_time(response: httpx.Response) -> None:
+    """Trace the server's own processing time, to separate it from network and upload time."""
+    value = response.headers.get("openai-processing-ms")
+    if value:
+        try:
+            trace.record("server", float(value))
+        except ValueError:
+            pass
+
+
+def long_timeout() -> httpx.Timeout:
+    """Per-request timeout for slow requests: whole-file transcriptions and document edits."""
+    return httpx.Timeout(LONG_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def _build(provider: str) -> OpenAI:
+    http_client = httpx.Client(
+        timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        event_hooks={"response": [_record_server_time]},
+    )
+    _http_clients[provider] = http_client
+    log.log_debug(f"Creating pooled {provider} client")
+    return OpenAI(api_key=api_key(provider), base_url=base_url(provider), http_client=http_client, max_retries=0)
+
+
+def get_client(provider: str) -> OpenAI:
+    """Return the shared client for a provider, creating it on first use.
+
+    Args:
+        provider: A key of PROVIDERS, e.g. "openai" or "perplexity"
+    """
+    client = _clients.get(provider)
+    if client is None:
+        with _lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = _clients[provider] = _build(provider)
+    return client
+
+
+def warm_up(provider: str) -> None:
+    """Open a pooled connection to the provider ahead of the first real request.
+
+    Failures are ignored; the real request will simply connect itself.
+    """
+    if not api_key(provider):
+        return
+    client = get_client(provider)
+    try:
+        _http_clients[provider].head(str(client.base_url))
+        log.log_debug(f"Warmed up {provider} connection")
+    except httpx.HTTPError as e:
+        log.log_debug(f"Could not warm up {provider} connection: {e}")
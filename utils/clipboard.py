@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+
+"""Clipboard and primary selection access through pluggable backends.
+
+CLIPBOARD_BACKEND in config.py selects the backend ("auto" by default):
+
+- "xlib": owns the X11 CLIPBOARD and PRIMARY selections in-process with
+  python-xlib. Only a long-lived process can keep serving a selection, so
+  it is used once the daemon calls `start_resident()`. Reads of our own
+  selection return the cached text; writes are a single X request.
+- "wayland": wl-copy / wl-paste from wl-clipboard
+- "xclip": one xclip process per call (utils/xclip.py)
+
+"auto" picks wayland when WAYLAND_DISPLAY is set and wl-copy is installed,
+otherwise xlib in the daemon and xclip everywhere else.
+
+Selections are named "clipboard" (Ctrl+C / Ctrl+V) and "primary"
+(highlighted text, middle-click paste).
+"""
+
+import abc
+import collections
+import os
+import queue
+import select
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, Optional
+
+from utils import log
+from utils import trace
+
+# How long to wait for another application to hand over its selection
+READ_TIMEOUT: float = 1.0
+
+
+class ClipboardBackend(abc.ABC):
+    """Interface for clipboard access."""
+
+    name = "base"
+    # Whether wait_until_read() can return as soon as the text was read
+    knows_when_read = False
+
+    @abc.abstractmethod
+    def get(self, selection: str) -> Optional[str]:
+        """Text of a selection, or None if it is empty or unavailable."""
+
+    @abc.abstractmethod
+    def set(self, selection: str, text: str) -> None:
+        """Make `text` the content of a selection."""
+
+    def wait_until_read(self, selection: str, timeout: float) -> bool:
+        """Wait until another application has read what we last set, at most `timeout`.
+
+        Backends that cannot tell simply wait out the timeout and return False.
+        """
+        time.sleep(timeout)
+        return False
+
+    def close(self) -> None:
+        """Release resources; selections we own should survive if possible."""
+
+
+class XclipBackend(ClipboardBackend):
+    """One xclip process per call. xclip forks to keep serving what we set."""
+
+    name = "xclip"
+
+    def get(self, selection: str) -> Optional[str]:
+        from utils import xclip
+        return xclip.get_clipboard() if selection == "clipboard" else xclip.get_primary_selection()
+
+    def set(self, selection: str, text: str) -> None:
+        from utils import xclip
+        xclip.set_selection(selection, text)
+
+
+class WaylandBackend(ClipboardBackend):
+    """wl-clipboard tools. wl-copy forks to keep serving what we set."""
+
+    name = "wayland"
+
+    def get(self, selection: str) -> Optional[str]:
+        args = ["wl-paste", "--no-newline"] + (["--primary"] if selection == "primary" else [])
+        try:
+            result = subprocess.run(args, capture_output=True, timeout=5)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            log.log_error(f"Error reading {selection}: {e}")
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.decode("utf-8", errors="replace").strip() or None
+
+    def set(self, selection: str, text: str) -> None:
+        args = ["wl-copy"] + (["--primary"] if selection == "primary" else [])
+        try:
+            # Own session so the forked server outlives a killed hotkey process group
+            p = subprocess.Popen(args, stdin=subprocess.PIPE, start_new_session=True)
+            p.communicate(text.encode("utf-8"), timeout=5)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            log.log_error(f"Error writing {selection}: {e}")
+
+
+class XlibBackend(ClipboardBackend):
+    """Owns X11 selections from a window in this process.
+
+    All X traffic runs on one event thread (python-xlib connections are not
+    thread-safe); other threads hand it requests through a queue and a wake
+    pipe. Text larger than one X request is sent and received with the INCR
+    protocol.
+    """
+
+    name = "xlib"
+    knows_when_read = True
+
+    def __init__(self) -> None:
+        from Xlib import X, Xatom, display
+
+        self._X = X
+        self._display = display.Display()
+        self._window = self._display.screen().root.create_window(
+            0, 0, 1, 1, 0, X.CopyFromParent, event_mask=X.PropertyChangeMask)
+        atom = self._display.intern_atom
+        self._atoms = {"clipboard": atom("CLIPBOARD"), "primary": Xatom.PRIMARY}
+        self._names = {v: k for k, v in self._atoms.items()}
+        self._targets = atom("TARGETS")
+        self._utf8 = atom("UTF8_STRING")
+        self._text_targets = {self._utf8: "utf-8", atom("TEXT"): "utf-8", Xatom.STRING: "latin-1"}
+        self._incr = atom("INCR")
+        self._property = atom("VOICE_ENTRY_SELECTION")
+        self._atom_type = Xatom.ATOM
+        # Largest property we write in one request (python-xlib has no BIG-REQUESTS)
+        self._chunk = max(4096, self._display.display.info.max_request_length * 4 - 1024)
+
+        self._owned: Dict[str, str] = {}
+        self._owned_lock = threading.Lock()
+        # Completed transfers of each selection's text since it was last set
+        self._deliveries: Dict[str, int] = {}
+        self._delivered = threading.Condition()
+        self._outgoing: Dict[tuple, list] = {}  # (requestor id, property) -> [window, data, offset, target, selection]
+        self._requests: "queue.Queue" = queue.Queue()
+        self._wake_r, self._wake_w = os.pipe()
+        self._reading: Optional[dict] = None
+        # Reads queued behind the one in flight; an X client can only convert one at a time here
+        self._waiting_reads: collections.deque = collections.deque()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name="clipboard", daemon=True)
+        self._thread.start()
+
+    # Called from any thread
+
+    def get(self, selection: str) -> Optional[str]:
+        with self._owned_lock:
+            if selection in self._owned:
+                return self._owned[selection]
+        return self._call("get", selection, timeout=2 * READ_TIMEOUT)
+
+    def set(self, selection: str, text: str) -> None:
+        with self._owned_lock:
+            self._owned[selection] = text
+        with self._delivered:
+            self._deliveries[selection] = 0
+        if not self._call("set", selection, timeout=READ_TIMEOUT):
+            with self._owned_lock:
+                self._owned.pop(selection, None)
+            log.log_error(f"Could not take ownership of the {selection} selection")
+
+    def wait_until_read(self, selection: str, timeout: float) -> bool:
+        with self._delivered:
+            return self._delivered.wait_for(lambda: self._deliveries.get(selection, 0) > 0, timeout)
+
+    def owned(self) -> Dict[str, str]:
+        """Selections this process currently owns, with their text."""
+        with self._owned_lock:
+            return dict(self._owned)
+
+    def close(self) -> None:
+        self._stopped = True
+        os.write(self._wake_w, b"x")
+        self._thread.join(timeout=1)
+
+    def _call(self, op: str, selection: str, timeout: float):
+        reply = {"done": threading.Event(), "result": None}
+        self._requests.put((op, selection, reply))
+        os.write(self._wake_w, b"x")
+        reply["done"].wait(timeout)
+        return reply["result"]
+
+    # Event thread
+
+    def _loop(self) -> None:
+        fd = self._display.fileno()
+        while not self._stopped:
+            try:
+                # Round trips below can buffer events, so drain before sleeping in select()
+                while self._display.pending_events():
+                    self._handle(self._display.next_event())
+                if self._reading is not None and time.monotonic() >= self._reading["deadline"]:
+                    self._finish_read(None)
+                while not self._requests.empty():
+                    op, selection, reply = self._requests.get_nowait()
+                    if op == "get":
+                        self._waiting_reads.append((selection, reply))
+                    else:
+                        self._take_ownership(selection, reply)
+                while self._reading is None and self._waiting_reads:
+                    self._start_read(*self._waiting_reads.popleft())
+                self._display.flush()
+                if self._display.pending_events():
+                    continue
+            except Exception:
+                log.log_exception("Clipboard event loop error")
+            timeout = None
+            if self._reading is not None:
+                timeout = max(0.0, self._reading["deadline"] - time.monotonic())
+            readable, _, _ = select.select([fd, self._wake_r], [], [], timeout)
+            if self._wake_r in readable:
+                os.read(self._wake_r, 4096)
+        self._display.close()
+
+    def _take_ownership(self, selection: str, reply: dict) -> None:
+        atom = self._atoms[selection]
+        self._window.set_selection_owner(atom, self._X.CurrentTime)
+        reply["result"] = self._display.get_selection_owner(atom) == self._window
+        reply["done"].set()
+
+    def _start_read(self, selection: str, reply: dict) -> None:
+        """Ask the selection's owner to convert it into our property."""
+        X = self._X
+        atom = self._atoms[selection]
+        if self._display.get_selection_owner(atom) == X.NONE:
+            reply["done"].set()
+            return
+        self._window.convert_selection(atom, self._utf8, self._property, X.CurrentTime)
+        self._reading = {"reply": reply, "selection": atom, "incr": False, "data": b"",
+                         "deadline": time.monotonic() + READ_TIMEOUT}
+
+    def _finish_read(self, data: Optional[bytes]) -> None:
+        reply = self._reading["reply"]
+        self._reading = None
+        text = data.decode("utf-8", errors="replace").strip() if data else ""
+        reply["result"] = text or None
+        reply["done"].set()
+
+    def _handle(self, ev) -> None:
+        X = self._X
+        if ev.type == X.SelectionRequest:
+            self._serve(ev)
+        elif ev.type == X.SelectionClear:
+            with self._owned_lock:
+                self._owned.pop(self._names.get(ev.atom), None)
+        elif ev.type == X.SelectionNotify:
+            self._receive(ev)
+        elif ev.type == X.PropertyNotify:
+            if ev.window == self._window and ev.state == X.PropertyNewValue:
+                self._receive_chunk(ev)
+            elif ev.state == X.PropertyDelete:
+                self._send_chunk(ev)
+
+    def _receive(self, ev) -> None:
+        if self._reading is None or ev.selection != self._reading["selection"]:
+            return
+        if ev.property == self._X.NONE:
+            return self._finish_read(None)
+        prop = self._window.get_property(self._property, self._X.AnyPropertyType, 0, 2 ** 29, True)
+        if prop is None:
+            return self._finish_read(None)
+        if prop.property_type == self._incr:
+            # The owner sends the text in chunks as we delete each one
+            self._reading["incr"] = True
+            self._reading["deadline"] = time.monotonic() + READ_TIMEOUT
+            return
+        self._finish_read(bytes(prop.value))
+
+    def _receive_chunk(self, ev) -> None:
+        if self._reading is None or not self._reading["incr"] or ev.atom != self._property:
+            return
+        prop = self._window.get_property(self._property, self._X.AnyPropertyType, 0, 2 ** 29, True)
+        chunk = bytes(prop.value) if prop is not None else b""
+        if not chunk:
+            return self._finish_read(self._reading["data"])
+        self._reading["data"] += chunk
+        self._reading["deadline"] = time.monotonic() + READ_TIMEOUT
+
+    def _serve(self, ev) -> None:
+        """Answer another application's request for a selection we own."""
+        from Xlib.protocol import event
+        X = self._X
+        # Obsolete clients leave the property unset and expect the target name
+        prop = ev.property if ev.property != X.NONE else ev.target
+        selection = self._names.get(ev.selection)
+        with self._owned_lock:
+            text = self._owned.get(selection)
+
+        if text is None:
+            prop = X.NONE
+        elif ev.target == self._targets:
+            ev.requestor.change_property(prop, self._atom_type, 32, [self._targets, *self._text_targets])
+        elif ev.target in self._text_targets:
+            data = text.encode(self._text_targets[ev.target], errors="replace")
+            if len(data) <= self._chunk:
+                ev.requestor.change_property(prop, ev.target, 8, data)
+                self._count_delivery(selection)
+            else:
+                # INCR: announce the size, then send a chunk each time the requestor deletes the property
+                ev.requestor.change_attributes(event_mask=X.PropertyChangeMask)
+                ev.requestor.change_property(prop, self._incr, 32, [len(data)])
+                self._outgoing[(ev.requestor.id, prop)] = [ev.requestor, data, 0, ev.target, selection]
+        else:
+            prop = X.NONE
+
+        ev.requestor.send_event(event.SelectionNotify(
+            time=ev.time, requestor=ev.requestor, selection=ev.selection, target=ev.target, property=prop))
+
+    def _send_chunk(self, ev) -> None:
+        transfer = self._outgoing.get((ev.window.id, ev.atom))
+        if transfer is None:
+            return
+        window, data, offset, target, selection = transfer
+        chunk = data[offset:offset + self._chunk]
+        window.change_property(ev.atom, target, 8, chunk)
+        if chunk:
+            transfer[2] = offset + len(chunk)
+        else:
+            # A zero-length chunk ends the transfer
+            del self._outgoing[(ev.window.id, ev.atom)]
+            window.change_attributes(event_mask=self._X.NoEventMask)
+            self._count_delivery(selection)
+
+    def _count_delivery(self, selection: str) -> None:
+        with self._delivered:
+            self._deliveries[selection] = self._deliveries.get(selection, 0) + 1
+            self._delivered.notify_all()
+
+
+BACKENDS = {
+    "xclip": XclipBackend,
+    "wayland": WaylandBackend,
+    "xlib": XlibBackend,
+}
+
+_backend: Optional[ClipboardBackend] = None
+_resident: Optional[XlibBackend] = None
+_lock = threading.Lock()
+
+
+def _configured() -> str:
+    try:
+        import config
+    except ImportError:
+        return "auto"
+    return getattr(config, "CLIPBOARD_BACKEND", "auto")
+
+
+def _wayland_available() -> bool:
+    return bool(os.environ.get("WAYLAND_DISPLAY")) and shutil.which("wl-copy") is not None
+
+
+def start_resident() -> None:
+    """Own selections in-process from now on (for long-lived processes like the daemon)."""
+    global _resident, _backend
+    name = _configured()
+    if name not in ("auto", "xlib") or (name == "auto" and _wayland_available()):
+        return
+    if not os.environ.get("DISPLAY"):
+        log.log_warning("No DISPLAY, keeping the subprocess clipboard backend")
+        return
+    try:
+        resident = XlibBackend()
+    except Exception as e:
+        log.log_warning(f"Could not start the in-process clipboard ({e}), using xclip")
+        return
+    with _lock:
+        _resident = _backend = resident
+    log.log_info("Owning clipboard selections in-process")
+
+
+def stop_resident() -> None:
+    """Hand owned selections to xclip so they survive this process, then close the X connection."""
+    global _resident, _backend
+    with _lock:
+        resident, _resident, _backend = _resident, None, None
+    if resident is None:
+        return
+    for selection, text in resident.owned().items():
+        XclipBackend().set(selection, text)
+    resident.close()
+
+
+def get_backend() -> ClipboardBackend:
+    """Return the shared backend, chosen from CLIPBOARD_BACKEND on first use."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            name = _configured()
+            if name == "auto":
+                name = "wayland" if _wayland_available() else "xclip"
+            elif name == "xlib":
+                # Only useful in a resident process; one-shot processes would lose the selection on exit
+                name = "xclip"
+            if name not in BACKENDS:
+                log.log_warning(f"Unknown CLIPBOARD_BACKEND {name!r}, using xclip")
+                name = "xclip"
+            _backend = BACKENDS[name]()
+        return _backend
+
+
+def get_clipboard() -> Optional[str]:
+    """Get text from the clipboard (Ctrl+C buffer)."""
+    with trace.span("clipboard_read"):
+        return get_backend().get("clipboard")
+
+
+def set_clipboard(text: str) -> None:
+    """Copy text to the clipboard (Ctrl+C buffer)."""
+    if not text:
+        return
+    log.log_info(f"Copying to clipboard: {text[:50]}...")
+    with trace.span("clipboard_write"):
+        get_backend().set("clipboard", text)
+
+
+def wait_until_read(selection: str, timeout: float) -> bool:
+    """Wait until another application has read what we set (see ClipboardBackend.wait_until_read)."""
+    return get_backend().wait_until_read(selection, timeout)
+
+
+def get_primary_selection() -> Optional[str]:
+    """Get text from the primary selection buffer (highlighted text).
+
+    Returns None if nothing is selected or on error.
+    """
+    with trace.span("selection_read"):
+        return get_backend().get("primary") or None
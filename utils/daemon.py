@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""Unix socket control channel for the resident voice_entry daemon.
+
+The daemon keeps the API clients, PyAudio and Notify initialized between
+hotkeys. Trigger modes send their mode name over the socket instead of
+spawning a full interpreter or signalling the recorder via its PID file.
+
+Protocol: the client sends a single line with the mode name, optionally
+followed by flags such as --no-cache, and the daemon answers with "ok" once
+the request has been accepted, or "error <reason>". Clients use
+utils/daemon_client.py.
+"""
+
+import os
+import socket
+import threading
+from typing import Callable, Optional
+
+from utils import log
+# The client half lives in its own module, so trigger modes don't import socket
+from utils.daemon_client import SOCKET_PATH, is_running, send_request  # noqa: F401
+
+
+def _bind(socket_path: str) -> Optional[socket.socket]:
+    """Bind the control socket, clearing a stale one left by a dead daemon."""
+    if os.path.exists(socket_path):
+        if is_running(socket_path):
+            log.log_error("Another daemon is already running")
+            return None
+        log.log_warning("Removing stale daemon socket")
+        os.remove(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen(8)
+    return server
+
+
+def _handle_connection(conn: socket.socket, dispatch: Callable[[str], Optional[str]]) -> None:
+    """Read one request, hand it to `dispatch` and acknowledge it."""
+    with conn:
+        mode = conn.makefile("r", encoding="utf-8").readline().strip()
+        error = dispatch(mode) if mode else "empty request"
+        if error:
+            conn.sendall(f"error {error}\n".encode("utf-8"))
+            return
+        conn.sendall(b"ok\n")
+
+
+def serve(dispatch: Callable[[str], Optional[str]], socket_path: str = SOCKET_PATH) -> None:
+    """Accept mode requests until the process is stopped.
+
+    Each connection is handled on its own thread so a slow request (e.g. a
+    transcription) never blocks the next hotkey.
+
+    Args:
+        dispatch: Called with the mode name. Returns an error string to reject
+            the request, or None once the work has been started.
+        socket_path: Path of the daemon control socket
+    """
+    server = _bind(socket_path)
+    if server is None:
+        return
+
+    log.log_info(f"Daemon listening on {socket_path}")
+    try:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=_handle_connection, args=(conn, dispatch), daemon=True).start()
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        log.log_info("Daemon stopped")
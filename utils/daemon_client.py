@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""Client side of the daemon control socket (see utils/daemon.py).
+
+Every trigger mode calls `send_request()` before anything else, so this
+module is kept to the bare minimum: it talks to the socket through the
+`_socket` extension module instead of `socket`, whose enum-based wrappers
+cost several milliseconds to import, and finds its directory without
+importing tempfile (see pidfile.temp_dir()).
+"""
+
+import _socket
+import os
+
+from utils import log
+from utils.pidfile import temp_dir
+
+SOCKET_PATH: str = os.path.join(temp_dir(), "voice_entry.sock")
+
+# How long a client waits for the daemon to accept a request
+CLIENT_TIMEOUT: float = 2.0
+
+
+def _connect(socket_path: str):
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CLIENT_TIMEOUT)
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _read_line(sock) -> str:
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = sock.recv(256)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode("utf-8").strip()
+
+
+def send_request(mode: str, socket_path: str = SOCKET_PATH) -> bool:
+    """Send a mode request to a running daemon.
+
+    Args:
+        mode: The mode name (e.g. "record", "completion"), optionally followed by flags
+        socket_path: Path of the daemon control socket
+
+    Returns:
+        True if a daemon accepted the request, False if no daemon is running
+    """
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        sock = _connect(socket_path)
+        try:
+            sock.sendall(f"{mode}\n".encode("utf-8"))
+            reply = _read_line(sock)
+        finally:
+            sock.close()
+    except (FileNotFoundError, ConnectionRefusedError):
+        log.log_debug("No daemon listening on control socket")
+        return False
+    except OSError as e:
+        log.log_warning(f"Error talking to daemon: {e}")
+        return False
+
+    if reply != "ok":
+        log.log_error(f"Daemon rejected {mode}: {reply}")
+    return True
+
+
+def is_running(socket_path: str = SOCKET_PATH) -> bool:
+    """Check whether a daemon is listening on the control socket."""
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        _connect(socket_path).close()
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""Compress recordings before upload.
+
+Raw 16 kHz int16 WAV is about 32 KB per second, which makes the upload the
+slowest part of transcription on poor links. The encoder is chosen with
+AUDIO_ENCODING in config.py:
+
+- "wav": upload the raw recording (default)
+- "flac": lossless, typically around half the size
+- "opus": Opus in Ogg, a small fraction of the size; bitrate via OPUS_BITRATE
+
+FLAC and Opus use the soundfile package when installed, otherwise ffmpeg.
+If neither works the raw WAV is uploaded.
+"""
+
+import subprocess
+import time
+from io import BytesIO
+from typing import Callable, Dict, Optional
+
+import config
+from utils import log
+from utils import wav
+
+OPUS_BITRATE: str = getattr(config, "OPUS_BITRATE", "24k")
+
+
+def _encode_wav(pcm: memoryview, rate: int, channels: int, sample_width: int) -> Optional[BytesIO]:
+    return wav.pcm_to_wav(pcm, rate=rate, channels=channels, sample_width=sample_width)
+
+
+def _soundfile_encode(pcm: memoryview, rate: int, channels: int, sample_width: int, format: str, subtype: str, name: str) -> Optional[BytesIO]:
+    try:
+        import soundfile
+    except ImportError:
+        return None
+    if sample_width != 2:
+        return None
+    buf = BytesIO()
+    try:
+        with soundfile.SoundFile(buf, 'w', samplerate=rate, channels=channels, format=format, subtype=subtype) as f:
+            f.buffer_write(pcm, dtype='int16')
+    except (RuntimeError, TypeError, ValueError) as e:
+        # Older libsndfile builds have no Opus support
+        log.log_debug(f"soundfile could not encode {format}/{subtype}: {e}")
+        return None
+    buf.seek(0)
+    buf.name = name
+    return buf
+
+
+def _ffmpeg_encode(pcm: memoryview, rate: int, channels: int, sample_width: int, codec_args: list, name: str) -> Optional[BytesIO]:
+    if sample_width != 2:
+        return None
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error",
+             "-f", "s16le", "-ar", str(rate), "-ac", str(channels), "-i", "pipe:0",
+             *codec_args, "pipe:1"],
+            input=pcm,
+            capture_output=True,
+            check=False,
+            timeout=60,
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+        log.log_debug(f"ffmpeg unavailable for encoding: {e}")
+        return None
+    if result.returncode != 0 or not result.stdout:
+        log.log_debug(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return None
+    buf = BytesIO(result.stdout)
+    buf.name = name
+    return buf
+
+
+def _encode_flac(pcm: memoryview, rate: int, channels: int, sample_width: int) -> Optional[BytesIO]:
+    return (_soundfile_encode(pcm, rate, channels, sample_width, 'FLAC', 'PCM_16', "audio.flac")
+            or _ffmpeg_encode(pcm, rate, channels, sample_width, ["-c:a", "flac", "-f", "flac"], "audio.flac"))
+
+
+def _encode_opus(pcm: memoryview, rate: int, channels: int, sample_width: int) -> Optional[BytesIO]:
+    # soundfile has no bitrate control, so prefer ffmpeg for Opus
+    return (_ffmpeg_encode(pcm, rate, channels, sample_width,
+                           ["-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg"], "audio.ogg")
+            or _soundfile_encode(pcm, rate, channels, sample_width, 'OGG', 'OPUS', "audio.ogg"))
+
+
+# Encoder name -> function(pcm, rate, channels, sample_width) returning a named file object
+ENCODERS: Dict[str, Callable[[memoryview, int, int, int], Optional[BytesIO]]] = {
+    "wav": _encode_wav,
+    "flac": _encode_flac,
+    "opus": _encode_opus,
+}
+
+
+def encode_pcm(pcm: memoryview, rate: int = wav.RATE, channels: int = wav.CHANNELS, sample_width: int = wav.SAMPLE_WIDTH, encoding: Optional[str] = None):
+    """Encode raw PCM for upload with the configured encoder.
+
+    Args:
+        pcm: Raw little-endian PCM frames
+        rate: Sample rate in Hz
+        channels: Number of channels
+        sample_width: Bytes per sample
+        encoding: Encoder name; defaults to AUDIO_ENCODING from config.py
+
+    Returns:
+        A named file object ready to pass to the transcription client
+    """
+    encoding = encoding or getattr(config, "AUDIO_ENCODING", "wav")
+    encoder = ENCODERS.get(encoding)
+    if encoder is None:
+        log.log_warning(f"Unknown AUDIO_ENCODING {encoding!r}, uploading WAV")
+        encoder = _encode_wav
+
+    raw_size = wav.HEADER_SIZE + len(pcm)
+    start = time.monotonic()
+    encoded = encoder(pcm, rate, channels, sample_width)
+    elapsed_ms = (time.monotonic() - start) * 1000
+    if encoded is None:
+        log.log_warning(f"{encoding} encoding unavailable, uploading WAV")
+        return wav.pcm_to_wav(pcm, rate=rate, channels=channels, sample_width=sample_width)
+
+    if encoder is not _encode_wav:
+        size = len(encoded.getbuffer())
+        saved = raw_size - size
+        log.log_info(f"Encoded {encoding}: {raw_size} -> {size} bytes ({100 * saved / max(raw_size, 1):.0f}% saved) in {elapsed_ms:.0f} ms")
+    return encoded
+
+
+def encode_recording(buffer: wav.CaptureBuffer):
+    """Return the recording in `buffer` as an upload-ready file object.
+
+    With the default "wav" encoding this is the zero-copy reader over the
+    capture buffer itself.
+    """
+    if getattr(config, "AUDIO_ENCODING", "wav") == "wav":
+        return buffer.wav_file()
+    return encode_pcm(buffer.pcm(), buffer.rate, buffer.channels, buffer.sample_width)
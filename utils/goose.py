@@ -1,15 +1,55 @@
 #!/usr/bin/env python3
 
-"""Invoke Goose AI agent with text - used when feeding from recording or clipboard."""
+"""Invoke Goose AI agent with text - used when feeding from recording or clipboard.
+
+Goose runs with `--output-format stream-json`, which prints one JSON event
+per line as the agent works:
+
+    {"type": "message", "message": {"id": "...", "role": "assistant", "content": [...]}}
+    {"type": "complete", ...}
+
+Events are parsed as they arrive: tool calls and assistant text are shown
+in the notification, and the last assistant message goes to the clipboard
+as soon as Goose reports it is complete, without waiting for the process
+(and its extensions) to shut down. Only the message being assembled is
+kept in memory, not the whole transcript.
+
+At most GOOSE_MAX_CONCURRENT runs execute at a time; further requests wait
+for a slot. Each run is a fresh `goose run` process: it handles exactly one
+job and only builds its session (provider, extensions) after reading the
+instructions, so there is no loaded agent that a kept-alive process could
+reuse.
+"""
 
 import json
 import os
-import shlex
 import subprocess
-import tempfile
+import threading
 import time
+from typing import Iterable, Optional, Set
+
+import config
+from utils import clipboard
 from utils import log
 from utils import notification
+from utils import trace
+
+GOOSE_COMMAND = [
+    "goose", "run",
+    "--no-session",
+    "--with-builtin", "developer,fetch,skills",
+    "-q", "--output-format", "stream-json",
+    "-i", "-",
+]
+# Longest a Goose run may take before it is killed
+TIMEOUT_SECONDS: float = getattr(config, "GOOSE_TIMEOUT_SECONDS", 300.0)
+# Goose runs allowed at once
+MAX_CONCURRENT: int = getattr(config, "GOOSE_MAX_CONCURRENT", 2)
+
+# Goose processes currently running, so cancel() can stop them
+_running: Set[subprocess.Popen] = set()
+_running_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, MAX_CONCURRENT))
 
 
 def _extract_last_assistant_message(json_str: str) -> str:
@@ -18,100 +58,204 @@ def _extract_last_assistant_message(json_str: str) -> str:
         data = json.loads(json_str)
         for m in reversed(data.get("messages", [])):
             if m.get("role") == "assistant":
-                parts = []
-                for c in m.get("content", []):
-                    if c.get("type") == "text":
-                        parts.append(c.get("text", ""))
-                return "".join(parts)
+                return _message_text(m)
         return ""
-    except (json.JSONDecodeError, TypeError):
+    except (json.JSONDecodeError, TypeError, AttributeError):
         return ""
 
 
-def _set_clipboard(text: str) -> None:
-    """Set clipboard - wl-copy on Wayland, xclip on X11 (must stay running for X11)."""
-    if not text:
-        return
-    # wl-copy persists; on X11 xclip must stay running (-loops 1) or selection is lost when we exit
-    try:
-        p = subprocess.Popen(["wl-copy"], stdin=subprocess.PIPE)
-        p.communicate(text.encode("utf-8"), timeout=5)
-        if p.returncode == 0:
-            return
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        pass
-    # X11: run xclip -loops 1 detached so it survives our exit and keeps selection
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write(text)
-        path = f.name
-    try:
-        subprocess.Popen(
-            ["setsid", "sh", "-c", f"xclip -selection c -loops 1 < {shlex.quote(path)} & sleep 2; rm -f {shlex.quote(path)}"],
-            start_new_session=True,
-        )
-        time.sleep(2)  # Let xclip read file and claim selection before we exit
-    except FileNotFoundError:
-        # No setsid or xclip - fall back to plain xclip (may not persist)
-        try:
-            p = subprocess.Popen(["xclip", "-selection", "c"], stdin=subprocess.PIPE)
-            p.communicate(text.encode("utf-8"), timeout=5)
-        except FileNotFoundError:
-            pass
-    finally:
+def _message_text(message: dict) -> str:
+    return "".join(c.get("text", "") for c in message.get("content", []) if c.get("type") == "text")
+
+
+def _tool_names(message: dict) -> list:
+    names = []
+    for c in message.get("content", []):
+        if c.get("type") == "toolRequest":
+            call = c.get("toolCall") or {}
+            name = (call.get("value") or {}).get("name")
+            if name:
+                names.append(name)
+    return names
+
+
+class StreamParser:
+    """Follow a Goose stream-json transcript line by line.
+
+    Message chunks that share an ID are joined into one message. `last_message`
+    holds the text of the latest assistant message seen so far and `complete`
+    is set once Goose reports the run finished. Output that is not stream-json
+    (a whole `--output-format json` document) is parsed when the stream ends.
+    """
+
+    def __init__(self) -> None:
+        self.last_message = ""
+        self.complete = False
+        self.error: Optional[str] = None
+        self._message_id: Optional[str] = None
+        self._other: list = []
+
+    def feed(self, line: str) -> Optional[str]:
+        """Parse one line. Returns a progress update (assistant text or tool name) if there is one."""
         try:
-            os.unlink(path)
-        except (OSError, NameError):
-            pass
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            if line.strip():
+                self._other.append(line)
+            return None
+        if not isinstance(event, dict):
+            return None
+        kind = event.get("type")
+        if kind == "message":
+            return self._message(event.get("message") or {})
+        if kind == "complete":
+            self.complete = True
+        elif kind == "error":
+            self.error = str(event.get("error", "unknown error"))
+        elif "messages" in event:
+            # A whole --output-format json transcript on one line
+            self.last_message = _extract_last_assistant_message(line) or self.last_message
+        return None
+
+    def _message(self, message: dict) -> Optional[str]:
+        if message.get("role") != "assistant":
+            self._message_id = None
+            return None
+        message_id = message.get("id")
+        text = _message_text(message)
+        if message_id is not None and message_id == self._message_id:
+            self.last_message += text
+        elif text:
+            self.last_message = text
+        self._message_id = message_id
+        tools = _tool_names(message)
+        if tools:
+            return f"Running {', '.join(tools)}"
+        return self.last_message if text else None
+
+    def finish(self) -> str:
+        """Call at the end of the stream; returns the final assistant message."""
+        if not self.last_message and self._other:
+            self.last_message = _extract_last_assistant_message("".join(self._other))
+        self._other = []
+        return self.last_message
+
+
+def cancel() -> int:
+    """Stop every running Goose process. Returns how many were stopped."""
+    with _running_lock:
+        processes = list(_running)
+    for process in processes:
+        log.log_info(f"Cancelling Goose run {process.pid}")
+        process.kill()
+    return len(processes)
+
+
+def _deliver(message: str) -> None:
+    clipboard.set_clipboard(message)
+    log.log_info(f"Copied to clipboard: {message[:50]}...")
+    notification.send_notification("Goose", message)
 
 
-def run_goose(text: str) -> None:
+def _follow(lines: Iterable[str], parser: StreamParser) -> bool:
+    """Feed lines to the parser, showing progress. Returns True if the result was delivered early."""
+    waiting = time.monotonic()
+    for line in lines:
+        update = parser.feed(line)
+        if update:
+            if waiting is not None:
+                trace.record("first_message", (time.monotonic() - waiting) * 1000)
+                waiting = None
+            notification.partial(update)
+        if parser.complete:
+            message = parser.finish()
+            if message:
+                _deliver(message)
+                return True
+    return False
+
+
+def run_goose(text: str) -> Optional[str]:
     """Run Goose with the given text as instructions.
 
     Uses an isolated run (--no-session) so it doesn't interact with existing
     desktop or interactive sessions. Ensures the developer extension is enabled.
-    Extracts the last assistant message and puts it on the clipboard.
+    Puts the last assistant message on the clipboard as soon as the run
+    completes, and shows progress in the notification while it works.
 
     Args:
         text: The instruction text to send to Goose (from transcription or clipboard).
+
+    Returns:
+        The last assistant message, or None if Goose failed or was cancelled
     """
     if not text or not text.strip():
         log.log_warning("Empty text for Goose, skipping")
-        return
+        return None
 
     log.log_info(f"Running Goose with: {text[:80]}...")
+    progress = notification.current() or notification.Progress("Goose")
+    with notification.active(progress):
+        if not _slots.acquire(blocking=False):
+            notification.stage("Waiting for Goose", text)
+            with trace.span("goose_wait"):
+                _slots.acquire()
+        try:
+            notification.stage("Running Goose", text)
+            return _run(text)
+        finally:
+            _slots.release()
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write(text.strip())
-        inst_path = f.name
 
+def _run(text: str) -> Optional[str]:
     try:
-        result = subprocess.run(
-            [
-                "goose", "run",
-                "--no-session",
-                "--with-builtin", "developer,fetch,skills",
-                "-q", "--output-format", "json",
-                "-i", inst_path,
-            ],
-            capture_output=True,
+        process = subprocess.Popen(
+            GOOSE_COMMAND,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
             text=True,
-            check=False,
-            timeout=300,
             env={**os.environ},
         )
-        last_msg = ""
-        if result.stdout:
-            last_msg = _extract_last_assistant_message(result.stdout)
-        if last_msg:
-            _set_clipboard(last_msg)
-            log.log_info(f"Copied to clipboard: {last_msg[:50]}...")
-            notification.send_notification("Goose", last_msg)
     except FileNotFoundError:
         log.log_error("goose not found. Install it: https://github.com/block/goose")
+        return None
+
+    with _running_lock:
+        _running.add(process)
+    timer = threading.Timer(TIMEOUT_SECONDS, process.kill)
+    timer.daemon = True
+    timer.start()
+    parser = StreamParser()
+    delivered = False
+    try:
+        process.stdin.write(text.strip())
+        process.stdin.close()
+        delivered = _follow(process.stdout, parser)
+        if delivered:
+            # Goose may still be shutting down extensions; let it finish in the background
+            threading.Thread(target=process.wait, daemon=True).start()
+        else:
+            process.wait()
     except Exception as e:
         log.log_error(f"Failed to run Goose: {e}")
+        process.kill()
+        return None
     finally:
-        try:
-            os.unlink(inst_path)
-        except OSError:
-            pass
+        timer.cancel()
+        with _running_lock:
+            _running.discard(process)
+
+    if parser.error:
+        log.log_error(f"Goose reported an error: {parser.error}")
+    if delivered:
+        return parser.last_message
+    if process.returncode is not None and process.returncode < 0:
+        log.log_warning(f"Goose run was stopped (signal {-process.returncode})")
+        return None
+    message = parser.finish()
+    if message:
+        _deliver(message)
+        return message
+    log.log_warning(f"Goose produced no assistant message (exit code {process.returncode})")
+    return None
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+"""Hedged API requests, to cut tail latency.
+
+A mode with a policy in API_HEDGING sends its request as usual. If no answer
+has arrived after `after_seconds`, a duplicate goes to a backup provider and
+model; the first valid answer wins and the other request is abandoned:
+
+    API_HEDGING = {
+        "completion": {"after_seconds": 2.0, "backup": ("openai", "gpt-4.1-mini"), "budget": 0.1},
+    }
+
+Modes are "completion", "edit", "perplexity" and "transcription". `budget`
+is the fraction of a mode's requests that may be hedged: every request earns
+that much of a hedge, and at most one unspent hedge is kept, so a slow
+provider can't double the load.
+
+Python can't abort an HTTP request running on another thread, so the loser
+is cancelled cooperatively: its result is discarded and its scheduler call
+stops before any further retry (see `scheduler.call(cancelled=...)`).
+
+Hedges are counted per mode in `counters()` and traced as "hedge" (time
+from firing the hedge to the answer) and "hedge_won" (the backup answered
+first) stages, so `voice_entry.py stats` shows how often hedging helped.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import config
+from utils import log
+from utils import trace
+
+T = TypeVar("T")
+
+# (provider, model), e.g. ("openai", "gpt-4o-mini")
+Target = Tuple[str, str]
+
+_lock = threading.Lock()
+_allowance: Dict[str, float] = {}
+_counters: Dict[str, Dict[str, int]] = {}
+
+
+def policy(mode: str) -> Optional[dict]:
+    """The hedging policy configured for a mode, or None if it isn't hedged."""
+    settings = getattr(config, "API_HEDGING", {}).get(mode)
+    if not settings or not settings.get("backup"):
+        return None
+    return {"after_seconds": 2.0, "budget": 0.1, **settings}
+
+
+def counters() -> Dict[str, Dict[str, int]]:
+    """Per-mode counts of requests, hedges fired, hedges won and hedges denied by the budget."""
+    with _lock:
+        return {mode: dict(counts) for mode, counts in _counters.items()}
+
+
+def _count(mode: str, name: str) -> None:
+    with _lock:
+        counts = _counters.setdefault(mode, {"requests": 0, "hedged": 0, "won": 0, "denied": 0})
+        counts[name] += 1
+
+
+def _earn(mode: str, budget: float) -> None:
+    with _lock:
+        _allowance[mode] = min(1.0, _allowance.get(mode, 1.0) + budget)
+
+
+def _spend(mode: str) -> bool:
+    with _lock:
+        if _allowance.get(mode, 1.0) < 1.0:
+            return False
+        _allowance[mode] = _allowance.get(mode, 1.0) - 1.0
+        return True
+
+
+def call(mode: str, primary: Target, request: Callable[[str, str, threading.Event], T],
+         valid: Callable[[T], bool] = bool) -> T:
+    """Run `request` against the primary target, hedging to the mode's backup if it is slow.
+
+    Args:
+        mode: Policy name in API_HEDGING, e.g. "completion"
+        primary: (provider, model) to ask first
+        request: Makes the request: request(provider, model, cancelled). It
+            should pass `cancelled` to scheduler.call so a losing request
+            stops retrying
+        valid: Whether a result counts as an answer; invalid results and
+            errors wait for the other request instead of winning
+
+    Returns:
+        The winning result, or the last (invalid) result if neither was valid
+
+    Raises:
+        The last error if every request failed
+    """
+    settings = policy(mode)
+    if settings is None:
+        return request(*primary, threading.Event())
+
+    _count(mode, "requests")
+    _earn(mode, settings["budget"])
+    results: queue.Queue = queue.Queue()
+    cancels = {}
+
+    def launch(target: Target) -> None:
+        cancelled = cancels[target] = threading.Event()
+
+        def run():
+            try:
+                results.put((target, request(*target, cancelled), None))
+            except Exception as e:
+                results.put((target, None, e))
+
+        # Run in a copy of the caller's context, so the request's spans land in
+        # the caller's trace session and its progress reaches the notification
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name=f"hedge-{mode}", daemon=True).start()
+
+    launch(primary)
+    try:
+        target, result, error = results.get(timeout=settings["after_seconds"])
+    except queue.Empty:
+        pass
+    else:
+        if error is not None:
+            raise error
+        return result
+
+    backup = tuple(settings["backup"])
+    if backup == primary or not _spend(mode):
+        _count(mode, "denied")
+        target, result, error = results.get()
+        if error is not None:
+            raise error
+        return result
+
+    log.log_info(f"{mode}: no answer from {primary[1]} after {settings['after_seconds']}s, hedging to {backup[1]}")
+    _count(mode, "hedged")
+    hedged_at = time.monotonic()
+    launch(backup)
+    pending, last_error, last_result = 2, None, None
+    while pending:
+        target, result, error = results.get()
+        pending -= 1
+        if error is None and valid(result):
+            for other, cancelled in cancels.items():
+                if other != target:
+                    cancelled.set()
+            elapsed_ms = (time.monotonic() - hedged_at) * 1000
+            trace.record("hedge", elapsed_ms)
+            if target == backup:
+                _count(mode, "won")
+                trace.record("hedge_won", elapsed_ms)
+            log.log_info(f"{mode}: {target[1]} answered first; hedge counters {counters()[mode]}")
+            return result
+        if error is not None:
+            log.log_warning(f"{mode}: {target[1]} failed while hedged: {error}")
+            last_error = error
+        else:
+            last_result = result
+    if last_error is not None and last_result is None:
+        raise last_error
+    return last_result
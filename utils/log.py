@@ -2,10 +2,12 @@
 
 import os
 import logging
-from datetime import datetime
 
-# Set up logging to file - keep log in project root
-LOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "voice_entry.log")
+# Set up logging to file - kept with the traces in $XDG_STATE_HOME/voice_entry
+# (~/.local/state/voice_entry); $VOICE_ENTRY_LOG_FILE overrides the path
+LOG_FILE = os.environ.get("VOICE_ENTRY_LOG_FILE") or os.path.join(
+    os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state"), "voice_entry", "voice_entry.log")
+os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
 # Create a specific logger for our application
 logger = logging.getLogger('voice_entry')
@@ -1,12 +1,64 @@
 #!/usr/bin/env python3
 
-"""Desktop notification utilities."""
+"""Desktop notification utilities.
 
-import gi
-gi.require_version('Notify', '0.7')
-from gi.repository import Notify
+libnotify is initialized once per process. A dictation keeps a single
+`Progress` notification that is updated in place as it moves through its
+stages (recording, uploading, transcribing, generating, done) instead of
+opening a new bubble for each event:
 
+    progress = notification.Progress("Recording")
+    progress.update("Voice recording started...")
+    ...
+    with notification.active(progress):
+        notification.stage("Uploading")
+        notification.partial(text_so_far)
+        notification.send_notification("Completion", result)  # updates the same bubble
+
+Updates only record the latest title and body; a background thread shows
+them, at most every UPDATE_SECONDS per notification for stage and partial
+text updates, so D-Bus round trips never block the code reporting progress.
+`stage()` and `partial()` do nothing outside `active()`.
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Iterator, Optional, Set
+
+import config
 from utils import log
+from utils import trace
+
+# Shortest interval between two in-place updates of the same notification
+UPDATE_SECONDS: float = getattr(config, "NOTIFY_UPDATE_SECONDS", 0.5)
+# Longest wait for a final notification to be shown before moving on
+FLUSH_TIMEOUT_SECONDS: float = 2.0
+
+# GObject is imported on first use so importing this module stays cheap
+_Notify = None
+_init_lock = threading.Lock()
+
+# Held in a context variable so threads started in a copy of the caller's
+# context (see utils/hedge.py) report to the same notification
+_progress: contextvars.ContextVar[Optional["Progress"]] = contextvars.ContextVar("notification_progress", default=None)
+_cond = threading.Condition()
+_dirty: Set["Progress"] = set()
+_worker: Optional[threading.Thread] = None
+
+
+def _get_notify():
+    """Import the libnotify bindings and initialize them on first use."""
+    global _Notify
+    with _init_lock:
+        if _Notify is None:
+            import gi
+            gi.require_version('Notify', '0.7')
+            from gi.repository import Notify
+            Notify.init("Voice Entry")
+            _Notify = Notify
+    return _Notify
 
 
 def _wrap_text(text: str, width: int = 55) -> str:
@@ -26,12 +78,166 @@ def _wrap_text(text: str, width: int = 55) -> str:
     return "\n".join(lines[:10])  # Limit lines; daemons often cap display
 
 
+class Progress:
+    """One notification bubble, updated in place for the life of a dictation."""
+
+    def __init__(self, title: str) -> None:
+        # The operation this dictation runs; stage updates are titled "<name>: <stage>"
+        self.name = title
+        self.title = title
+        self.body = ""
+        # Set once a result (or error) has been shown rather than a stage
+        self.finished = False
+        self._notification = None
+        self._urgent = False
+        self._showing = False
+        self._last_shown = 0.0
+
+    def update(self, text: str, title: Optional[str] = None, wrap: bool = True, urgent: bool = True) -> None:
+        """Replace the notification's text. Non-urgent updates are throttled to UPDATE_SECONDS."""
+        with _cond:
+            if title is not None:
+                self.title = title
+            self.body = _wrap_text(text) if wrap and text else text
+            self._urgent = self._urgent or urgent
+            _dirty.add(self)
+            _ensure_worker()
+            _cond.notify_all()
+
+    def finish(self, title: str, text: str, wrap: bool = True) -> None:
+        """Show the final result in place of the progress text."""
+        self.finished = True
+        self.update(text, title=title, wrap=wrap)
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT_SECONDS) -> bool:
+        """Wait until the latest update has been shown. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with _cond:
+            while self in _dirty or self._showing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                _cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = FLUSH_TIMEOUT_SECONDS) -> None:
+        """Remove the bubble, e.g. when the dictation ended without a result.
+
+        Drops pending updates and waits for one the worker is showing right
+        now, so it can't bring the bubble back after it was closed.
+        """
+        deadline = time.monotonic() + timeout
+        with _cond:
+            _dirty.discard(self)
+            while self._showing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    log.log_debug("Notification still being shown, closing anyway")
+                    break
+                _cond.wait(remaining)
+        if self._notification is not None:
+            try:
+                self._notification.close()
+            except Exception as e:
+                log.log_debug(f"Could not close notification: {e}")
+
+    def _show(self, title: str, body: str) -> None:
+        with trace.span("notify"):
+            Notify = _get_notify()
+            if self._notification is None:
+                self._notification = Notify.Notification.new(title, body, None)
+            else:
+                self._notification.update(title, body, None)
+            self._notification.show()
+
+
+def _ensure_worker() -> None:
+    """Start the thread that shows pending updates. Call with _cond held."""
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_show_pending, name="notify", daemon=True)
+        _worker.start()
+
+
+def _show_pending() -> None:
+    while True:
+        with _cond:
+            while True:
+                now = time.monotonic()
+                due = [p for p in _dirty if p._urgent or now - p._last_shown >= UPDATE_SECONDS]
+                if due:
+                    break
+                timeout = min((p._last_shown + UPDATE_SECONDS - now for p in _dirty), default=None)
+                _cond.wait(timeout)
+            updates = []
+            for p in due:
+                _dirty.discard(p)
+                p._urgent = False
+                p._showing = True
+                p._last_shown = now
+                updates.append((p, p.title, p.body))
+        for p, title, body in updates:
+            try:
+                p._show(title, body)
+            except Exception as e:
+                log.log_warning(f"Could not show notification: {e}")
+        with _cond:
+            for p, _, _ in updates:
+                p._showing = False
+            _cond.notify_all()
+
+
+def current() -> Optional[Progress]:
+    """The progress notification active in the current context, if any."""
+    return _progress.get()
+
+
+@contextlib.contextmanager
+def active(progress: Progress) -> Iterator[Progress]:
+    """Route this context's notifications to `progress` until the block ends.
+
+    On exit the final state is flushed (so a one-shot recorder process can
+    exit right after), or the bubble is closed if no result was shown.
+    """
+    token = _progress.set(progress)
+    try:
+        yield progress
+    finally:
+        _progress.reset(token)
+        if progress.finished:
+            progress.flush()
+        else:
+            progress.close()
+
+
+def stage(name: str, text: str = "") -> None:
+    """Show that the active dictation reached a stage, e.g. "Transcribing"."""
+    progress = current()
+    if progress is not None:
+        progress.update(text or f"{name}...", title=f"{progress.name}: {name}", urgent=False)
+
+
+def partial(text: str) -> None:
+    """Show streamed text received so far for the active dictation."""
+    progress = current()
+    if progress is not None and text.strip():
+        # Keep the end of long text visible; _wrap_text shows only the first lines
+        progress.update(text[-400:], urgent=False)
+
+
 def send_notification(title: str, text: str, wrap: bool = True) -> None:
-    """Send a desktop notification."""
-    Notify.init("Voice Entry")
-    body = _wrap_text(text) if wrap and text else text
-    notification = Notify.Notification.new(title, body, None)
-    notification.show()
+    """Send a desktop notification.
+
+    Inside `active()` this shows the result in the dictation's notification;
+    otherwise it opens a new one and waits briefly until it is shown.
+    """
+    progress = current()
+    if progress is not None:
+        progress.finish(title, text, wrap)
+        return
+    progress = Progress(title)
+    progress.finish(title, text, wrap)
+    progress.flush()
 
 
 def print_and_notify(title: str, text: str) -> None:
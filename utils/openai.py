@@ -2,23 +2,35 @@
 
 """OpenAI API utilities: transcription and chat completion."""
 
+import io
 from pathlib import Path
-from typing import Optional
-
-from openai import OpenAI
+from typing import Iterator, Optional
 
 import config
+from utils import cache
+from utils import clients
+from utils import hedge
 from utils import log
+from utils import scheduler
+
+# Long recordings take a while to upload and transcribe
+TRANSCRIPTION_DEADLINE_SECONDS: float = getattr(config, "TRANSCRIPTION_DEADLINE_SECONDS", 300.0)
 
-# OpenAI client
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+COMPLETION_SYSTEM_PROMPT = """You are an AI system designed to process dictated directives and generate concise text responses suitable for clipboard use. Your functionalities include:
 
+1. Accepting voice or text directives from users.
+2. Generating brief, clear, and relevant text based on the directive suitable for being put into the user's clipboard.
+3. Ensuring the output is suitable for immediate use in various applications (e.g., emails, documents).
+4. Maintaining a direct and efficient communication style without unnecessary filler or politeness."""
 
-def transcribe_audio(audio_file) -> Optional[str]:
+
+def transcribe_audio(audio_file, prompt: Optional[str] = None) -> Optional[str]:
     """Transcribe the audio data and return the text.
 
     Args:
         audio_file: A file-like object or path to the audio file
+        prompt: Text spoken before this audio, e.g. the previous segment's
+            transcript, so terms are spelled consistently
 
     Returns:
         Transcribed text if successful, None otherwise
@@ -27,11 +39,31 @@ def transcribe_audio(audio_file) -> Optional[str]:
     try:
         if isinstance(audio_file, str):
             audio_file = Path(audio_file)
+        if hedge.policy("transcription") and hasattr(audio_file, "read"):
+            # Hedged uploads run concurrently, so each needs its own file object
+            audio_file.seek(0)
+            data, name = audio_file.read(), getattr(audio_file, "name", "audio.wav")
+            open_upload = lambda: _named_bytes(data, name)
+        else:
+            open_upload = lambda: audio_file
+
+        def request(provider, model, cancelled):
+            upload = open_upload()
+
+            def attempt():
+                # Retries must upload the file from the start again
+                if hasattr(upload, "seek"):
+                    upload.seek(0)
+                return clients.get_client(provider).audio.transcriptions.create(
+                    model=model,
+                    file=upload,
+                    timeout=clients.long_timeout(),
+                    **({"prompt": prompt} if prompt else {})
+                )
 
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file
-        )
+            return scheduler.call(provider, attempt, deadline_seconds=TRANSCRIPTION_DEADLINE_SECONDS, cancelled=cancelled)
+
+        transcript = hedge.call("transcription", ("openai", "whisper-1"), request, valid=lambda t: bool(t.text))
         text = transcript.text
         log.log_info(f"Transcription successful: {text[:50]}...")
         return text
@@ -40,6 +72,30 @@ def transcribe_audio(audio_file) -> Optional[str]:
         return None
 
 
+def _named_bytes(data: bytes, name: str) -> io.BytesIO:
+    upload = io.BytesIO(data)
+    upload.name = name
+    return upload
+
+
+def _chat(provider: str, model: str, system_prompt: str, user_prompt: str, cancelled=None, timeout=None):
+    """One chat completion request under the provider's rate limits.
+
+    `timeout` overrides the client's API_TIMEOUT, e.g. clients.long_timeout()
+    for edits that rewrite a whole document.
+    """
+    return scheduler.call(provider, lambda: clients.get_client(provider).chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.1,
+        max_tokens=2000,
+        **({"timeout": timeout} if timeout else {})
+    ), cancelled=cancelled)
+
+
 def get_completion(text: str) -> Optional[str]:
     """Send text to OpenAI for completion and return the response.
 
@@ -51,23 +107,14 @@ def get_completion(text: str) -> Optional[str]:
     """
     log.log_info("Sending text to OpenAI for completion")
     try:
-        system_prompt = """You are an AI system designed to process dictated directives and generate concise text responses suitable for clipboard use. Your functionalities include:
+        def request(provider, model, cancelled) -> Optional[str]:
+            response = _chat(provider, model, COMPLETION_SYSTEM_PROMPT, text, cancelled)
+            return response.choices[0].message.content
 
-1. Accepting voice or text directives from users.
-2. Generating brief, clear, and relevant text based on the directive suitable for being put into the user's clipboard.
-3. Ensuring the output is suitable for immediate use in various applications (e.g., emails, documents).
-4. Maintaining a direct and efficient communication style without unnecessary filler or politeness."""
+        def fetch() -> Optional[str]:
+            return hedge.call("completion", ("openai", "gpt-4o-mini"), request)
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text}
-            ],
-            temperature=0.1,
-            max_tokens=2000
-        )
-        completion = response.choices[0].message.content
+        completion = cache.cached("openai", "gpt-4o-mini", COMPLETION_SYSTEM_PROMPT, 0.1, text, fetch)
         log.log_info(f"Completion successful: {completion[:50]}...")
         return completion
     except Exception as e:
@@ -75,24 +122,36 @@ def get_completion(text: str) -> Optional[str]:
         return None
 
 
-def get_edit(directive: str, get_clipboard) -> Optional[str]:
-    """Edit clipboard content based on a voice directive and return the result.
+def stream_completion(text: str) -> Iterator[str]:
+    """Stream a completion for text, yielding content as it is generated.
 
     Args:
-        directive: The voice directive describing what changes to make
-        get_clipboard: Function to get the current clipboard content
+        text: The user prompt or voice directive
 
-    Returns:
-        Edited text if successful, None otherwise
+    Yields:
+        Successive pieces of the completion. On error the stream just ends.
     """
-    log.log_info("Sending text to OpenAI for edit")
+    log.log_info("Streaming completion from OpenAI")
     try:
-        clipboard_text = get_clipboard()
-        if not clipboard_text:
-            log.log_error("No clipboard content available")
-            return None
+        # Only opening the stream is retried; once tokens flow it can't be replayed
+        stream = scheduler.call("openai", lambda: clients.get_client("openai").chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": COMPLETION_SYSTEM_PROMPT},
+                {"role": "user", "content": text}
+            ],
+            temperature=0.1,
+            max_tokens=2000,
+            stream=True
+        ))
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        log.log_error(f"Error streaming completion: {e}")
+
 
-        system_prompt = """You are an AI system designed to perform surgical edits on text based on voice directives. Your task is to:
+EDIT_SYSTEM_PROMPT = """You are an AI system designed to perform surgical edits on text based on voice directives. Your task is to:
 
 1. Take the provided original_text in full
 2. Use the voice_directive to understand what specific changes are requested
@@ -101,18 +160,145 @@ def get_edit(directive: str, get_clipboard) -> Optional[str]:
 5. Maintain the original style and tone
 6. Respond with only the full edited text, without explanations or commentary"""
 
-        user_prompt = f"<original_text>{clipboard_text}</original_text>\n<voice_directive>{directive}</voice_directive>"
+PATCH_SYSTEM_PROMPT = """You are an AI system designed to perform surgical edits on text based on voice directives. Your task is to:
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=2000
-        )
-        completion = response.choices[0].message.content
+1. Read the provided original_text
+2. Use the voice_directive to understand what specific changes are requested
+3. Output ONLY the changes, as one or more search/replace blocks in this exact format:
+
+<<<<<<< SEARCH
+exact text copied from original_text
+=======
+replacement text
+>>>>>>> REPLACE
+
+Rules:
+- Each SEARCH block must be copied character for character from original_text, including whitespace and punctuation
+- Each SEARCH block must match exactly one place in original_text; include enough surrounding words to make it unique, but no more
+- Use one block per separate change, in the order they appear in the text
+- To delete text, leave the replacement empty
+- Maintain the original style and tone in replacements
+- Respond with only the blocks, without explanations or commentary"""
+
+
+class EditPrompt:
+    """The part of an edit request that doesn't depend on the directive.
+
+    Built from the clipboard when a recording starts (see audio.capture_context),
+    so only the directive is appended once the transcript arrives. The
+    document comes before the directive, after the system prompt, so repeated
+    edits of the same text share a prefix the provider can cache.
+    """
+
+    def __init__(self, clipboard_text: str) -> None:
+        self.clipboard_text = clipboard_text
+        self.prefix = f"<original_text>{clipboard_text}</original_text>\n"
+
+    def render(self, directive: str) -> str:
+        return f"{self.prefix}<voice_directive>{directive}</voice_directive>"
+
+
+def _request_edit(system_prompt: str, user_prompt: str) -> Optional[str]:
+    def request(provider, model, cancelled) -> Optional[str]:
+        choice = _chat(provider, model, system_prompt, user_prompt, cancelled, clients.long_timeout()).choices[0]
+        if choice.finish_reason == "length":
+            log.log_warning("Edit response was truncated at max_tokens")
+            return None
+        return choice.message.content
+
+    def fetch() -> Optional[str]:
+        return hedge.call("edit", ("openai", "gpt-4o-mini"), request)
+
+    return cache.cached("openai", "gpt-4o-mini", system_prompt, 0.1, user_prompt, fetch)
+
+
+def _get_patch_edit(prompt: EditPrompt, directive: str) -> Optional[str]:
+    """Ask for search/replace hunks and apply them locally. None if they don't apply."""
+    from utils import patch
+    response = _request_edit(PATCH_SYSTEM_PROMPT, prompt.render(directive))
+    hunks = patch.parse_hunks(response)
+    edited = patch.apply_hunks(prompt.clipboard_text, hunks)
+    if edited is not None:
+        log.log_info(f"Applied {len(hunks)} edit hunk(s)")
+    return edited
+
+
+SHARD_ROUTE_SYSTEM_PROMPT = """You route edit directives to the sections of a long document. You are given the document's sections, numbered, and a voice directive. Respond with only a JSON array of the section numbers whose text must change to carry out the directive, e.g. [0, 3]. If the directive applies throughout the document (e.g. renaming a term everywhere), list every section that contains it."""
+
+
+def _route_shards(shards: list, directive: str) -> list:
+    """Ask which shards the directive affects.
+
+    The router reads every shard in full, so it can find text anywhere in
+    the document; its answer is only a short list of numbers.
+    """
+    from utils import shard
+    outline = "\n\n".join(f"<section number=\"{i}\">{text}</section>" for i, text in enumerate(shards))
+    user_prompt = f"<sections>{outline}</sections>\n<voice_directive>{directive}</voice_directive>"
+    try:
+        response = _chat("openai", "gpt-4o-mini", SHARD_ROUTE_SYSTEM_PROMPT, user_prompt).choices[0].message.content
+    except Exception as e:
+        log.log_warning(f"Shard routing failed, editing every shard: {e}")
+        return list(range(len(shards)))
+    return shard.parse_selection(response, len(shards))
+
+
+def _get_sharded_edit(text: str, directive: str) -> Optional[str]:
+    """Edit a large document shard by shard, leaving unaffected shards untouched."""
+    from utils import shard
+    shards = shard.split(text)
+    selected = _route_shards(shards, directive)
+    log.log_info(f"Editing {len(selected)} of {len(shards)} shards: {selected}")
+    return shard.edit_shards(shards, selected, lambda part: _request_edit(EDIT_SYSTEM_PROMPT, EditPrompt(part).render(directive)))
+
+
+def _get_rewrite(prompt: EditPrompt, directive: str) -> Optional[str]:
+    """Have the model rewrite the document, shard by shard if it is long."""
+    from utils import shard
+    if len(prompt.clipboard_text) > shard.MAX_CHARS:
+        return _get_sharded_edit(prompt.clipboard_text, directive)
+    return _request_edit(EDIT_SYSTEM_PROMPT, prompt.render(directive))
+
+
+def get_edit(directive: str, get_clipboard, prompt: Optional[EditPrompt] = None) -> Optional[str]:
+    """Edit clipboard content based on a voice directive and return the result.
+
+    With EDIT_MODE = "patch" (the default) the model returns only the changed
+    spans, which are applied locally; if they don't apply cleanly the whole
+    document is rewritten instead. EDIT_MODE = "rewrite" always rewrites.
+
+    Rewrites of documents longer than EDIT_SHARD_CHARS are split into shards
+    (see utils/shard.py); only the shards the directive affects are
+    rewritten, in parallel. Patches already return only the changed spans,
+    so they are requested for the whole document in one go.
+
+    Args:
+        directive: The voice directive describing what changes to make
+        get_clipboard: Function to get the current clipboard content, used
+            when no prepared prompt (or an empty one) is given
+        prompt: Edit prompt prepared from the clipboard when recording started
+
+    Returns:
+        Edited text if successful, None otherwise
+    """
+    log.log_info("Sending text to OpenAI for edit")
+    try:
+        if prompt is None or not prompt.clipboard_text:
+            clipboard_text = get_clipboard()
+            if not clipboard_text:
+                log.log_error("No clipboard content available")
+                return None
+            prompt = EditPrompt(clipboard_text)
+
+        completion = None
+        if getattr(config, "EDIT_MODE", "patch") == "patch":
+            completion = _get_patch_edit(prompt, directive)
+            if completion is None:
+                log.log_warning("Patch edit failed, falling back to full rewrite")
+        if completion is None:
+            completion = _get_rewrite(prompt, directive)
+        if completion is None:
+            return None
         log.log_info(f"Edit successful: {completion[:50]}...")
         return completion
     except Exception as e:
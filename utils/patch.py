@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""Search/replace hunks for patch-based edits.
+
+In patch mode the model answers an edit with only the spans it changes:
+
+    <<<<<<< SEARCH
+    exact text copied from the original
+    =======
+    replacement text
+    >>>>>>> REPLACE
+
+The hunks are validated and applied locally, so output tokens scale with the
+size of the edit rather than the size of the document.
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+from utils import log
+
+_HUNK_RE = re.compile(
+    r"<<<<<<< SEARCH\n(.*?)\n?=======\n(.*?)\n?>>>>>>> REPLACE",
+    re.DOTALL,
+)
+
+
+class Hunk(NamedTuple):
+    search: str
+    replace: str
+
+
+def parse_hunks(response: str) -> List[Hunk]:
+    """Extract the search/replace hunks from a model response."""
+    return [Hunk(search, replace) for search, replace in _HUNK_RE.findall(response or "")]
+
+
+def apply_hunks(text: str, hunks: List[Hunk]) -> Optional[str]:
+    """Apply hunks to text in order.
+
+    Each search block must occur exactly once in the text as it stands when
+    the hunk is applied; otherwise the edit is ambiguous or hallucinated.
+
+    Returns:
+        The edited text, or None if there are no hunks or any hunk fails
+    """
+    if not hunks:
+        log.log_warning("Edit response contained no hunks")
+        return None
+    for i, hunk in enumerate(hunks):
+        if not hunk.search:
+            log.log_warning(f"Hunk {i} has an empty search block")
+            return None
+        count = text.count(hunk.search)
+        if count != 1:
+            log.log_warning(f"Hunk {i} search block matched {count} times")
+            return None
+        text = text.replace(hunk.search, hunk.replace, 1)
+    return text
@@ -2,12 +2,15 @@
 
 """Send queries to Perplexity SonarPro API - used when feeding from recording or clipboard."""
 
-from openai import OpenAI
-
-import config
+from utils import cache
+from utils import clients
+from utils import clipboard
+from utils import hedge
 from utils import log
 from utils import notification
-from utils import xclip
+from utils import scheduler
+
+SYSTEM_PROMPT = "Be concise and helpful. Provide direct answers suitable for clipboard use. Use plain text only—no formatting, no markdown, no asterisks, no bold or italics, no bullet points or numbered lists. Output should be minimal and unformatted."
 
 
 def run_perplexity(text: str) -> None:
@@ -23,7 +26,7 @@ def run_perplexity(text: str) -> None:
         log.log_warning("Empty text for Perplexity, skipping")
         return
 
-    if not config.PERPLEXITY_API_KEY:
+    if not clients.api_key("perplexity"):
         log.log_error("PERPLEXITY_API_KEY not set in config.py")
         notification.send_notification("Perplexity", "API key not configured")
         return
@@ -31,22 +34,24 @@ def run_perplexity(text: str) -> None:
     log.log_info(f"Running Perplexity with: {text[:80]}...")
 
     try:
-        client = OpenAI(
-            api_key=config.PERPLEXITY_API_KEY,
-            base_url="https://api.perplexity.ai"
-        )
-        response = client.chat.completions.create(
-            model="sonar-pro",
-            messages=[
-                {"role": "system", "content": "Be concise and helpful. Provide direct answers suitable for clipboard use. Use plain text only—no formatting, no markdown, no asterisks, no bold or italics, no bullet points or numbered lists. Output should be minimal and unformatted."},
-                {"role": "user", "content": text.strip()}
-            ],
-            temperature=0.1,
-            max_tokens=2000
-        )
-        result = response.choices[0].message.content
+        def request(provider, model, cancelled):
+            response = scheduler.call(provider, lambda: clients.get_client(provider).chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": text.strip()}
+                ],
+                temperature=0.1,
+                max_tokens=2000
+            ), cancelled=cancelled)
+            return response.choices[0].message.content
+
+        def fetch():
+            return hedge.call("perplexity", ("perplexity", "sonar-pro"), request)
+
+        result = cache.cached("perplexity", "sonar-pro", SYSTEM_PROMPT, 0.1, text.strip(), fetch)
         if result:
-            xclip.set_clipboard(result)
+            clipboard.set_clipboard(result)
             log.log_info(f"Copied to clipboard: {result[:50]}...")
             notification.send_notification("Perplexity", result)
         else:
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""PID file tracking for the standalone recorder process.
+
+Kept free of heavy imports: every trigger mode loads this module just to find
+and signal a running recorder. Even typing and tempfile (which pulls in
+shutil and random) are avoided, see bench/startup.py.
+"""
+
+from __future__ import annotations
+
+import os
+
+from utils import log
+
+# typing.TYPE_CHECKING without importing typing
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Optional
+
+
+def temp_dir() -> str:
+    """The directory tempfile.gettempdir() would pick, without importing tempfile.
+
+    Checks $TMPDIR, $TEMP and $TMP, then the usual system locations, and
+    returns the first writable directory.
+    """
+    candidates = [os.environ.get(name) for name in ("TMPDIR", "TEMP", "TMP")]
+    for path in [*candidates, "/tmp", "/var/tmp", "/usr/tmp"]:
+        if path and os.path.isdir(path) and os.access(path, os.W_OK | os.X_OK):
+            return os.path.abspath(path)
+    return os.getcwd()
+
+
+PID_FILE: str = os.path.join(temp_dir(), "voice_entry.pid")
+
+
+def get_recording_pid() -> Optional[int]:
+    """Get the PID of the currently running recording process."""
+    if not os.path.exists(PID_FILE):
+        log.log_debug("No PID file found")
+        return None
+    try:
+        with open(PID_FILE, 'r') as f:
+            pid = int(f.read().strip())
+            log.log_debug(f"Found PID file with PID: {pid}")
+            return pid
+    except (ValueError, FileNotFoundError) as e:
+        log.log_error(f"Error reading PID file: {e}")
+        return None
+
+
+def is_recording() -> bool:
+    """Check if a recording is in progress."""
+    pid = get_recording_pid()
+    if pid is None:
+        log.log_debug("No recording PID file found")
+        return False
+    
+    # Check if the process is still running
+    try:
+        os.kill(pid, 0)  # This will raise ProcessLookupError if the process is not running
+        log.log_debug(f"Recording in progress with PID {pid}")
+        return True
+    except ProcessLookupError:
+        # Clean up stale PID file
+        if os.path.exists(PID_FILE):
+            log.log_warning(f"Found stale PID file for process {pid}, removing")
+            os.remove(PID_FILE)
+        return False
+
+def send_signal_to_recording(signal_type: int) -> None:
+    """Send a signal to the recording process."""
+    pid = get_recording_pid()
+    if pid is not None:
+        try:
+            os.kill(pid, signal_type)
+            log.log_info(f"Sent signal {signal_type} to process {pid}")
+        except ProcessLookupError:
+            log.log_error(f"Process {pid} not found")
+    else:
+        log.log_warning("No recording process found")
+
+
+def release_recording_pid() -> None:
+    """Remove the PID file if it still names this process.
+
+    The recorder gives up the PID file as soon as capture stops, so a new
+    recording can start while this one is still being processed; by the time
+    processing ends the file may belong to that newer recorder.
+    """
+    if get_recording_pid() == os.getpid():
+        try:
+            os.remove(PID_FILE)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+"""Rate-limit-aware scheduling for API calls.
+
+Every API request goes through `call()`, which:
+
+- waits for a token from the provider's token bucket (requests per second
+  with a burst allowance),
+- holds one of the provider's concurrency slots while the request runs,
+- retries 429s, 5xx responses, timeouts and connection errors with jittered
+  exponential backoff, honoring Retry-After when the server sends it,
+- gives up once the request's deadline would be exceeded.
+
+Limits are configured per provider with API_RATE_LIMITS in config.py, e.g.
+
+    API_RATE_LIMITS = {"openai": {"requests_per_second": 5, "burst": 10, "concurrency": 4}}
+"""
+
+import email.utils
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+import config
+from utils import log
+
+T = TypeVar("T")
+
+DEFAULT_LIMITS: Dict[str, float] = {"requests_per_second": 5.0, "burst": 10, "concurrency": 4}
+MAX_ATTEMPTS: int = getattr(config, "API_MAX_ATTEMPTS", 5)
+DEADLINE_SECONDS: float = getattr(config, "API_DEADLINE_SECONDS", 120.0)
+BACKOFF_BASE_SECONDS: float = 0.5
+BACKOFF_MAX_SECONDS: float = 20.0
+
+# HTTP statuses worth retrying
+RETRY_STATUSES = {408, 409, 429}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request cannot be started or retried within its deadline."""
+
+
+class Cancelled(Exception):
+    """Raised when a request was cancelled before it could be started or retried."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float) -> bool:
+        """Take one token, waiting until `deadline` (monotonic) at most."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class _Provider:
+    def __init__(self, limits: Dict[str, float]) -> None:
+        self.bucket = TokenBucket(limits["requests_per_second"], limits["burst"])
+        self.slots = threading.BoundedSemaphore(int(limits["concurrency"]))
+
+
+_providers: Dict[str, _Provider] = {}
+_providers_lock = threading.Lock()
+
+
+def _provider(name: str) -> _Provider:
+    with _providers_lock:
+        if name not in _providers:
+            limits = {**DEFAULT_LIMITS, **getattr(config, "API_RATE_LIMITS", {}).get(name, {})}
+            _providers[name] = _Provider(limits)
+        return _providers[name]
+
+
+def _status(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an API error is transient (throttling, server error, network)."""
+    status = _status(error)
+    if status is not None:
+        return status in RETRY_STATUSES or status >= 500
+    # No HTTP status: connection and timeout errors from the SDK or httpx
+    name = type(error).__name__
+    return name in ("APIConnectionError", "APITimeoutError") or name.endswith(("TimeoutException", "ConnectError", "ReadError"))
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, from Retry-After(-ms) headers."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def backoff(attempt: int, error: Exception) -> float:
+    """Delay before retry number `attempt` (1-based): full-jitter exponential, at least Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    server_delay = retry_after(error)
+    if server_delay is not None:
+        delay = max(delay, server_delay)
+    return delay
+
+
+def call(provider: str, fn: Callable[[], T], deadline_seconds: Optional[float] = None, max_attempts: Optional[int] = None,
+         cancelled: Optional[threading.Event] = None) -> T:
+    """Run an API request under the provider's limits, retrying transient failures.
+
+    Args:
+        provider: Provider name, e.g. "openai" or "perplexity"
+        fn: Makes the request; called once per attempt
+        deadline_seconds: Total time budget including waits and retries
+        max_attempts: Maximum number of attempts
+        cancelled: Once set, no further attempt is started (e.g. a hedged
+            request that lost, see utils/hedge.py)
+
+    Returns:
+        Whatever `fn` returns
+
+    Raises:
+        The last error from `fn` if it is not retryable or attempts run out,
+        DeadlineExceeded if the budget runs out while waiting, or Cancelled
+    """
+    deadline = time.monotonic() + (deadline_seconds or DEADLINE_SECONDS)
+    max_attempts = max_attempts or MAX_ATTEMPTS
+    limits = _provider(provider)
+
+    attempt = 0
+    while True:
+        attempt += 1
+        if cancelled is not None and cancelled.is_set():
+            raise Cancelled(f"{provider} request cancelled")
+        if not limits.bucket.acquire(deadline):
+            raise DeadlineExceeded(f"{provider} rate limit wait exceeds deadline")
+        if not limits.slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise DeadlineExceeded(f"No free {provider} connection slot before deadline")
+        try:
+            return fn()
+        except Exception as e:
+            if not is_retryable(e) or attempt >= max_attempts:
+                raise
+            delay = backoff(attempt, e)
+            if time.monotonic() + delay > deadline:
+                log.log_warning(f"{provider} request failed and retry would exceed deadline: {e}")
+                raise
+            log.log_warning(f"{provider} request failed (attempt {attempt}, status {_status(e)}), retrying in {delay:.1f}s: {e}")
+        finally:
+            limits.slots.release()
+        if cancelled is not None:
+            cancelled.wait(delay)
+        else:
+            time.sleep(delay)
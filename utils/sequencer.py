@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""Deliver the results of overlapping dictations in the order they were stopped.
+
+Processing a recording (transcription, the API call) can run concurrently
+with the next recording and with other dictations, in recorder processes or
+daemon threads. The output (clipboard, typing, Goose, notification) must
+still land in hotkey order, so each dictation takes a ticket when it stops
+and waits for its turn before delivering:
+
+    ticket = sequencer.take()
+    ...transcribe and process...
+    ticket.wait_turn()
+    ...deliver...
+    ticket.release()
+
+Tickets are files named after a shared counter in QUEUE_DIR, so the order
+holds across processes. A ticket whose process has died no longer blocks
+anyone, and no dictation waits longer than MAX_WAIT_SECONDS for the ones
+ahead of it.
+"""
+
+import fcntl
+import os
+import tempfile
+import time
+from typing import List, Tuple
+
+import config
+from utils import log
+
+QUEUE_DIR: str = os.path.join(tempfile.gettempdir(), "voice_entry_queue")
+COUNTER_FILE: str = os.path.join(QUEUE_DIR, "counter")
+
+# Longest a finished dictation waits for earlier ones (e.g. a long Goose run) before delivering anyway
+MAX_WAIT_SECONDS: float = getattr(config, "OUTPUT_ORDER_MAX_WAIT_SECONDS", 30.0)
+POLL_SECONDS: float = 0.02
+
+
+class Ticket:
+    """A dictation's place in the output queue."""
+
+    def __init__(self, seq: int, path: str) -> None:
+        self.seq = seq
+        self.path = path
+
+    def wait_turn(self, timeout: float = None) -> bool:
+        """Block until every earlier ticket is released. Returns False if the wait timed out."""
+        timeout = MAX_WAIT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            ahead = _tickets_ahead(self.seq)
+            if not ahead:
+                return True
+            if time.monotonic() >= deadline:
+                log.log_warning(f"Output {self.seq} waited {timeout}s for {len(ahead)} earlier dictation(s), delivering out of order")
+                return False
+            time.sleep(POLL_SECONDS)
+
+    def release(self) -> None:
+        """Let the next dictation deliver. Safe to call more than once."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def take() -> Ticket:
+    """Take the next place in the output queue."""
+    os.makedirs(QUEUE_DIR, exist_ok=True)
+    with open(COUNTER_FILE, "a+") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        f.seek(0)
+        seq = int(f.read().strip() or 0) + 1
+        f.seek(0)
+        f.truncate()
+        f.write(str(seq))
+        f.flush()
+        # Create the ticket before unlocking so a later taker always sees it
+        path = os.path.join(QUEUE_DIR, f"{seq:012d}-{os.getpid()}")
+        open(path, "w").close()
+    log.log_debug(f"Took output ticket {seq}")
+    return Ticket(seq, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _tickets_ahead(seq: int) -> List[Tuple[int, int]]:
+    """(seq, pid) of the live tickets before `seq`; tickets of dead processes are removed."""
+    ahead = []
+    for name in os.listdir(QUEUE_DIR):
+        number, _, pid = name.partition("-")
+        if not pid or not number.isdigit() or int(number) >= seq:
+            continue
+        if _pid_alive(int(pid)):
+            ahead.append((int(number), int(pid)))
+        else:
+            log.log_warning(f"Dropping output ticket {int(number)} of dead process {pid}")
+            try:
+                os.remove(os.path.join(QUEUE_DIR, name))
+            except FileNotFoundError:
+                pass
+    return ahead
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+"""Split large documents into shards for parallel edits.
+
+A document longer than EDIT_SHARD_CHARS is cut at structural boundaries:
+headings start a new block, blank lines end one, and fenced code blocks are
+never split. Blocks are packed into shards of at most EDIT_SHARD_CHARS
+characters (a single oversized block is cut between lines), and joining
+the shards gives back the document byte for byte.
+
+When a document is rewritten (EDIT_MODE = "rewrite", or after a patch
+failed to apply), utils/openai.py asks the model which shards a directive
+affects, rewrites those with `edit_shards()` on a bounded thread pool of
+EDIT_SHARD_WORKERS, and leaves the other shards exactly as they were.
+"""
+
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+import config
+from utils import log
+
+# Tunables, overridable from config.py
+MAX_CHARS: int = getattr(config, "EDIT_SHARD_CHARS", 4000)
+MAX_WORKERS: int = getattr(config, "EDIT_SHARD_WORKERS", 4)
+
+_HEADING_RE = re.compile(r"#{1,6}\s")
+_FENCE_RE = re.compile(r"(```|~~~)")
+
+
+def _blocks(text: str) -> List[str]:
+    """Cut text into paragraphs, headings and code blocks, keeping every character."""
+    blocks: List[str] = []
+    current: List[str] = []
+    fence: Optional[str] = None
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if fence is None:
+            opening = _FENCE_RE.match(stripped)
+            starts_block = _HEADING_RE.match(line) or opening
+            # A new block starts at a heading or fence, unless we are still in leading blank lines
+            if starts_block and any(l.strip() for l in current):
+                blocks.append("".join(current))
+                current = []
+            current.append(line)
+            if opening:
+                fence = opening.group(1)
+            elif not stripped and any(l.strip() for l in current[:-1]):
+                # A blank line ends the paragraph; further blank lines join it
+                blocks.append("".join(current))
+                current = []
+        else:
+            current.append(line)
+            if stripped.startswith(fence):
+                fence = None
+    if current:
+        blocks.append("".join(current))
+    # Blank lines that started a block belong to the previous one
+    merged: List[str] = []
+    for block in blocks:
+        if merged and not block.strip():
+            merged[-1] += block
+        else:
+            merged.append(block)
+    return merged
+
+
+def _cut(block: str, max_chars: int) -> Iterable[str]:
+    """Cut an oversized block between lines (or anywhere, for a single huge line)."""
+    piece = ""
+    for line in block.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if piece:
+                yield piece
+                piece = ""
+            yield line[:max_chars]
+            line = line[max_chars:]
+        if piece and len(piece) + len(line) > max_chars:
+            yield piece
+            piece = ""
+        piece += line
+    if piece:
+        yield piece
+
+
+def split(text: str, max_chars: int = MAX_CHARS) -> List[str]:
+    """Split text into shards of at most `max_chars` at structural boundaries.
+
+    "".join(split(text)) == text always holds.
+    """
+    shards: List[str] = []
+    current = ""
+    for block in _blocks(text):
+        pieces = [block] if len(block) <= max_chars else list(_cut(block, max_chars))
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                shards.append(current)
+                current = ""
+            current += piece
+    if current:
+        shards.append(current)
+    return shards
+
+
+def parse_selection(response: Optional[str], count: int) -> List[int]:
+    """Shard numbers from a model answer like "[0, 3]".
+
+    Every shard is selected if the answer can't be parsed or selects none:
+    the user asked for an edit, so handing the document back unchanged
+    would be a silent failure.
+    """
+    match = re.search(r"\[([\d,\s]*)\]", response or "")
+    if match is None:
+        log.log_warning("Could not parse which shards to edit, editing all of them")
+        return list(range(count))
+    selected = sorted({int(n) for n in re.findall(r"\d+", match.group(1)) if int(n) < count})
+    if not selected:
+        log.log_warning("No shard selected for the edit, editing all of them")
+        return list(range(count))
+    return selected
+
+
+def edit_shards(shards: List[str], selected: List[int], edit: Callable[[str], Optional[str]],
+                max_workers: int = MAX_WORKERS) -> Optional[str]:
+    """Edit the selected shards concurrently and reassemble the document.
+
+    Args:
+        shards: The document, as returned by split()
+        selected: Indexes of the shards to edit
+        edit: Edits one shard's text, returning None on failure
+        max_workers: Shards edited at once
+
+    Returns:
+        The document with the selected shards replaced, or None if any edit failed
+    """
+    result = list(shards)
+    if not selected:
+        return "".join(result)
+    # Each edit runs in a copy of the caller's context, so per-request state
+    # such as cache.bypassing() carries over to the worker threads
+    contexts = [contextvars.copy_context() for _ in selected]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(selected))), thread_name_prefix="shard") as pool:
+        edited = list(pool.map(lambda i, context: context.run(edit, shards[i]), selected, contexts))
+    for i, text in zip(selected, edited):
+        if text is None:
+            log.log_error(f"Edit of shard {i} failed")
+            return None
+        # Keep the shard's trailing whitespace so the seams between shards don't change
+        trailing = shards[i][len(shards[i].rstrip()):]
+        result[i] = text.rstrip() + trailing if text.strip() else ""
+    return "".join(result)
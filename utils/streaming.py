@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+"""Incremental transcription while a recording is still in progress.
+
+The capture thread feeds PCM into a StreamingTranscriber, which cuts the
+audio into segments at pauses and uploads finished segments in the
+background. When recording stops only the final tail is still in flight,
+so transcription latency no longer grows with the length of the dictation.
+
+Enable with STREAMING_TRANSCRIPTION = True in config.py.
+
+Recordings longer than SEGMENTED_TRANSCRIPTION_SECONDS that weren't
+streamed (or whose streaming failed) are cut the same way after the fact by
+`transcribe_recording()`, into segments of up to SEGMENTED_MAX_SEGMENT_SECONDS
+transcribed SEGMENTED_MAX_WORKERS at a time, instead of being uploaded as one
+file that may exceed the API's size limit.
+
+Each segment is transcribed with the end of the latest earlier segment's
+transcript as its prompt, so names and terms are spelled consistently
+across cuts.
+"""
+
+import re
+import threading
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import config
+from utils import log
+from utils import wav
+
+# Tunables, overridable from config.py
+MIN_SEGMENT_SECONDS: float = getattr(config, "STREAMING_MIN_SEGMENT_SECONDS", 10.0)
+MAX_SEGMENT_SECONDS: float = getattr(config, "STREAMING_MAX_SEGMENT_SECONDS", 30.0)
+PAUSE_SECONDS: float = getattr(config, "STREAMING_PAUSE_SECONDS", 0.5)
+SILENCE_RMS: float = getattr(config, "STREAMING_SILENCE_RMS", 500.0)
+MAX_WORKERS: int = getattr(config, "STREAMING_MAX_WORKERS", 2)
+SEGMENTED_SECONDS: float = getattr(config, "SEGMENTED_TRANSCRIPTION_SECONDS", 120.0)
+SEGMENTED_MAX_SEGMENT_SECONDS: float = getattr(config, "SEGMENTED_MAX_SEGMENT_SECONDS", 60.0)
+SEGMENTED_MAX_WORKERS: int = getattr(config, "SEGMENTED_MAX_WORKERS", 4)
+
+# Audio repeated across a forced (no pause found) cut so no word is lost
+OVERLAP_SECONDS: float = 0.5
+# Energy is measured over frames of this length
+FRAME_SECONDS: float = 0.02
+# Longest word run considered when removing overlap between segments
+MAX_OVERLAP_WORDS: int = 8
+# Characters of the previous transcript passed as the next segment's prompt
+# (Whisper only reads the last 224 tokens of a prompt)
+CONTEXT_CHARS: int = 500
+
+
+def is_enabled() -> bool:
+    """Whether streaming transcription is turned on in config.py."""
+    return bool(getattr(config, "STREAMING_TRANSCRIPTION", False))
+
+
+def _frame_rms(frame: bytes) -> float:
+    samples = array('h', frame)
+    if not samples:
+        return 0.0
+    return (sum(s * s for s in samples) / len(samples)) ** 0.5
+
+
+def _frames_rms(pcm: bytes, frame_len: int) -> List[float]:
+    """RMS of each complete int16 frame of `frame_len` samples, vectorized when numpy is available."""
+    from utils import vad
+    if vad.np is not None:
+        return vad.frame_rms(vad.np.frombuffer(pcm, dtype=vad.np.int16), frame_len).tolist()
+    frame_bytes = frame_len * 2
+    return [_frame_rms(pcm[i:i + frame_bytes]) for i in range(0, len(pcm) - frame_bytes + 1, frame_bytes)]
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def stitch(parts: List[Tuple[str, bool]]) -> str:
+    """Join segment transcripts in order.
+
+    Args:
+        parts: (text, overlapped) pairs. `overlapped` means the segment starts
+            with audio repeated from the end of the previous one, so words
+            duplicated across the seam are dropped.
+
+    Returns:
+        The combined transcript
+    """
+    words: List[str] = []
+    for text, overlapped in parts:
+        new_words = text.split()
+        if overlapped and words:
+            tail = [_normalize(w) for w in words[-MAX_OVERLAP_WORDS:]]
+            head = [_normalize(w) for w in new_words[:MAX_OVERLAP_WORDS]]
+            for n in range(min(len(tail), len(head)), 0, -1):
+                if tail[-n:] == head[:n]:
+                    new_words = new_words[n:]
+                    break
+        words.extend(new_words)
+    return " ".join(words)
+
+
+class StreamingTranscriber:
+    """Segments live audio at pauses and transcribes segments in the background."""
+
+    def __init__(self, rate: int = wav.RATE, sample_width: int = wav.SAMPLE_WIDTH,
+                 min_seconds: float = MIN_SEGMENT_SECONDS, max_seconds: float = MAX_SEGMENT_SECONDS,
+                 max_workers: int = MAX_WORKERS) -> None:
+        self.rate = rate
+        self.sample_width = sample_width
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self._bytes_per_second = rate * sample_width
+        self._frame_bytes = int(FRAME_SECONDS * rate) * sample_width
+        self._buffer = bytearray()
+        self._pending = bytearray()  # incomplete energy frame
+        self._silence_bytes = 0
+        self._overlapped = False
+        self._segments: List[Tuple[Future, bool]] = []
+        self._texts: Dict[int, str] = {}  # finished transcripts, for the next segments' prompts
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="segment")
+        self._lock = threading.Lock()
+
+    def feed(self, data: bytes) -> None:
+        """Add captured PCM. Called from the capture thread, so it stays cheap."""
+        with self._lock:
+            self._pending.extend(data)
+            complete = len(self._pending) - len(self._pending) % self._frame_bytes
+            if not complete:
+                return
+            pcm = bytes(self._pending[:complete])
+            del self._pending[:complete]
+            # Energy of every complete frame at once, then cut frame by frame
+            for i, rms in enumerate(_frames_rms(pcm, self._frame_bytes // self.sample_width)):
+                self._add_frame(pcm[i * self._frame_bytes:(i + 1) * self._frame_bytes], rms)
+
+    def _add_frame(self, frame: bytes, rms: float) -> None:
+        self._buffer.extend(frame)
+        if rms < SILENCE_RMS:
+            self._silence_bytes += len(frame)
+        else:
+            self._silence_bytes = 0
+
+        seconds = len(self._buffer) / self._bytes_per_second
+        pause = self._silence_bytes / self._bytes_per_second
+        if seconds >= self.min_seconds and pause >= PAUSE_SECONDS:
+            # Cut in the middle of the pause
+            keep = self._align(self._silence_bytes // 2)
+            self._submit(bytes(self._buffer[:len(self._buffer) - keep]), self._overlapped)
+            del self._buffer[:len(self._buffer) - keep]
+            self._silence_bytes = keep
+            self._overlapped = False
+        elif seconds >= self.max_seconds:
+            # No pause found; cut here and repeat a little audio in the next segment
+            overlap = self._align(int(OVERLAP_SECONDS * self._bytes_per_second))
+            self._submit(bytes(self._buffer), self._overlapped)
+            del self._buffer[:len(self._buffer) - overlap]
+            self._overlapped = True
+
+    def _align(self, n: int) -> int:
+        return n - n % self.sample_width
+
+    def _submit(self, pcm: bytes, overlapped: bool) -> None:
+        index = len(self._segments)
+        log.log_info(f"Submitting segment {index} ({len(pcm) / self._bytes_per_second:.1f}s) for transcription")
+        future = self._executor.submit(self._transcribe, pcm, index)
+        self._segments.append((future, overlapped))
+
+    def _context(self, index: int) -> Optional[str]:
+        """The end of the latest finished transcript before segment `index`."""
+        with self._lock:
+            earlier = [i for i in self._texts if i < index]
+            if not earlier:
+                return None
+            return self._texts[max(earlier)][-CONTEXT_CHARS:] or None
+
+    def _transcribe(self, pcm: bytes, index: int) -> Optional[str]:
+        from utils import encode, transcription, vad
+        if vad.is_enabled() and self.sample_width == 2:
+            pcm, _ = vad.trim_silence(pcm, self.rate)
+        encoding = "wav" if transcription.is_local() else None
+        upload = encode.encode_pcm(memoryview(pcm), rate=self.rate, sample_width=self.sample_width, encoding=encoding)
+        text = transcription.transcribe(upload, prompt=self._context(index))
+        if text is not None:
+            with self._lock:
+                self._texts[index] = text
+        return text
+
+    def finish(self) -> Optional[str]:
+        """Submit the remaining tail and return the stitched transcript.
+
+        Returns:
+            The full transcript, or None if any segment failed so the caller
+            can fall back to transcribing the whole recording
+        """
+        with self._lock:
+            self._buffer.extend(self._pending)
+            self._pending.clear()
+            # Skip a tail that is nothing but the pause after the last cut
+            if len(self._buffer) > self._silence_bytes or not self._segments:
+                self._submit(bytes(self._buffer), self._overlapped)
+            self._buffer.clear()
+            segments = list(self._segments)
+
+        parts: List[Tuple[str, bool]] = []
+        try:
+            for future, overlapped in segments:
+                text = future.result()
+                if text is None:
+                    log.log_error("Segment transcription failed")
+                    return None
+                parts.append((text, overlapped))
+        finally:
+            self._executor.shutdown(wait=False)
+        return stitch(parts)
+
+
+def should_segment(buffer: wav.CaptureBuffer) -> bool:
+    """Whether a finished recording is long enough to transcribe in segments.
+
+    Only for the remote backend, where a single upload is slow and may exceed
+    the API's file size limit; the local engine already works through the
+    audio in windows.
+    """
+    from utils import transcription
+    return (buffer.seconds >= SEGMENTED_SECONDS and buffer.channels == 1
+            and not transcription.is_local())
+
+
+def transcribe_recording(buffer: wav.CaptureBuffer) -> Optional[str]:
+    """Transcribe a finished recording in segments cut at pauses, concurrently.
+
+    Returns:
+        The stitched transcript, or None if any segment failed
+    """
+    transcriber = StreamingTranscriber(
+        rate=buffer.rate,
+        sample_width=buffer.sample_width,
+        max_seconds=max(MIN_SEGMENT_SECONDS, SEGMENTED_MAX_SEGMENT_SECONDS),
+        # Cut at the first pause past half the maximum, so segments stay near the bound
+        min_seconds=max(MIN_SEGMENT_SECONDS, SEGMENTED_MAX_SEGMENT_SECONDS / 2),
+        max_workers=SEGMENTED_MAX_WORKERS,
+    )
+    log.log_info(f"Transcribing {buffer.seconds:.0f}s recording in segments")
+    pcm = buffer.pcm()
+    step = buffer.rate * buffer.sample_width  # one second at a time, so uploads start while scanning
+    for start in range(0, len(pcm), step):
+        transcriber.feed(pcm[start:start + step])
+    return transcriber.finish()
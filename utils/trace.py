@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""Lightweight per-stage latency tracing.
+
+Each hotkey action runs inside a `session()`, and the code it calls marks
+stages with `span()` (or `record()` for durations measured elsewhere, such
+as the server processing time reported by the API). Spans are kept in
+memory and appended to a JSONL file when the session ends, one line per
+span, tagged with the session ID and mode:
+
+    {"session": "3f9c...", "mode": "completion", "stage": "transcribe",
+     "start_ms": 12.1, "duration_ms": 840.3, "time": 1760000000.0}
+
+`voice_entry.py stats` summarizes the file with p50/p95/p99 per stage and
+mode. Spans outside a session are ignored. The session is held in a
+context variable: a plain worker thread has none, while threads started in
+a copy of the caller's context (`contextvars.copy_context().run`, as
+utils/hedge.py does) add their spans to it.
+
+The file lives in $XDG_STATE_HOME/voice_entry (~/.local/state/voice_entry
+by default); $VOICE_ENTRY_TRACE_FILE overrides the path.
+
+Set TRACE_ENABLED = False in config.py to turn tracing off.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils import log
+
+TRACE_FILE: str = os.environ.get("VOICE_ENTRY_TRACE_FILE") or os.path.join(
+    os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state"), "voice_entry", "trace.jsonl")
+
+_session: contextvars.ContextVar[Optional["Session"]] = contextvars.ContextVar("trace_session", default=None)
+_write_lock = threading.Lock()
+
+
+def _enabled() -> bool:
+    try:
+        import config
+    except ImportError:
+        return True
+    return getattr(config, "TRACE_ENABLED", True)
+
+
+class Session:
+    """Spans collected for one hotkey action."""
+
+    def __init__(self, mode: str) -> None:
+        self.id = os.urandom(6).hex()
+        self.mode = mode
+        self.wall_start = time.time()
+        self.start = time.monotonic()
+        self.spans: List[Tuple[str, float, float]] = []  # (stage, start offset, duration), seconds
+
+    def add(self, stage: str, start: float, duration: float) -> None:
+        self.spans.append((stage, start - self.start, duration))
+
+    def records(self) -> List[dict]:
+        return [
+            {
+                "session": self.id,
+                "mode": self.mode,
+                "stage": stage,
+                "start_ms": round(offset * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+                "time": round(self.wall_start, 3),
+            }
+            for stage, offset, duration in self.spans
+        ]
+
+
+def current() -> Optional[Session]:
+    """The session active in the current context, if any."""
+    return _session.get()
+
+
+@contextlib.contextmanager
+def session(mode: str) -> Iterator[Optional[Session]]:
+    """Trace one action. Nested sessions in the same context join the outer one."""
+    outer = current()
+    if outer is not None or not _enabled():
+        yield outer
+        return
+
+    s = Session(mode)
+    token = _session.set(s)
+    try:
+        yield s
+    finally:
+        _session.reset(token)
+        s.add("total", s.start, time.monotonic() - s.start)
+        _write(s)
+
+
+@contextlib.contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a stage of the current session."""
+    s = current()
+    if s is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        s.add(stage, start, time.monotonic() - start)
+
+
+def traced(mode: str):
+    """Decorator running a function inside a session for `mode`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with session(mode):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(stage: str, duration_ms: float) -> None:
+    """Add a stage whose duration was measured elsewhere, ending now."""
+    s = current()
+    if s is not None:
+        duration = duration_ms / 1000
+        s.add(stage, time.monotonic() - duration, duration)
+
+
+def _write(s: Session) -> None:
+    lines = "".join(json.dumps(r) + "\n" for r in s.records())
+    try:
+        os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+        with _write_lock, open(TRACE_FILE, "a") as f:
+            f.write(lines)
+    except OSError as e:
+        log.log_warning(f"Could not write trace: {e}")
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summarize(path: str = TRACE_FILE) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """p50/p95/p99 duration per (mode, stage), with "*" as the all-modes row."""
+    durations: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            durations[(r["mode"], r["stage"])].append(r["duration_ms"])
+            durations[("*", r["stage"])].append(r["duration_ms"])
+
+    summary = {}
+    for key, values in durations.items():
+        values.sort()
+        summary[key] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+    return summary
+
+
+def format_summary(summary: Dict[Tuple[str, str], Dict[str, float]]) -> str:
+    """Render a summary as a table, grouped by mode."""
+    rows = [f"{'mode':<16} {'stage':<18} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+    for (mode, stage), stats in sorted(summary.items(), key=lambda item: (item[0][0] == "*", item[0])):
+        rows.append(
+            f"{mode:<16} {stage:<18} {stats['count']:>6} "
+            f"{stats['p50']:>10.1f} {stats['p95']:>10.1f} {stats['p99']:>10.1f}"
+        )
+    return "\n".join(rows)
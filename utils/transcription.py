@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""Pluggable transcription backends.
+
+TRANSCRIPTION_BACKEND in config.py selects the engine:
+
+- "openai" (default): upload to whisper-1 via utils/openai.py
+- "local": run Whisper on the CPU with faster-whisper (CTranslate2, int8).
+  The model is loaded once per process and kept warm. Configure it with
+  LOCAL_WHISPER_MODEL (default "base.en"), LOCAL_WHISPER_COMPUTE_TYPE
+  (default "int8") and LOCAL_WHISPER_THREADS (default 0 = all cores).
+
+Both backends take a path or file-like object, plus an optional prompt
+(text preceding the audio, such as the previous segment's transcript), and
+return the text, or None on failure.
+"""
+
+import abc
+import threading
+from typing import Dict, Optional
+
+import config
+from utils import log
+
+
+class TranscriptionBackend(abc.ABC):
+    """Interface for speech-to-text engines."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def transcribe(self, audio_file, prompt: Optional[str] = None) -> Optional[str]:
+        """Transcribe a path or file-like audio object. Returns None on failure."""
+
+    def warm_up(self) -> None:
+        """Prepare the engine ahead of the first request (load models, open connections)."""
+
+
+class OpenAIBackend(TranscriptionBackend):
+    """Remote whisper-1 through the OpenAI API."""
+
+    name = "openai"
+
+    def transcribe(self, audio_file, prompt: Optional[str] = None) -> Optional[str]:
+        from utils import openai
+        return openai.transcribe_audio(audio_file, prompt)
+
+    def warm_up(self) -> None:
+        from utils import clients
+        clients.warm_up("openai")
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """Whisper on the local CPU through faster-whisper."""
+
+    name = "local"
+
+    def __init__(self) -> None:
+        self.model_name: str = getattr(config, "LOCAL_WHISPER_MODEL", "base.en")
+        self.compute_type: str = getattr(config, "LOCAL_WHISPER_COMPUTE_TYPE", "int8")
+        self.threads: int = getattr(config, "LOCAL_WHISPER_THREADS", 0)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                log.log_info(f"Loading local Whisper model {self.model_name} ({self.compute_type})")
+                self._model = WhisperModel(self.model_name, device="cpu", compute_type=self.compute_type, cpu_threads=self.threads)
+            return self._model
+
+    def warm_up(self) -> None:
+        try:
+            self._load()
+        except Exception as e:
+            log.log_error(f"Could not load local Whisper model: {e}")
+
+    def transcribe(self, audio_file, prompt: Optional[str] = None) -> Optional[str]:
+        log.log_info("Starting local transcription")
+        try:
+            if hasattr(audio_file, "seek"):
+                audio_file.seek(0)
+            segments, _ = self._load().transcribe(audio_file, beam_size=1, vad_filter=False, initial_prompt=prompt)
+            text = " ".join(segment.text.strip() for segment in segments).strip()
+            log.log_info(f"Transcription successful: {text[:50]}...")
+            return text
+        except Exception as e:
+            log.log_error(f"Error transcribing audio locally: {e}")
+            return None
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "local": LocalWhisperBackend,
+}
+
+_instances: Dict[str, TranscriptionBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def get_backend(name: Optional[str] = None) -> TranscriptionBackend:
+    """Return the (shared) backend instance, by default the one set in config.py."""
+    name = name or getattr(config, "TRANSCRIPTION_BACKEND", "openai")
+    if name not in BACKENDS:
+        log.log_warning(f"Unknown TRANSCRIPTION_BACKEND {name!r}, using openai")
+        name = "openai"
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
+
+
+def is_local() -> bool:
+    """Whether audio is transcribed on this machine (so compressing it is pointless)."""
+    return get_backend().name == "local"
+
+
+def transcribe(audio_file, prompt: Optional[str] = None) -> Optional[str]:
+    """Transcribe with the configured backend."""
+    return get_backend().transcribe(audio_file, prompt)
@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 
-"""Shared typing logic for type mode - used when typing from recording or clipboard."""
+"""Shared typing logic for type mode - used when typing from recording or clipboard.
+
+Text is delivered with one of three strategies (see choose_strategy):
+
+- type: xdotool keystrokes, for short text
+- paste: stage the text in the clipboard, press the paste key and restore
+  the previous clipboard, for long text once TYPE_PASTE_KEYS is set
+- chunked: fast keystroke bursts with short pauses, for long text when
+  pasting is not enabled (the default: no single paste key works in both
+  terminals and other applications)
+"""
 
 import fcntl
 import os
@@ -8,27 +18,121 @@ import subprocess
 from pathlib import Path
 import tempfile
 import time
+from typing import Iterable, List, Optional
+import config
 from utils import notification
 from utils import log
+from utils import trace
 
 TYPE_LOCK_FILE = os.path.join(tempfile.gettempdir(), "voice_entry_type.lock")
 Path(TYPE_LOCK_FILE).touch(exist_ok=True)
 
+# When streaming, pending text is typed at most this often unless a line completes
+STREAM_FLUSH_SECONDS = 0.15
 
-def _type_text(text: str) -> None:
-    """Type out text at the current cursor position and press Enter.
-    Uses a single xdotool type call with newline appended to avoid timing gaps.
-    """
+# "auto", or force one of "type", "paste", "chunked"
+STRATEGY: str = getattr(config, "TYPE_STRATEGY", "auto")
+# In auto mode, text at least this long (non-ASCII characters count 10x) is pasted.
+# By default that is 100 characters when the clipboard backend reports when the
+# paste was read, and 600 when restoring the clipboard has to wait out PASTE_SETTLE_SECONDS.
+PASTE_THRESHOLD: Optional[int] = getattr(config, "TYPE_PASTE_THRESHOLD", None)
+# Keystroke that pastes in the target application, e.g. "ctrl+v"; None (the default) never pastes
+PASTE_KEYS: Optional[str] = getattr(config, "TYPE_PASTE_KEYS", None)
+# Longest wait for the application to read the staged clipboard before it is restored
+PASTE_SETTLE_SECONDS: float = getattr(config, "TYPE_PASTE_SETTLE_SECONDS", 0.5)
+# Chunked typing: characters per burst and pause between bursts
+CHUNK_CHARS: int = getattr(config, "TYPE_CHUNK_CHARS", 256)
+CHUNK_PAUSE_SECONDS: float = 0.02
+
+
+def _xdotool(args: List[str]) -> bool:
     try:
-        # Append newline so type+Enter happen in one invocation - avoids drops when rapid
-        subprocess.run(
-            ['xdotool', 'type', '--clearmodifiers', '--delay', '1', text + '\n'],
-            check=True
-        )
+        with trace.span("xdotool"):
+            subprocess.run(['xdotool', *args], check=True)
+        return True
     except subprocess.CalledProcessError as e:
         log.log_error(f"Failed to type text: {e}")
     except FileNotFoundError:
         log.log_error("xdotool not found. Please install it to use the type functionality.")
+    return False
+
+
+def _type_text(text: str, press_enter: bool = True, delay_ms: int = 1) -> None:
+    """Type out text at the current cursor position and optionally press Enter.
+    Uses a single xdotool type call with newline appended to avoid timing gaps.
+    """
+    # Append newline so type+Enter happen in one invocation - avoids drops when rapid
+    _xdotool(['type', '--clearmodifiers', '--delay', str(delay_ms), text + ('\n' if press_enter else '')])
+
+
+def _type_chunked(text: str, press_enter: bool = True) -> None:
+    """Type in bursts without per-key delay, pausing between them so the application keeps up."""
+    for start in range(0, len(text), CHUNK_CHARS):
+        _type_text(text[start:start + CHUNK_CHARS], press_enter=False, delay_ms=0)
+        time.sleep(CHUNK_PAUSE_SECONDS)
+    if press_enter:
+        _xdotool(['key', '--clearmodifiers', 'Return'])
+
+
+def _paste_text(text: str, press_enter: bool = True) -> bool:
+    """Paste text through the clipboard, then restore what was there.
+
+    Returns False if nothing was pasted: the paste key failed, or the
+    clipboard backend can tell that the application never read the text
+    (e.g. a terminal that ignores ctrl+v), so the caller can type it instead.
+    """
+    from utils import clipboard
+    if not PASTE_KEYS:
+        return False
+    previous = clipboard.get_clipboard()
+    clipboard.set_clipboard(text)
+    pasted = _xdotool(['key', '--clearmodifiers', PASTE_KEYS])
+    if pasted:
+        # The application fetches the clipboard asynchronously; don't restore it before then
+        read = clipboard.wait_until_read("clipboard", PASTE_SETTLE_SECONDS)
+        if not read and clipboard.get_backend().knows_when_read:
+            log.log_warning(f"The application did not read the clipboard after {PASTE_KEYS}")
+            pasted = False
+    if previous:
+        clipboard.set_clipboard(previous)
+    if pasted and press_enter:
+        _xdotool(['key', '--clearmodifiers', 'Return'])
+    return pasted
+
+
+def choose_strategy(text: str) -> str:
+    """Pick "type", "paste" or "chunked" for `text`, following TYPE_STRATEGY.
+
+    xdotool types around a thousand characters a second at best, and
+    non-ASCII characters are slower still because each one needs a keymap
+    change, so long text is pasted instead.
+    """
+    if STRATEGY != "auto":
+        return STRATEGY
+    threshold = PASTE_THRESHOLD
+    if threshold is None:
+        from utils import clipboard
+        threshold = 100 if clipboard.get_backend().knows_when_read else 600
+    cost = len(text) + 9 * sum(1 for c in text if ord(c) > 127)
+    if cost < threshold:
+        return "type"
+    return "paste" if PASTE_KEYS else "chunked"
+
+
+def deliver(text: str, press_enter: bool = True, strategy: Optional[str] = None) -> str:
+    """Put text at the cursor with the given (or chosen) strategy. Returns the strategy used."""
+    strategy = strategy or choose_strategy(text)
+    with trace.span(f"deliver_{strategy}"):
+        if strategy == "paste":
+            if _paste_text(text, press_enter):
+                return strategy
+            log.log_warning("Paste failed, typing instead")
+            strategy = "chunked"
+        if strategy == "chunked":
+            _type_chunked(text, press_enter)
+        else:
+            _type_text(text, press_enter)
+    return strategy
 
 
 def type_out(text: str, operation: str = "Type") -> None:
@@ -40,12 +144,67 @@ def type_out(text: str, operation: str = "Type") -> None:
     """
     log.log_info(f"{operation} typing out: {text[:50]}...")
     with open(TYPE_LOCK_FILE, "w") as lockfile:
-        fcntl.flock(lockfile.fileno(), fcntl.LOCK_EX)
+        with trace.span("type_lock"):
+            fcntl.flock(lockfile.fileno(), fcntl.LOCK_EX)
         try:
-            _type_text(text)
+            strategy = deliver(text)
+            log.log_debug(f"{operation} delivered {len(text)} characters by {strategy}")
             # Hold the lock briefly so the target app can process the keystrokes
             # before the next queued process starts typing.
             time.sleep(0.2)
         finally:
             fcntl.flock(lockfile.fileno(), fcntl.LOCK_UN)
     notification.send_notification(operation, text)
+
+
+def type_stream(chunks: Iterable[str], operation: str = "Type") -> str:
+    """Type out streamed text as it arrives, press Enter at the end, and notify.
+
+    Complete words are typed in batches (whenever a line completes or
+    STREAM_FLUSH_SECONDS have passed), so the first keystrokes land as soon
+    as the first tokens arrive. The type lock is taken before the stream
+    starts, so queued type requests still run in hotkey order.
+
+    Args:
+        chunks: Pieces of text, e.g. from openai.stream_completion
+        operation: Name of the operation for logging/notification
+
+    Returns:
+        The full text that was typed
+    """
+    log.log_info(f"{operation} typing streamed text")
+    typed = []
+    pending = ""
+    last_flush = time.monotonic()
+    with open(TYPE_LOCK_FILE, "w") as lockfile:
+        with trace.span("type_lock"):
+            fcntl.flock(lockfile.fileno(), fcntl.LOCK_EX)
+        try:
+            waiting = time.monotonic()
+            for chunk in chunks:
+                if waiting is not None:
+                    # Time until the stream produced its first text
+                    trace.record("first_token", (time.monotonic() - waiting) * 1000)
+                    waiting = None
+                pending += chunk
+                # Only type up to the last whitespace so words aren't split
+                cut = max(pending.rfind(" "), pending.rfind("\n")) + 1
+                due = "\n" in pending[:cut] or time.monotonic() - last_flush >= STREAM_FLUSH_SECONDS
+                if cut and due:
+                    _type_text(pending[:cut], press_enter=False)
+                    typed.append(pending[:cut])
+                    notification.partial("".join(typed))
+                    pending = pending[cut:]
+                    last_flush = time.monotonic()
+            if pending or typed:
+                _type_text(pending)
+                typed.append(pending)
+                time.sleep(0.2)
+        finally:
+            fcntl.flock(lockfile.fileno(), fcntl.LOCK_UN)
+    text = "".join(typed)
+    if text.strip():
+        notification.send_notification(operation, text)
+    else:
+        log.log_warning(f"{operation} stream produced no text")
+    return text
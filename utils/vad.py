@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""Energy-based voice activity detection for trimming silence before upload.
+
+Removes leading and trailing silence and shortens long pauses inside the
+recording, so less audio is uploaded and decoded on every invocation.
+
+Enable with VAD_TRIM = True in config.py. Needs numpy.
+"""
+
+from typing import Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed when VAD_TRIM is set
+    np = None
+
+import config
+from utils import log
+
+# Tunables, overridable from config.py
+SILENCE_RMS: float = getattr(config, "VAD_SILENCE_RMS", 500.0)
+FRAME_SECONDS: float = getattr(config, "VAD_FRAME_SECONDS", 0.03)
+# Silence kept around speech so word onsets and tails aren't clipped
+PAD_SECONDS: float = getattr(config, "VAD_PAD_SECONDS", 0.2)
+# Internal pauses longer than this are shortened to this length
+MAX_PAUSE_SECONDS: float = getattr(config, "VAD_MAX_PAUSE_SECONDS", 0.6)
+
+
+def is_enabled() -> bool:
+    """Whether silence trimming is turned on in config.py (and numpy is available)."""
+    if not getattr(config, "VAD_TRIM", False):
+        return False
+    if np is None:
+        log.log_warning("VAD_TRIM is set but numpy is not installed, not trimming")
+        return False
+    return True
+
+
+def frame_rms(samples: "np.ndarray", frame_len: int) -> "np.ndarray":
+    """RMS energy of each complete frame of `frame_len` samples."""
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def voiced_frames(samples: "np.ndarray", rate: int) -> "np.ndarray":
+    """Boolean mask of frames that contain speech, padded on both sides."""
+    frame_len = max(1, int(FRAME_SECONDS * rate))
+    voiced = frame_rms(samples, frame_len) >= SILENCE_RMS
+    pad = int(round(PAD_SECONDS / FRAME_SECONDS))
+    if pad and voiced.any():
+        # Dilate the mask so each voiced frame keeps `pad` frames either side
+        voiced = np.convolve(voiced, np.ones(2 * pad + 1, dtype=bool), mode='same') > 0
+    return voiced
+
+
+def _keep_mask(voiced: "np.ndarray") -> "np.ndarray":
+    """Frames to keep: voiced frames plus at most MAX_PAUSE_SECONDS of each internal pause."""
+    keep = voiced.copy()
+    idx = np.flatnonzero(voiced)
+    first, last = idx[0], idx[-1]
+    max_pause = max(1, int(round(MAX_PAUSE_SECONDS / FRAME_SECONDS)))
+
+    # Boundaries of silent runs between the first and last voiced frame
+    inner = voiced[first:last + 1]
+    edges = np.flatnonzero(np.diff(inner.astype(np.int8)))
+    starts = edges[::2] + 1 + first
+    ends = edges[1::2] + 1 + first
+    for start, end in zip(starts, ends):
+        length = end - start
+        if length <= max_pause:
+            keep[start:end] = True
+        else:
+            # Keep the edges of the pause, drop the middle
+            head = max_pause // 2
+            keep[start:start + head] = True
+            keep[end - (max_pause - head):end] = True
+    return keep
+
+
+def trim_silence(pcm, rate: int) -> Tuple[bytes, float]:
+    """Trim leading/trailing silence and compress long pauses in int16 mono PCM.
+
+    Args:
+        pcm: Raw int16 mono frames (bytes or memoryview)
+        rate: Sample rate in Hz
+
+    Returns:
+        (trimmed PCM, seconds removed). Audio without any detected speech is
+        returned unchanged so nothing is lost to a bad threshold.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    frame_len = max(1, int(FRAME_SECONDS * rate))
+    voiced = voiced_frames(samples, rate)
+    if not voiced.any():
+        log.log_info("VAD found no speech, leaving recording untrimmed")
+        return bytes(pcm), 0.0
+
+    keep = _keep_mask(voiced)
+    sample_mask = np.repeat(keep, frame_len)
+    # The partial frame at the end follows the last full frame
+    tail = len(samples) - len(sample_mask)
+    sample_mask = np.concatenate([sample_mask, np.full(tail, keep[-1])])
+
+    trimmed = samples[sample_mask]
+    removed = (len(samples) - len(trimmed)) / rate
+    log.log_info(f"VAD removed {removed:.1f}s of silence from a {len(samples) / rate:.1f}s recording")
+    return trimmed.tobytes(), removed
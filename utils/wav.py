@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+"""In-memory WAV helpers for handing audio to transcription without temp files."""
+
+import io
+import struct
+import wave
+
+# Capture format used throughout voice_entry
+RATE: int = 16000
+CHANNELS: int = 1
+SAMPLE_WIDTH: int = 2  # bytes, int16
+
+# Size of the canonical PCM WAV header
+HEADER_SIZE: int = 44
+
+
+def pcm_to_wav(pcm: bytes, rate: int = RATE, channels: int = CHANNELS, sample_width: int = SAMPLE_WIDTH, name: str = "audio.wav") -> io.BytesIO:
+    """Wrap raw PCM frames in a WAV container held in memory.
+
+    Args:
+        pcm: Raw little-endian PCM frames
+        rate: Sample rate in Hz
+        channels: Number of channels
+        sample_width: Bytes per sample
+        name: Filename reported to upload clients, which use it to detect the format
+
+    Returns:
+        A BytesIO positioned at the start of the WAV data
+    """
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wave_file:
+        wave_file.setnchannels(channels)
+        wave_file.setsampwidth(sample_width)
+        wave_file.setframerate(rate)
+        wave_file.writeframes(pcm)
+    buf.seek(0)
+    buf.name = name
+    return buf
+
+
+def wav_header(data_size: int, rate: int = RATE, channels: int = CHANNELS, sample_width: int = SAMPLE_WIDTH) -> bytes:
+    """Build the 44-byte header of a PCM WAV file holding `data_size` bytes of frames."""
+    block_align = channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, rate, rate * block_align, block_align, sample_width * 8,
+        b'data', data_size,
+    )
+
+
+class WavReader(io.RawIOBase):
+    """Read-only file object over a memoryview, so uploads don't copy the recording."""
+
+    def __init__(self, view: memoryview, name: str = "audio.wav") -> None:
+        super().__init__()
+        self._view = view
+        self._pos = 0
+        self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        self._pos = max(0, min(self._pos, len(self._view)))
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class CaptureBuffer:
+    """Preallocated in-memory recording with room reserved for the WAV header.
+
+    Frames are appended after the header slot; `wav_file()` fills in the header
+    and returns a reader over the same memory, so the finished recording goes
+    to the upload without being copied or written to disk.
+    """
+
+    def __init__(self, seconds: float = 60.0, rate: int = RATE, channels: int = CHANNELS, sample_width: int = SAMPLE_WIDTH) -> None:
+        self.rate = rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self._buf = bytearray(HEADER_SIZE + int(seconds * rate) * channels * sample_width)
+        self._end = HEADER_SIZE
+
+    def write(self, data: bytes) -> None:
+        """Append captured frames, doubling the allocation when it runs out."""
+        needed = self._end + len(data)
+        if needed > len(self._buf):
+            self._buf.extend(bytes(max(needed, 2 * len(self._buf)) - len(self._buf)))
+        self._buf[self._end:needed] = data
+        self._end = needed
+
+    @property
+    def seconds(self) -> float:
+        return (self._end - HEADER_SIZE) / (self.rate * self.channels * self.sample_width)
+
+    def pcm(self) -> memoryview:
+        """The captured frames, without the header."""
+        return memoryview(self._buf)[HEADER_SIZE:self._end]
+
+    def wav_file(self, name: str = "audio.wav") -> WavReader:
+        """Return the recording as a WAV file object backed by this buffer."""
+        self._buf[:HEADER_SIZE] = wav_header(self._end - HEADER_SIZE, self.rate, self.channels, self.sample_width)
+        return WavReader(memoryview(self._buf)[:self._end], name)
+
+    def save(self, path: str) -> None:
+        """Write the recording to disk as a WAV file."""
+        self._buf[:HEADER_SIZE] = wav_header(self._end - HEADER_SIZE, self.rate, self.channels, self.sample_width)
+        with open(path, 'wb') as f:
+            f.write(memoryview(self._buf)[:self._end])
@@ -5,6 +5,8 @@
 On X11:
 - Clipboard (selection 'c'): Ctrl+C / Ctrl+V
 - Primary selection (selection 'p'): highlighted text, middle-click paste
+
+This is the subprocess backend of utils/clipboard.py; call that module instead.
 """
 
 import subprocess
@@ -30,19 +32,32 @@ def get_clipboard() -> Optional[str]:
         return None
 
 
-def set_clipboard(text: str) -> None:
-    """Copy text to the clipboard (Ctrl+C buffer)."""
+def set_selection(selection: str, text: str) -> None:
+    """Set the "clipboard" or "primary" selection.
+
+    xclip forks a child that keeps serving the selection after we exit; it
+    runs in its own session so killing the hotkey's process group doesn't
+    take the selection with it.
+    """
     if not text:
         return
-    log.log_info(f"Copying to clipboard: {text[:50]}...")
     try:
         process = subprocess.Popen(
-            ['xclip', '-selection', 'c'],
+            ['xclip', '-selection', selection[0]],
             stdin=subprocess.PIPE,
+            start_new_session=True,
         )
         process.communicate(text.encode('utf-8'))
     except Exception as e:
-        log.log_error(f"Error writing clipboard: {e}")
+        log.log_error(f"Error writing {selection}: {e}")
+
+
+def set_clipboard(text: str) -> None:
+    """Copy text to the clipboard (Ctrl+C buffer)."""
+    if not text:
+        return
+    log.log_info(f"Copying to clipboard: {text[:50]}...")
+    set_selection("clipboard", text)
 
 
 def get_primary_selection() -> Optional[str]:
@@ -1,87 +1,136 @@
 #!/usr/bin/env python3
 
-from utils import audio
-from utils import openai
-from utils import xclip
-from utils import typing
-from utils import goose
-from utils import perplexity
+from __future__ import annotations
+
+# Only the lightweight modules are imported here. Trigger modes usually just
+# signal a running recorder or daemon, so everything else (the OpenAI SDK,
+# PyAudio and GObject, but also the daemon server and tracing) is imported
+# inside the functions that actually use it. bench/startup.py and
+# tests/test_startup.py hold this to a budget.
 from utils import log
-from utils import notification
-import time
+from utils import daemon_client
+from utils import pidfile
+import functools
 import os
 import threading
 import sys
 import signal
-import pyaudio
-import wave
-from typing import Optional
 
-def handle_completion_signal(signum, frame, state: audio.AudioState):
+# typing.TYPE_CHECKING without importing typing
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Optional
+    from utils import audio
+
+def handle_completion_signal(signum, frame, state: "audio.AudioState"):
     """Handle signal to process completion."""
     log.log_info("Received signal to show completion")
+    from utils import audio, openai
     audio.process_audio_and_notify("Completion", openai.get_completion, state)
 
-def handle_edit_signal(signum, frame, state: audio.AudioState):
+def handle_edit_signal(signum, frame, state: "audio.AudioState"):
     """Handle signal to process edit."""
     log.log_info("Received signal to show edit")
-    audio.process_audio_and_notify("Edit", lambda text: openai.get_edit(text, xclip.get_clipboard), state)
+    from utils import audio, openai, clipboard
+    audio.process_audio_and_notify("Edit", lambda text: openai.get_edit(text, clipboard.get_clipboard, audio.captured_edit_prompt(state)), state)
 
-def handle_transcription_signal(signum, frame, state: audio.AudioState):
+def handle_transcription_signal(signum, frame, state: "audio.AudioState"):
     """Handle signal to process transcription."""
     log.log_info("Received signal to show transcription")
+    from utils import audio
     audio.process_audio_and_notify("Transcription", lambda text: text, state)
 
-def handle_type_signal(signum, frame, state: audio.AudioState):
+def handle_type_signal(signum, frame, state: "audio.AudioState"):
     """Handle signal to type out transcription."""
     log.log_info("Received signal to type transcription")
+    from utils import audio
     audio.process_audio_and_notify("Type", lambda text: text, state, should_type=True)
 
-def handle_goose_signal(signum, frame, state: audio.AudioState):
+def handle_type_completion_signal(signum, frame, state: "audio.AudioState"):
+    """Handle signal to type out a streamed completion of the transcription."""
+    log.log_info("Received signal to type completion")
+    from utils import audio, openai
+    audio.process_audio_and_notify("Type Completion", openai.stream_completion, state, should_type=True)
+
+def handle_goose_signal(signum, frame, state: "audio.AudioState"):
     """Handle signal to run transcription through Goose."""
     log.log_info("Received signal to run Goose")
+    from utils import audio
     audio.process_audio_and_notify("Goose", lambda text: text, state, should_run_goose=True)
 
 
-def handle_perplexity_signal(signum, frame, state: audio.AudioState):
+def handle_perplexity_signal(signum, frame, state: "audio.AudioState"):
     """Handle signal to run transcription through Perplexity."""
     log.log_info("Received signal to run Perplexity")
+    from utils import audio
     audio.process_audio_and_notify("Perplexity", lambda text: text, state, should_run_perplexity=True)
 
 
-def handle_append_signal(signum, frame, state: audio.AudioState):
+def handle_append_signal(signum, frame, state: "audio.AudioState"):
     """Handle signal to append transcription to clipboard."""
     log.log_info("Received signal to append")
+    from utils import audio
     audio.process_audio_and_notify("Append", lambda text: text, state, should_append=True)
 
 
+def _exit_after(handler, state: "audio.AudioState"):
+    """Wrap a signal handler so the one-shot recorder process exits once it has run."""
+    def _handler(signum, frame):
+        if state.stop_requested.is_set():
+            # Sent just before this recorder released its PID file; this recording is already stopping
+            log.log_warning(f"Recording already stopping, ignoring signal {signum}")
+            return
+        state.stop_requested.set()
+        handler(signum, frame, state)
+        if state.saver is not None:
+            state.saver.join()
+        os._exit(0)
+    return _handler
+
+
+def _traced(mode: str):
+    """trace.traced, importing utils.trace only once the function runs."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            from utils import trace
+            with trace.session(mode):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 def handle_record_mode():
     """Handle record mode operation."""
-    if audio.is_recording():
+    if pidfile.is_recording():
         # If recording is in progress, treat this as a request for transcription
         log.log_info("Recording in progress, getting transcription...")
-        audio.send_signal_to_recording(signal.SIGINT)
+        pidfile.send_signal_to_recording(signal.SIGINT)
         return
     
     # Start new recording
     # Write PID file
     pid = os.getpid()
-    with open(audio.PID_FILE, 'w') as f:
+    with open(pidfile.PID_FILE, 'w') as f:
         f.write(str(pid))
     log.log_info("No recording in progress, starting new recording...")
     
+    from utils import audio
+    from utils import notification
     try:
         # Initialize state
         state = audio.AudioState()
+        state.progress = notification.Progress("Recording")
         
         # Set up signal handlers with state
-        signal.signal(signal.SIGUSR1, lambda s, f: handle_completion_signal(s, f, state))
-        signal.signal(signal.SIGUSR2, lambda s, f: handle_edit_signal(s, f, state))
-        signal.signal(signal.SIGINT, lambda s, f: handle_transcription_signal(s, f, state))
-        signal.signal(signal.SIGTERM, lambda s, f: handle_type_signal(s, f, state))
-        signal.signal(signal.SIGRTMIN, lambda s, f: handle_goose_signal(s, f, state))
-        signal.signal(signal.SIGRTMIN + 1, lambda s, f: handle_perplexity_signal(s, f, state))
-        signal.signal(signal.SIGRTMIN + 2, lambda s, f: handle_append_signal(s, f, state))
+        signal.signal(signal.SIGUSR1, _exit_after(handle_completion_signal, state))
+        signal.signal(signal.SIGUSR2, _exit_after(handle_edit_signal, state))
+        signal.signal(signal.SIGINT, _exit_after(handle_transcription_signal, state))
+        signal.signal(signal.SIGTERM, _exit_after(handle_type_signal, state))
+        signal.signal(signal.SIGRTMIN, _exit_after(handle_goose_signal, state))
+        signal.signal(signal.SIGRTMIN + 1, _exit_after(handle_perplexity_signal, state))
+        signal.signal(signal.SIGRTMIN + 2, _exit_after(handle_append_signal, state))
+        signal.signal(signal.SIGRTMIN + 3, _exit_after(handle_type_completion_signal, state))
         
         # Start recording in a separate thread
         recording_thread = threading.Thread(target=audio.record_audio, args=(state,))
@@ -90,7 +139,11 @@ def handle_record_mode():
         
         # Notify user
         log.log_info("Recording: Voice recording started...")
-        notification.send_notification("Recording", "Voice recording started...")
+        state.progress.update("Voice recording started...")
+
+        # Load the processing modules and snapshot the clipboard while the user is still speaking
+        threading.Thread(target=audio.preload_processing_modules, daemon=True).start()
+        threading.Thread(target=audio.capture_context, args=(state,), daemon=True).start()
         
         # Wait for recording thread to finish
         recording_thread.join()
@@ -98,95 +151,257 @@ def handle_record_mode():
     finally:
         # Clean up
         log.log_info("Removing PID file after recording")
-        if os.path.exists(audio.PID_FILE):
-            os.remove(audio.PID_FILE)
+        pidfile.release_recording_pid()
+
+@_traced("completion")
+def run_completion_from_clipboard():
+    """Get a completion for the clipboard text and put it back on the clipboard."""
+    from utils import openai, clipboard, notification, trace
+    clipboard_text = clipboard.get_clipboard()
+    if not clipboard_text:
+        log.log_warning("No text in clipboard")
+        return
+    
+    # Process the clipboard text
+    with trace.span("process"):
+        completion = openai.get_completion(clipboard_text)
+    if completion:
+        clipboard.set_clipboard(completion)
+        notification.send_notification("Completion", completion)
+    else:
+        log.log_warning("Failed to get completion")
 
 def handle_completion_mode():
     """Handle completion mode operation."""
-    if audio.is_recording():
-        audio.send_signal_to_recording(signal.SIGUSR1)
+    if pidfile.is_recording():
+        pidfile.send_signal_to_recording(signal.SIGUSR1)
     else:
-        # Get text from clipboard and process it
-        clipboard_text = xclip.get_clipboard()
-        if not clipboard_text:
-            log.log_warning("No text in clipboard")
-            return
-        
-        # Process the clipboard text
-        completion = openai.get_completion(clipboard_text)
-        if completion:
-            xclip.set_clipboard(completion)
-            notification.send_notification("Completion", completion)
-        else:
-            log.log_warning("Failed to get completion")
+        run_completion_from_clipboard()
+
+def run_edit_from_clipboard():
+    """Edit mode needs a spoken directive, so there is nothing to do without a recording."""
+    log.log_warning("No recording in progress")
 
 def handle_edit_mode():
     """Handle edit mode operation."""
-    if audio.is_recording():
-        audio.send_signal_to_recording(signal.SIGUSR2)
+    if pidfile.is_recording():
+        pidfile.send_signal_to_recording(signal.SIGUSR2)
     else:
-        log.log_warning("No recording in progress")
+        run_edit_from_clipboard()
+
+@_traced("type")
+def run_type_from_clipboard():
+    """Type out whatever is currently in the clipboard."""
+    from utils import clipboard, typing
+    clipboard_text = clipboard.get_clipboard()
+    if not clipboard_text:
+        log.log_warning("No text in clipboard")
+        return
+    
+    typing.type_out(clipboard_text)
 
 def handle_type_mode():
     """Handle type mode operation."""
-    if audio.is_recording():
-        audio.send_signal_to_recording(signal.SIGTERM)
+    if pidfile.is_recording():
+        pidfile.send_signal_to_recording(signal.SIGTERM)
     else:
-        # Type out whatever is currently in the clipboard
-        clipboard_text = xclip.get_clipboard()
-        if not clipboard_text:
-            log.log_warning("No text in clipboard")
-            return
-        
-        typing.type_out(clipboard_text)
+        run_type_from_clipboard()
+
+@_traced("type_completion")
+def run_type_completion_from_clipboard():
+    """Type out a completion for the clipboard text as it streams in."""
+    from utils import openai, clipboard, typing, notification
+    clipboard_text = clipboard.get_clipboard()
+    if not clipboard_text:
+        log.log_warning("No text in clipboard")
+        return
+    
+    with notification.active(notification.Progress("Type Completion")):
+        notification.stage("Generating", clipboard_text)
+        typing.type_stream(openai.stream_completion(clipboard_text), "Type Completion")
+
+def handle_type_completion_mode():
+    """Handle type completion mode operation."""
+    if pidfile.is_recording():
+        pidfile.send_signal_to_recording(signal.SIGRTMIN + 3)
+    else:
+        run_type_completion_from_clipboard()
+
+@_traced("goose")
+def run_goose_from_clipboard():
+    """Take clipboard content and run Goose with it."""
+    from utils import clipboard, goose, notification, trace
+    clipboard_text = clipboard.get_clipboard()
+    if not clipboard_text:
+        log.log_warning("No text in clipboard")
+        notification.send_notification("Goose", "No text in clipboard")
+        return
+    with trace.span("goose"):
+        goose.run_goose(clipboard_text)
 
 def handle_goose_mode():
     """Handle Goose mode operation."""
-    if audio.is_recording():
+    if pidfile.is_recording():
         # Transcribe and feed straight into Goose, no clipboard
-        audio.send_signal_to_recording(signal.SIGRTMIN)
+        pidfile.send_signal_to_recording(signal.SIGRTMIN)
     else:
-        # Take clipboard content and run with it
-        clipboard_text = xclip.get_clipboard()
-        if not clipboard_text:
-            log.log_warning("No text in clipboard")
-            notification.send_notification("Goose", "No text in clipboard")
-            return
-        goose.run_goose(clipboard_text)
+        run_goose_from_clipboard()
+
 
+@_traced("perplexity")
+def run_perplexity_from_clipboard():
+    """Take clipboard content and query Perplexity with it."""
+    from utils import clipboard, perplexity, notification, trace
+    clipboard_text = clipboard.get_clipboard()
+    if not clipboard_text:
+        log.log_warning("No text in clipboard")
+        notification.send_notification("Perplexity", "No text in clipboard")
+        return
+    with trace.span("perplexity"):
+        perplexity.run_perplexity(clipboard_text)
 
 def handle_perplexity_mode():
     """Handle Perplexity mode operation."""
-    if audio.is_recording():
+    if pidfile.is_recording():
         # Transcribe and feed straight into Perplexity, no clipboard
-        audio.send_signal_to_recording(signal.SIGRTMIN + 1)
+        pidfile.send_signal_to_recording(signal.SIGRTMIN + 1)
     else:
-        # Take clipboard content and run with it
-        clipboard_text = xclip.get_clipboard()
-        if not clipboard_text:
-            log.log_warning("No text in clipboard")
-            notification.send_notification("Perplexity", "No text in clipboard")
-            return
-        perplexity.run_perplexity(clipboard_text)
+        run_perplexity_from_clipboard()
 
 
+@_traced("append")
+def run_append_from_selection():
+    """Take the primary selection and append it to the clipboard."""
+    from utils import clipboard, notification
+    selection = clipboard.get_primary_selection()
+    if not selection:
+        log.log_warning("No selection and no recording")
+        notification.send_notification("Append", "No selection and no recording in progress")
+        return
+    current = clipboard.get_clipboard() or ""
+    new_content = f"{current}\n\n{selection}" if current else selection
+    clipboard.set_clipboard(new_content)
+    log.log_info(f"Appended selection to clipboard: {selection[:50]}...")
+    notification.send_notification("Append", f"Appended: {selection[:80]}...")
+
 def handle_append_mode():
     """Handle Append mode operation."""
-    if audio.is_recording():
+    if pidfile.is_recording():
         # Transcribe and append to clipboard
-        audio.send_signal_to_recording(signal.SIGRTMIN + 2)
+        pidfile.send_signal_to_recording(signal.SIGRTMIN + 2)
     else:
-        # Take primary selection and append to clipboard
-        selection = xclip.get_primary_selection()
-        if not selection:
-            log.log_warning("No selection and no recording")
-            notification.send_notification("Append", "No selection and no recording in progress")
-            return
-        clipboard = xclip.get_clipboard() or ""
-        new_content = f"{clipboard}\n\n{selection}" if clipboard else selection
-        xclip.set_clipboard(new_content)
-        log.log_info(f"Appended selection to clipboard: {selection[:50]}...")
-        notification.send_notification("Append", f"Appended: {selection[:80]}...")
+        run_append_from_selection()
+
+
+# Daemon mode: what each request does while a recording is active
+RECORDING_HANDLERS = {
+    "record": handle_transcription_signal,
+    "completion": handle_completion_signal,
+    "edit": handle_edit_signal,
+    "type": handle_type_signal,
+    "type_completion": handle_type_completion_signal,
+    "goose": handle_goose_signal,
+    "perplexity": handle_perplexity_signal,
+    "append": handle_append_signal,
+}
+
+# ...and what it does when nothing is being recorded
+IDLE_HANDLERS = {
+    "completion": run_completion_from_clipboard,
+    "edit": run_edit_from_clipboard,
+    "type": run_type_from_clipboard,
+    "type_completion": run_type_completion_from_clipboard,
+    "goose": run_goose_from_clipboard,
+    "perplexity": run_perplexity_from_clipboard,
+    "append": run_append_from_selection,
+}
+
+_session_lock = threading.Lock()
+_session: Optional["audio.AudioState"] = None
+
+
+def _run_request(mode: str, work, no_cache: bool = False) -> None:
+    """Run one daemon request, keeping the daemon alive if it fails."""
+    from utils import cache
+    try:
+        with cache.bypassing(no_cache):
+            work()
+    except Exception:
+        log.log_exception(f"Daemon request {mode} failed")
+
+
+def daemon_dispatch(request: str) -> Optional[str]:
+    """Start the work for a daemon request on a background thread.
+
+    Args:
+        request: The mode name, optionally followed by flags such as --no-cache
+
+    Returns:
+        An error string if the request is rejected, None once it has started
+    """
+    global _session
+    from utils import audio, notification
+    mode, *flags = request.split()
+    no_cache = "--no-cache" in flags
+    if mode == "goose_cancel":
+        from utils import goose
+        log.log_info(f"Cancelled {goose.cancel()} Goose run(s)")
+        return None
+    if mode not in RECORDING_HANDLERS:
+        return f"unknown mode {mode}"
+
+    with _session_lock:
+        state = _session
+        if state is None and mode == "record":
+            _session = audio.AudioState()
+            _session.progress = notification.Progress("Recording")
+            threading.Thread(target=audio.record_audio, args=(_session, audio.shared_pyaudio()), daemon=True).start()
+            threading.Thread(target=audio.capture_context, args=(_session,), daemon=True).start()
+            log.log_info("Recording: Voice recording started...")
+            _session.progress.update("Voice recording started...")
+            return None
+        _session = None
+        if state is not None:
+            # Take the output ticket in request order; processing then runs concurrently
+            from utils import sequencer
+            state.ticket = sequencer.take()
+
+    if state is not None:
+        work = lambda: RECORDING_HANDLERS[mode](None, None, state)
+    else:
+        work = IDLE_HANDLERS[mode]
+    threading.Thread(target=_run_request, args=(mode, work, no_cache), daemon=True).start()
+    return None
+
+
+def handle_daemon_mode():
+    """Run the resident daemon that serves hotkey requests over the control socket."""
+    log.log_info("Starting voice_entry daemon")
+    signal.signal(signal.SIGTERM, lambda s, f: sys.exit(0))
+    # Import everything and initialize PyAudio up front so the first request is fast
+    from utils import audio, clipboard
+    audio.preload_processing_modules()
+    audio.shared_pyaudio()
+    # The daemon outlives each request, so it can own the clipboard itself instead of forking xclip
+    clipboard.start_resident()
+    from utils import daemon
+    try:
+        daemon.serve(daemon_dispatch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        from utils import goose
+        goose.cancel()
+        clipboard.stop_resident()
+
+
+def handle_stats_mode():
+    """Print latency percentiles per stage and mode from the trace file."""
+    from utils import trace
+    if not os.path.exists(trace.TRACE_FILE):
+        print(f"No traces recorded yet ({trace.TRACE_FILE})")
+        return
+    print(trace.format_summary(trace.summarize()))
 
 
 def main():
@@ -198,6 +413,22 @@ def main():
         return
     
     mode = os.sys.argv[1]
+    flags = os.sys.argv[2:]
+    if mode == "daemon":
+        handle_daemon_mode()
+        return
+    if mode == "stats":
+        handle_stats_mode()
+        return
+
+    # Hand the request to a running daemon if there is one
+    if daemon_client.send_request(" ".join([mode, *flags])):
+        return
+
+    if "--no-cache" in flags:
+        from utils import cache
+        cache.set_bypass(True)
+
     if mode == "record":
         handle_record_mode()
     elif mode == "completion":
@@ -206,12 +437,17 @@ def main():
         handle_edit_mode()
     elif mode == "type":
         handle_type_mode()
+    elif mode == "type_completion":
+        handle_type_completion_mode()
     elif mode == "goose":
         handle_goose_mode()
     elif mode == "perplexity":
         handle_perplexity_mode()
     elif mode == "append":
         handle_append_mode()
+    elif mode == "goose_cancel":
+        # Goose runs belong to the daemon's process; one-shot recorders can't be reached here
+        log.log_warning("goose_cancel needs the daemon (cmd/daemon.sh)")
     else:
         log.log_error(f"Unknown mode: {mode}")
 